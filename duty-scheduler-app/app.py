@@ -1,169 +1,389 @@
 import pandas as pd
 import streamlit as st            # ← 1 行でエイリアス指定
-import re, random, datetime, tempfile, os, io, csv
-from collections import defaultdict
-from ortools.sat.python import cp_model
-from utils.generate_calendar import generate_pretty_calendar
-from utils.loose_scheduler import build_schedule as build_schedule_loose
-
-# ---------- スケジューラ（3 日間隔 + 5 ルール） ----------
-def build_schedule(df_raw: pd.DataFrame, year: int, month: int):
-    doctors = df_raw["Name"].tolist()
-    group   = df_raw.set_index("Name")["Group"].to_dict()
-    avail   = 1 - df_raw.drop(columns=["Group", "Name"])          # 1 = 可
-
-    # 列を 1-1,1-2,2… の順に並べ替え
-    shifts = sorted(
-        avail.columns,
-        key=lambda c: (int(re.match(r"(\d+)", c).group(1)),
-                       int(re.search(r"-(\d)", c).group(1)) if "-" in c else 0)
-    )
-    day_of = {c: int(re.match(r"(\d+)", c).group(1)) for c in shifts}
-    sub_of = {c: int(re.search(r"-(\d)", c).group(1)) if "-" in c else 0 for c in shifts}
-
-    # ---------- CP-SAT ----------
-    m = cp_model.CpModel()
-    x, y = {}, {}     # Duty, Oncall
-
-    for d in doctors:
-        for s in shifts:
-            x[d, s] = m.NewBoolVar(f"x_{d}_{s}")
-            y[d, s] = m.NewBoolVar(f"y_{d}_{s}")
-            if avail.loc[df_raw["Name"] == d, s].iat[0] == 0:
-                m.Add(x[d, s] == 0)
-                m.Add(y[d, s] == 0)
-
-    # ①② すべて埋める & G1 Duty→G0 OC
-    for s in shifts:
-        if sub_of[s] == 1:                       # 休日-1
-            m.Add(sum(x[d, s] for d in doctors if group[d] == 0) == 1)
-            m.Add(sum(x[d, s] for d in doctors if group[d] == 1) == 1)
-            m.Add(sum(y[d, s] for d in doctors) == 0)
-        else:
-            m.Add(sum(x[d, s] for d in doctors) == 1)
-            m.Add(
-                sum(y[d, s] for d in doctors if group[d] == 0)
-                == sum(x[d, s] for d in doctors if group[d] == 1)
-            )
-            m.Add(sum(y[d, s] for d in doctors if group[d] == 1) == 0)
-
-    # ③④⑤ 回数上限
-    for d in doctors:
-        duty_cnt   = sum(x[d, s] for s in shifts)
-        oncall_cnt = sum(y[d, s] for s in shifts)
-        if group[d] == 1:
-            m.Add(duty_cnt == 2)
-            m.Add(oncall_cnt == 0)
+import datetime, os, io
+from utils import pipeline
+from utils.generate_calendar import calendar_month, render_calendars
+from utils.fairness import FairnessGoal
+from utils.feasibility import issues_frame
+from utils.instrument import Profiler
+from utils.horizon import Carry, next_month, solve_horizon
+from utils.flow_scheduler import build_assignment as build_assignment_flow
+from utils.loose_scheduler import build_assignment as build_assignment_loose
+from utils.jobs import SolveJob
+from utils.pipeline import BUNDLE, COMBINED, Cancelled, ExportBundle, Infeasible, TimedOut, schedule_xlsx
+from utils.shift_index import ShiftIndex, shift_index
+from utils.solver_config import SolverConfig
+from utils.result_cache import ResultCache, make_key
+from utils.validate import validate_schedule
+
+# ---------- スケジューラ（割付・書き出しは utils.pipeline。ここは表示だけ） ----------
+def solve_in_background(key: str, fn, time_limit: float, stop_label: str = "キャンセル"):
+    """fn(job) をセッションのバックグラウンドジョブで解いて結果を返す（解いている間はここで止める）。
+
+    入力（key）が同じなら、関係ないウィジェットでの再実行でも走っているジョブにつなぎ直す。
+    入力が変わったら前のジョブは止めて捨てる。
+    """
+    job = st.session_state.get("job")
+    if job is not None and job.key != key:
+        if job.running:
+            job.cancel()
+        job = None
+    if job is None:
+        job = st.session_state["job"] = SolveJob(key, fn, time_limit, memory=trace_memory).start()
+    if job.running:
+        show_progress(job, stop_label)
+        st.stop()
+
+    prof.stages += job.prof.stages
+    prof.solver.update(job.prof.solver)
+    if isinstance(job.error, Infeasible):
+        stop_infeasible(job.error.message, job.error.issues, job.token)
+    if isinstance(job.error, (Cancelled, TimedOut)):
+        if isinstance(job.error, TimedOut):
+            st.warning(job.error.message)
         else:
-            m.Add(duty_cnt >= 1)
-            m.Add(duty_cnt <= 2)
-            m.Add(oncall_cnt <= 2)
-
-    # 3 日間隔
-    for d in doctors:
-        for i, s1 in enumerate(shifts):
-            for s2 in shifts[i + 1:]:
-                if 1 <= day_of[s2] - day_of[s1] <= 2:
-                    m.Add(x[d, s1] + y[d, s1] + x[d, s2] + y[d, s2] <= 1)
-
-    # 可行解だけ探す
-    m.Minimize(0)
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 10
-    if solver.Solve(m) not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        st.error("割り付け不可：可勤務日かルールを見直してください。")
+            st.info(f"キャンセルしました（{job.elapsed:.1f} 秒）。")
+        if st.button("もう一度解く"):
+            del st.session_state["job"]
+            st.rerun()
         st.stop()
+    if job.error is not None:
+        raise job.error
+    return job.result
+
+@st.fragment(run_every=0.5)
+def show_progress(job: SolveJob, stop_label: str):
+    # 0.5 秒ごとにこの部分だけ描き直す（ページは固まらない）。終わったらページ全体を再実行
+    if not job.running:
+        st.rerun()
+    s = job.status()
+    stage = {"precheck": "事前チェック", "build": "モデル構築", "hint": "初期解ヒント", "solve": "探索",
+             "extract": "取り出し"}.get(s["stage"], s["stage"] or "準備")
+    st.progress(min(1.0, s["elapsed"] / job.time_limit) if job.time_limit else 0.0,
+                text=f"{stage}中… {s['elapsed']:.1f} / {job.time_limit:.0f} 秒・解 {s['solutions']} 個" +
+                     (f"・最良の目的値 {s['objective']:.0f}（下界 {s['bound']:.0f}）" if s["objective"] is not None else ""))
+    run = job.anytime
+    if run is not None and run.best is not None:
+        best = run.best
+        st.caption(f"いまの最良解：幅 Duty+Oncall {best.total_spread} / -1 {best.holiday_spread}")
+        st.line_chart(run.callback.frame().set_index("seconds")[["total_spread", "holiday_spread"]])
+        # 押されたときだけ xlsx を作る（0.5 秒ごとの描き直しで毎回作らない）
+        st.download_button("ここまでの最良解（Excel）", lambda a=best.assignment: schedule_xlsx(a),
+                           "schedule_best.xlsx", on_click="ignore")
+    if st.button(stop_label, disabled=job.cancelled):
+        job.cancel()
+
+def stop_infeasible(message: str, issues=None, once: str | None = None):
+    st.error(message)
+    if issues:
+        st.dataframe(issues_frame(issues), hide_index=True, use_container_width=True)
+    show_perf(once, result="infeasible")
+    st.stop()
+
+def checked_index(df_raw: pd.DataFrame, year: int, month: int, label: str = "CSV") -> ShiftIndex:
+    # 列名（日・曜日）が年月と合わなければ解く前に止める
+    try:
+        return shift_index(df_raw, year, month)
+    except ValueError as e:
+        st.error(f"{label} の列が {year}年{month}月 と合いません：\n\n" +
+                 "\n".join(f"- {line}" for line in str(e).splitlines()))
+        st.stop()
+
+# ---------- 結果キャッシュ（再実行・再起動をまたいで使い回す） ----------
+@st.cache_resource
+def result_cache() -> ResultCache:
+    return ResultCache()
+
+def solver_settings() -> SolverConfig:
+    with st.expander("ソルバー設定（strict）"):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            limit = st.number_input("制限時間 [秒]", min_value=1, max_value=600, value=10, step=1)
+        with c2:
+            workers = st.number_input("並列数（0=コア数）", min_value=0, max_value=64, value=0, step=1)
+        with c3:
+            seed = st.number_input("乱数シード", min_value=0, value=0, step=1)
+        hint = st.checkbox("greedy 解を初期解ヒントに使う", value=True)
+        symmetry = st.checkbox("同じ条件の医師の入れ替えを制約で除く（対称性の除去）", value=False,
+                               help="グループ・可勤務日・引継ぎの累計が同じ医師の割付を辞書式に並べる")
+        template = st.checkbox("モデルの型を使い回す", value=False,
+                               help="同じグループの並び・シフトの並びなら、組んだモデルを複製して NG のセルだけ固定する"
+                                    "（可勤務日を少しずつ変えて解き直す what-if 向け。型は全セルぶんの変数を持つので、"
+                                    "1 回だけ解くなら毎回組む方が速い）")
+    return SolverConfig(float(limit), int(workers) or None, int(seed), hint, symmetry=symmetry, template=template)
+
+def alternative_settings() -> tuple[int, int]:
+    with st.expander("別案をまとめて作る（strict）"):
+        c1, c2 = st.columns(2)
+        with c1:
+            k = st.number_input("案の数", min_value=1, max_value=10, value=1, step=1)
+        with c2:
+            dist = st.number_input("案どうしで最低限違うセル数", min_value=2, max_value=500, value=20, step=2,
+                                   disabled=k == 1, help="担当を 1 つ入れ替えると 2 セル違う")
+    return int(k), int(dist) if k > 1 else 0
+
+def fairness_settings() -> FairnessGoal | None:
+    with st.expander("公平性で最適化（strict）"):
+        on = st.checkbox("Duty+Oncall と -1 の偏りを小さくする（改善解を表示しながら制限時間まで探す）")
+        c1, c2 = st.columns(2)
+        with c1:
+            total = st.number_input("これで十分：Duty+Oncall の幅", min_value=0, max_value=10, value=1, step=1)
+        with c2:
+            hol = st.number_input("これで十分：-1 の幅", min_value=0, max_value=10, value=1, step=1)
+    return FairnessGoal(total_target=int(total), holiday_target=int(hol)) if on else None
+
+# ダウンロードの名前 → ボタンの文言（押されたときに作る）
+DOWNLOADS = {"schedule.xlsx": "Excel をダウンロード", "pretty_calendar.xlsx": "カレンダーをダウンロード",
+             "availability_annotated.csv": "注釈入り CSV をダウンロード",
+             COMBINED: "1 つのブックでダウンロード（Schedule / Summary / Calendar / Annotated）",
+             BUNDLE: "まとめて ZIP でダウンロード"}
+
+def export_bundle(key: str, sel: int, result, df_raw, year: int, month: int, index, total: bool) -> ExportBundle:
+    # 解いた割付ごとに 1 つ（再実行のたびには作り直さない）。直近の数個だけ残す
+    memo = st.session_state.setdefault("exports", {})
+    b = memo.get((key, sel))
+    if b is None or b.a.matrix.shape != result.matrix.shape or (b.a.matrix != result.matrix).any():
+        b = memo[(key, sel)] = ExportBundle(result, df_raw, year, month, index, total)
+        while len(memo) > 8:
+            memo.pop(next(iter(memo)))
+    return b
 
-    # DataFrame 生成
-    rows = []
-    for s in shifts:
-        rows.append({
-            "Shift": s,
-            "Duty_G0": ", ".join(d for d in doctors if solver.Value(x[d, s]) and group[d] == 0),
-            "Duty_G1": ", ".join(d for d in doctors if solver.Value(x[d, s]) and group[d] == 1),
-            "Oncall_G0": ", ".join(d for d in doctors if solver.Value(y[d, s]))
-        })
-    schedule_df = pd.DataFrame(rows)
-
-    summary_df = pd.DataFrame({
-        "Group":  [group[d] for d in doctors],
-        "Duty":   [sum(solver.Value(x[d, s]) for s in shifts) for d in doctors],
-        "Oncall": [sum(solver.Value(y[d, s]) for s in shifts) for d in doctors],
-    }, index=doctors)
-
-    return schedule_df, summary_df
+def show_cache_stats():
+    s = cache.stats
+    stats_box.caption(f"結果キャッシュ: メモリ {s['memory_hits']} / ディスク {s['disk_hits']} ヒット・"
+                      f"{s['misses']} ミス")
+
+def show_perf(once: str | None = None, **meta):
+    # 段階ごとの時間・メモリと CP-SAT の統計（ログのパスがあれば JSON lines で追記）。
+    # 追記は新しい結果のときだけ：キャッシュからの結果は書かず、once（ジョブ・ファイルの印）が前回と同じ再実行も書かない
+    if not prof.stages:
+        return
+    with st.expander(f"性能計測（合計 {prof.frame()['seconds'].sum():.2f} 秒）"):
+        st.dataframe(prof.frame(), use_container_width=True)
+        if prof.solver:
+            st.json(prof.solver)
+    if perf_log and meta.get("result") != "cache" and (once is None or st.session_state.get("perf_logged") != once):
+        st.session_state["perf_logged"] = once
+        try:
+            prof.append_jsonl(perf_log, **perf_meta, **meta)
+        except OSError as e:
+            st.caption(f"計測ログに書けませんでした: {e}")
 
 # ---------- Streamlit UI ----------
 st.set_page_config(page_title="Duty Scheduler", layout="centered")
 st.title("Doctor Duty Scheduler")
 
-csv_file = st.file_uploader("当直希望 CSV (0=可/1=NG)", type="csv")
+cache = result_cache()
+with st.sidebar:
+    stats_box = st.empty()
+    if st.button("キャッシュを消去"):
+        cache.clear()
+    st.caption("性能計測")
+    trace_memory = st.checkbox("段階ごとのメモリも測る（遅くなる）")
+    perf_log = st.text_input("計測ログ（JSON lines・任意）", value=os.environ.get("DUTY_PERF_LOG", ""))
+show_cache_stats()
+prof = Profiler(memory=trace_memory)
+perf_meta = {}
+
+horizon = st.checkbox("複数月をまとめて割付（前月からの引継ぎあり）")
+if horizon:
+    csv_files = st.file_uploader("当直希望 CSV（1 か月 1 ファイル・先頭月から順に）", type="csv",
+                                 accept_multiple_files=True)
+else:
+    csv_file = st.file_uploader("当直希望 CSV (0=可/1=NG)", type="csv")
 col1, col2 = st.columns(2)
 with col1:
     year = st.number_input("年", min_value=2020, max_value=2100, value=datetime.date.today().year, step=1)
 with col2:
     month = st.number_input("月", min_value=1, max_value=12, value=datetime.date.today().month, step=1)
 
-if csv_file:
-    df_raw = pd.read_csv(csv_file, encoding="cp932")
+if horizon:
+    if csv_files:
+        mode = st.radio("割付モードを選択", ["strict", "loose"], horizontal=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            window = st.number_input("同時に解く月数（strict）", min_value=1, max_value=len(csv_files), value=1, step=1)
+        with col2:
+            budget = st.number_input("全体の制限時間 [秒]", min_value=10, max_value=3600, value=60, step=10)
+        config = solver_settings()
+
+        key = make_key("horizon", *(f.getvalue() for f in csv_files),
+                       int(year), int(month), mode, int(window), int(budget), config)
+        results = cache.get(key)
+        if results is None:
+            months = [(*next_month(int(year), int(month), k), pd.read_csv(f, encoding="cp932"))
+                      for k, f in enumerate(csv_files)]
+            for (y, m, df), f in zip(months, csv_files):
+                checked_index(df, y, m, f.name)
+            results, _ = solve_horizon(months, mode, int(window), float(budget), config=config)
+            cache.put(key, results)
+        show_cache_stats()
 
-    mode = st.radio("割付モードを選択", ["strict", "loose"], horizontal=True)
+        buf = io.BytesIO()
+        with pd.ExcelWriter(buf) as w:
+            for tab, r in zip(st.tabs([f"{r.year}-{r.month:02d}" for r in results]), results):
+                with tab:
+                    if r.schedule_df is None:
+                        st.error("割り付け不可（この月以降は未割付）：可勤務日かルールを見直してください。")
+                        continue
+                    st.caption(f"{r.seconds:.1f} 秒")
+                    st.dataframe(r.schedule_df, hide_index=True, use_container_width=True)
+                    st.dataframe(r.summary_df, use_container_width=True)
+                    r.schedule_df.to_excel(w, sheet_name=f"Schedule_{r.year}-{r.month:02d}", index=False)
+                    r.summary_df.to_excel(w, sheet_name=f"Summary_{r.year}-{r.month:02d}")
+        done = [r for r in results if r.schedule_df is not None]
+        if done:
+            st.download_button("Excel をダウンロード（全月）", buf.getvalue(), "schedule_horizon.xlsx")
+            # 全月のカレンダーを 1 つのブックに（月ごとのシート）
+            st.download_button("カレンダーをダウンロード（全月）",
+                               render_calendars([calendar_month(r.schedule_df, r.year, r.month) for r in done]),
+                               "pretty_calendar_horizon.xlsx")
+    else:
+        st.info("CSV を月の順にアップロードして先頭月の年・月を指定してください。")
 
+elif csv_file:
+    with prof.stage("load"):
+        df_raw = pd.read_csv(csv_file, encoding="cp932")
+    with prof.stage("index"):
+        index = checked_index(df_raw, int(year), int(month))
+
+    mode = st.radio("割付モードを選択", ["strict", "loose", "flow"], horizontal=True,
+                    help="flow は loose と同じルールを最小費用流で（ヒューリスティック。空きコマは Duty の入れ替えでも埋め、"
+                         "同じ回数の greedy の結果とも比べるので、greedy より空きコマが多くはならない）")
+    config = solver_settings()
+
+    # 前月の結果があれば月またぎの間隔・累計回数を引き継ぐ
+    prev_file = st.file_uploader("前月の schedule.xlsx（任意）", type="xlsx")
+    carry = None
+    if prev_file:
+        carry = Carry.from_schedule(pd.read_excel(prev_file, sheet_name="Schedule"),
+                                    *next_month(int(year), int(month), -1))
+
+    # 手で直した割付は解き直さずにルールだけチェックする（アップロード中は解かない）
+    with st.expander("編集した割付をチェック（解き直さない）"):
+        edited_file = st.file_uploader("編集した schedule.xlsx か注釈入り CSV", type=["xlsx", "csv"],
+                                       help="このモードのルール（strict / loose・flow）と上の CSV の可勤務日で見ます")
+    if edited_file:
+        edited = (pd.read_excel(edited_file, sheet_name="Schedule") if edited_file.name.endswith(".xlsx")
+                  else pd.read_csv(edited_file, encoding="cp932"))
+        with prof.stage("validate"):
+            check = validate_schedule(df_raw, edited, int(year), int(month),
+                                      "strict" if mode == "strict" else "loose", carry, index)
+        prof.solver.update(violations=check.counts())
+        if check.ok:
+            st.success(f"ルール違反はありません（{check.seconds * 1000:.0f} ms）")
+        else:
+            st.error(f"ルール違反 {len(check.issues)} 件（{check.seconds * 1000:.0f} ms）："
+                     + "、".join(f"{k} {v}" for k, v in check.counts().items()))
+            st.dataframe(check.frame(), hide_index=True, use_container_width=True)
+        if check.warnings:
+            st.warning(f"違反ではない注意 {len(check.warnings)} 件（loose の Oncall 間隔の緩和・同名の医師の行の推定）")
+            st.dataframe(issues_frame(check.warnings), hide_index=True, use_container_width=True)
+        st.subheader("Summary")
+        st.dataframe(check.assignment.summary_df(total=mode != "strict"), use_container_width=True)
+        show_perf(make_key("validated", edited_file.getvalue(), csv_file.getvalue(), mode), result="validated")
+        st.stop()
+
+    # 公開後に可用性が変わったときは、公開済みの割付からの変更を最小にして組み直す
+    published_file = goal = None
+    alternatives, min_distance = 1, 0
     if mode == "strict":
-        sched, summary = build_schedule(df_raw, int(year), int(month))
-    else:  # loose
-        sched, summary = build_schedule_loose(df_raw, int(year), int(month))
-    # ▲▲ ここまで ▲▲
-
-    # ---------- 表示 ----------
-    st.subheader("Schedule")
-    st.dataframe(sched, hide_index=True, use_container_width=True)
-    st.subheader("Summary")
-    st.dataframe(summary, use_container_width=True)
-
-    # ---------- 追加 CSV (Duty=3, OC=4) ----------
-    df_ann = df_raw.copy()
-    warnings = []
-    for _, r in sched.iterrows():
-        shift = r["Shift"]
-        # Duty
-        for name in (r["Duty_G0"] + "," + r["Duty_G1"]).split(","):
-            name = name.strip()
-            if name:
-                if df_ann.loc[df_ann["Name"] == name, shift].iat[0] != 0:
-                    warnings.append(f"{name} {shift} は元が 0 でない")
-                df_ann.loc[df_ann["Name"] == name, shift] = 3
-        # OC
-        if r["Oncall_G0"]:
-            name = r["Oncall_G0"]
-            if df_ann.loc[df_ann["Name"] == name, shift].iat[0] != 0:
-                warnings.append(f"{name} {shift} (OC) は元が 0 でない")
-            df_ann.loc[df_ann["Name"] == name, shift] = 4
-
-    # ---------- ダウンロード ----------
-    with tempfile.TemporaryDirectory() as tmp:
-        # 1) Excel
-        excel_path = os.path.join(tmp, "schedule.xlsx")
-        with pd.ExcelWriter(excel_path) as w:
-            sched.to_excel(w, sheet_name="Schedule", index=False)
-            summary.to_excel(w, sheet_name="Summary")
-        with open(excel_path, "rb") as f:
-            st.download_button("Excel をダウンロード", f, "schedule.xlsx")
-
-        # 2) カレンダー
-        cal_path = os.path.join(tmp, "pretty_calendar.xlsx")
-        generate_pretty_calendar(sched, int(year), int(month), set(), cal_path)
-        with open(cal_path, "rb") as f:
-            st.download_button("カレンダーをダウンロード", f, "pretty_calendar.xlsx")
-
-        # 3) 注釈入り CSV
-        csv_path = os.path.join(tmp, "availability_annotated.csv")
-        df_ann.to_csv(csv_path, index=False, encoding="cp932")
-        with open(csv_path, "rb") as f:
-            st.download_button("注釈入り CSV をダウンロード", f, "availability_annotated.csv")
-
-    # 元が 0 でなかったセルがあれば警告
-    if warnings:
-        st.warning("上書き時に元が 0 でなかったセルがあります:\\n" + "\\n".join(warnings))
+        published_file = st.file_uploader("公開済みの schedule.xlsx（同じ月・任意）", type="xlsx")
+        goal = None if published_file else fairness_settings()
+        if goal is None and not published_file:
+            alternatives, min_distance = alternative_settings()
+    elif mode == "loose":  # 乱数を変えた greedy を何回か回して一番よいものを採る
+        restarts = st.number_input("greedy の再試行回数", min_value=1, max_value=1024, value=64, step=1)
+    else:  # flow も同点の順番だけ乱数で変えて何回か解く
+        restarts = st.number_input("最小費用流の再試行回数", min_value=1, max_value=256, value=16, step=1)
+
+    key = make_key("month", csv_file.getvalue(), int(year), int(month), mode,
+                   prev_file.getvalue() if prev_file else b"",
+                   (config, goal, alternatives, min_distance) if mode == "strict" else (int(restarts), config.seed),
+                   published_file.getvalue() if published_file else b"")
+    perf_meta.update(mode=mode, year=int(year), month=int(month), doctors=len(df_raw), shifts=len(index.shifts))
+    with prof.stage("cache"):
+        hit = cache.get(key)
+    partial = False
+    if hit is not None:
+        results, diff = hit
+    elif published_file:
+        published = pd.read_excel(published_file, sheet_name="Schedule").fillna("")
+        result, diff = solve_in_background(
+            key, lambda job: pipeline.rebuild_schedule(df_raw, published, int(year), int(month), carry, config,
+                                                       index, job.progress, job.progress.cancelled),
+            config.time_limit, "ここで止めてそこまでの解を使う")
+        results = [result]
+        partial = st.session_state["job"].cancelled
+    elif mode == "strict":
+        # 解くのはバックグラウンド。公平性モードの打ち切りはそこまでの最良解を使う
+        results = solve_in_background(
+            key, lambda job: pipeline.build_schedule(df_raw, int(year), int(month), carry, config, index, job.prof,
+                                                     goal, job.watch, alternatives, min_distance,
+                                                     job.progress, job.progress.cancelled),
+            config.time_limit, "ここで止めて最良解を使う" if goal is not None else "キャンセル")
+        diff = None
+        partial = st.session_state["job"].cancelled
+    elif mode == "flow":
+        with prof.stage("flow"):
+            results, diff = [build_assignment_flow(df_raw, int(year), int(month), carry, int(restarts),
+                                                   config.seed, index, stats=prof.solver)], None
+        prof.solver.update(warnings=len(results[0].warnings))
+    else:  # loose（64 回でも 1 秒未満なので、プロセスプールは立ち上げより遅い。画面からは直列で）
+        with prof.stage("loose"):
+            results, diff = [build_assignment_loose(df_raw, int(year), int(month), carry, int(restarts),
+                                                    1, config.seed, index)], None
+        prof.solver.update(engine="loose", restarts=int(restarts), warnings=len(results[0].warnings))
+    if partial:
+        st.info("探索を途中で止めた時点の解です（最適とは限りません）。「もう一度解く」で最初から。")
+        if st.button("もう一度解く"):
+            del st.session_state["job"]
+            st.rerun()
+    if hit is None and not partial:
+        with prof.stage("cache_put"):
+            cache.put(key, (results, diff))
+    show_cache_stats()
+
+    # 別案があればタブで選ぶ。表・ダウンロードは開いているタブの案だけ作る
+    if len(results) > 1:
+        tabs = st.tabs([f"案 {n + 1}" for n in range(len(results))], key="alternative", on_change="rerun")
+        sel = next((n for n, t in enumerate(tabs) if t.open), 0)
+        view = tabs[sel]
+    else:
+        sel, view = 0, st.container()
+    result = results[sel]
+    with view:
+        if sel:
+            st.caption(f"案 1 と {int((results[0].matrix != result.matrix).sum())} セル違います")
+        # 表・集計・書き出しはすべて割付行列 result から（同じ割付なら作ったものを使い回す）
+        bundle = export_bundle(key, sel, result, df_raw, int(year), int(month), index, mode != "strict")
+        with prof.stage("tables"):
+            sched = bundle.schedule_df()
+            summary = bundle.summary_df()
+        # ▲▲ ここまで ▲▲
+
+        # ---------- 表示 ----------
+        if diff is not None:
+            st.subheader(f"公開済みからの変更（{len(diff)} 件）")
+            st.dataframe(diff, hide_index=True, use_container_width=True)
+        st.subheader("Schedule")
+        st.dataframe(sched, hide_index=True, use_container_width=True)
+        st.subheader("Summary")
+        st.dataframe(summary, use_container_width=True)
+
+        # ---------- ダウンロード（Excel・カレンダー・注釈入り CSV (Duty=3, OC=4)・1 ブック・ZIP） ----------
+        # ファイルは押されたときに別スレッドで作る（メモリ上だけ・割付ごとに 1 回）
+        for name, label in DOWNLOADS.items():
+            st.download_button(label, lambda name=name: bundle.get(name), name, on_click="ignore")
+        with prof.stage("annotate"):
+            warnings = bundle.warnings
+        prof.solver["export_s"] = dict(bundle.seconds)
+
+        # 元が 0 でなかったセルがあれば警告
+        if warnings:
+            st.warning("上書き時に元が 0 でなかったセルがあります:\\n" + "\\n".join(warnings))
+    job = st.session_state.get("job") if hit is None and (published_file or mode == "strict") else None
+    show_perf(job.token if job is not None else None,
+              result="cache" if hit is not None else "stopped" if partial else "solved")
 else:
     st.info("CSV をアップロードして年・月を指定してください。")
@@ -0,0 +1,168 @@
+"""複数の科の当直希望 CSV を、Streamlit なしでまとめて割り付ける。
+
+    python batch.py CSV_DIR --year 2025 --month 5 --out out/2025-05
+    python batch.py CSV_DIR --year 2025 --month 6 --out out/2025-06 --prev out/2025-05 --jobs 4
+
+CSV_DIR の *.csv（1 科 1 ファイル・cp932）をプロセスプールで解き、科ごとに
+OUT/<ファイル名>/ へ schedule.xlsx・pretty_calendar.xlsx・availability_annotated.csv を書く。
+--prev に前月の出力ディレクトリを渡すと、同じ科の schedule.xlsx から引継ぐ。
+最後に科ごとの結果（状態・段階ごとの秒数）を表示し、OUT/summary.csv にも残す。
+--time-limit は 1 科の CP-SAT の持ち時間で、解く方と解けない理由を探す方（explain）で分け合う。
+--time-limit 内に解が見つからなかった科は unsolved（infeasible と違い、不可能とは限らない）。
+--timeout 秒（実時間）で終わらない科は timeout として打ち切る。
+1 科でも ok 以外があれば終了コード 1。
+"""
+import argparse, os, sys, time, traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import pandas as pd
+
+from utils.fairness import FairnessGoal
+from utils.feasibility import issues_frame
+from utils.flow_scheduler import build_assignment as build_assignment_flow
+from utils.horizon import Carry, next_month
+from utils.instrument import Profiler
+from utils.loose_scheduler import build_assignment as build_assignment_loose
+from utils.pipeline import Infeasible, TimedOut, build_schedule, export_files, improve_schedule
+from utils.shift_index import shift_index
+from utils.solver_config import SolverConfig
+
+EXPLAIN_SHARE = 0.25        # 持ち時間のうち、解けないときの理由探しに回す割合
+
+
+def run_job(path: str, year: int, month: int, mode: str, config: SolverConfig, out: str,
+            prev: str | None = None, restarts: int = 64) -> dict:
+    """1 科ぶん解いて書き出す（プロセスプールの中で動く）。例外は状態にして返す。"""
+    name = Path(path).stem
+    dest = Path(out) / name
+    prof = Profiler()
+    rec = {"department": name, "status": "ok", "message": "", "doctors": None, "warnings": 0}
+    t = time.perf_counter()
+    try:
+        with prof.stage("load"):
+            df_raw = pd.read_csv(path, encoding="cp932")
+        rec["doctors"] = len(df_raw)
+        index = shift_index(df_raw, year, month)
+        carry = None
+        prev_file = Path(prev) / name / "schedule.xlsx" if prev else None
+        if prev_file and prev_file.exists():
+            carry = Carry.from_schedule(pd.read_excel(prev_file, sheet_name="Schedule"),
+                                        *next_month(year, month, -1))
+        if mode == "strict":
+            result = build_schedule(df_raw, year, month, carry, config, index, prof)[0]
+        elif mode in ("flow", "lns"):
+            with prof.stage("flow"):
+                result = build_assignment_flow(df_raw, year, month, carry, restarts, config.seed, index,
+                                               stats=prof.solver)
+            if mode == "lns":
+                # flow の割付から始めて、strict のルールで公平性を窓ごとに上げる
+                result = improve_schedule(df_raw, result, year, month, carry, config, index, prof, FairnessGoal())
+        else:
+            with prof.stage("loose"):
+                result = build_assignment_loose(df_raw, year, month, carry, restarts, 1, config.seed, index)
+        files, warnings = export_files(result, df_raw, year, month, index, total=mode in ("loose", "flow"),
+                                       prof=prof)
+        dest.mkdir(parents=True, exist_ok=True)
+        for fname, data in files.items():
+            (dest / fname).write_bytes(data)
+        rec["warnings"] = len(warnings)
+    except Infeasible as e:
+        rec.update(status="infeasible", message=e.message)
+        if e.issues:
+            dest.mkdir(parents=True, exist_ok=True)
+            issues_frame(e.issues).to_csv(dest / "infeasible.csv", index=False, encoding="utf-8-sig")
+    except TimedOut as e:                      # --time-limit 内に解けなかった（不可能とは限らない）
+        rec.update(status="unsolved", message=e.message)
+    except ValueError as e:                    # 列名が年月と合わない・読めない
+        rec.update(status="invalid", message=str(e).replace("\n", " / "))
+    except Exception as e:
+        rec.update(status="error", message=f"{type(e).__name__}: {e}")
+        traceback.print_exc(file=sys.stderr)
+    rec["seconds"] = round(time.perf_counter() - t, 3)
+    rec.update({f"{s.name}_s": round(s.seconds, 3) for s in prof.stages})
+    rec["solver_status"] = prof.solver.get("status", "")
+    return rec
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="科ごとの当直希望 CSV をまとめて割り付ける")
+    ap.add_argument("csv_dir")
+    ap.add_argument("--year", type=int, required=True)
+    ap.add_argument("--month", type=int, required=True)
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--prev", help="前月の出力ディレクトリ（科ごとの schedule.xlsx から引継ぐ）")
+    ap.add_argument("--mode", choices=("strict", "loose", "flow", "lns"), default="strict")
+    ap.add_argument("--time-limit", type=float, default=60.0,
+                    help="1 科あたりの CP-SAT の持ち時間 [秒]（解く方と explain で分ける）")
+    ap.add_argument("--timeout", type=float, help="1 科あたりの実時間の上限 [秒]（既定は --time-limit + 60）")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="同時に解く科の数")
+    ap.add_argument("--restarts", type=int, default=64, help="loose / flow の再試行回数")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    paths = sorted(str(p) for p in Path(args.csv_dir).glob("*.csv"))
+    if not paths:
+        print(f"{args.csv_dir} に CSV がありません", file=sys.stderr)
+        return 1
+    jobs = max(1, min(args.jobs, len(paths)))
+    # コアを科で分け合う（CP-SAT の並列数 × 同時に解く科の数 ≒ コア数）。持ち時間は解く方と explain で分ける
+    config = SolverConfig(args.time_limit * (1 - EXPLAIN_SHARE), max(1, (os.cpu_count() or 1) // jobs), args.seed,
+                          explain_limit=args.time_limit * EXPLAIN_SHARE)
+    timeout = args.timeout or args.time_limit + 60
+    t = time.perf_counter()
+    rows = []
+
+    def done(rec):
+        rows.append(rec)
+        print(f"{rec['department']:<20} {rec['status']:<10} {rec['seconds']:>7.2f}s {rec['message']}",
+              file=sys.stderr, flush=True)
+
+    # 空いているワーカーの数だけ投げ、投げた時刻から timeout 秒で打ち切る（止まったワーカーは空かない）
+    ex = ProcessPoolExecutor(max_workers=jobs)
+    queue, running, stuck = list(paths), {}, 0
+    try:
+        while queue or running:
+            while queue and len(running) + stuck < jobs:
+                p = queue.pop(0)
+                f = ex.submit(run_job, p, args.year, args.month, args.mode, config, args.out, args.prev,
+                              args.restarts)
+                running[f] = (p, time.perf_counter())
+            if not running:                       # ワーカーが全部止まった：残りは投げられない
+                for p in queue:
+                    done({"department": Path(p).stem, "status": "timeout", "seconds": 0.0,
+                          "message": "ワーカーが空かず未実行"})
+                break
+            first = min(s for _, s in running.values())
+            finished, _ = wait(running, timeout=max(0.0, first + timeout - time.perf_counter()),
+                               return_when=FIRST_COMPLETED)
+            for f in finished:
+                running.pop(f)
+                done(f.result())
+            now = time.perf_counter()
+            for f, (p, s) in list(running.items()):
+                if now - s >= timeout:
+                    running.pop(f)
+                    stuck += 1
+                    done({"department": Path(p).stem, "status": "timeout", "seconds": round(now - s, 3),
+                          "message": f"{timeout:g} 秒で終わらず打ち切り"})
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+        if stuck:
+            # 3.11 の ProcessPoolExecutor には止まったワーカーを止める公開 API がない
+            for proc in list((getattr(ex, "_processes", None) or {}).values()):
+                proc.terminate()
+
+    report = pd.DataFrame(rows).sort_values("department").set_index("department")
+    Path(args.out).mkdir(parents=True, exist_ok=True)
+    report.to_csv(Path(args.out) / "summary.csv", encoding="utf-8-sig")
+    cols = [c for c in ("status", "doctors", "seconds", "solve_s", "loose_s", "flow_s", "lns_s", "warnings", "message") if c in report]
+    print(report[cols].to_string())
+    counts = report["status"].value_counts()
+    print(f"\n{len(report)} 科 / {time.perf_counter() - t:.1f} 秒 / "
+          + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    return 0 if (report["status"] == "ok").all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
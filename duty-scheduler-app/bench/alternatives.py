@@ -0,0 +1,54 @@
+"""別案 K 個：1 つのモデルで解き直す vs シードを変えて K 回まるごと解く。
+
+    python -m bench.alternatives [--k 5] [--distance 20]
+
+まるごとの方は同じ案が出ることもあるので、互いに違う案の数も出す。
+"""
+import argparse, time
+
+import pandas as pd
+
+from bench.synthetic import roster
+from utils.feasibility import precheck
+from utils.loose_scheduler import warm_start
+from utils.shift_index import shift_index
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model, extract_assignment, solve_alternatives, solve_strict_model
+
+
+def distinct(mats) -> int:
+    return len({m.tobytes() for m in mats})
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--distance", type=int, default=20)
+    args = ap.parse_args(argv)
+    config = SolverConfig(time_limit=10, workers=1)
+    cases = [("sample", 2025, 5, pd.read_csv("sample/availability_sample.csv", encoding="cp932"))]
+    cases += [(f"synthetic {n}", *roster(n, 31, density=d)) for n, d in ((30, 0.7), (34, 0.8))]
+    print(f"{'case':>14} {'session[s]':>10} {'found':>5} {'min dist':>8} {'K runs[s]':>9} {'distinct':>8}")
+    for name, y, m, df in cases:
+        index = shift_index(df, y, m)
+        t = time.perf_counter()
+        precheck(df, index=index)
+        sm = build_strict_model(df, index=index)
+        warm_start(sm, df, y, m)
+        alts = solve_alternatives(sm, args.k, args.distance, config)
+        session = time.perf_counter() - t
+        dist = min((int((a.matrix != b.matrix).sum()) for k, a in enumerate(alts) for b in alts[:k]), default=0)
+
+        t, mats = time.perf_counter(), []
+        for seed in range(args.k):
+            precheck(df, index=index)
+            sm = build_strict_model(df, index=index)
+            warm_start(sm, df, y, m)
+            solver = solve_strict_model(sm, SolverConfig(time_limit=10, workers=1, seed=seed))
+            mats.append(extract_assignment(sm, solver).matrix)
+        runs = time.perf_counter() - t
+        print(f"{name:>14} {session:>10.2f} {len(alts):>5} {dist:>8} {runs:>9.2f} {distinct(mats):>8}")
+
+
+if __name__ == "__main__":
+    main()
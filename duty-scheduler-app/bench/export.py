@@ -0,0 +1,45 @@
+"""書き出し：再実行のたびに 3 ファイルを作る（従来）vs ExportBundle（表・警告だけ毎回、ファイルは押されたときに 1 回）。
+
+    python -m bench.export [--reruns 20]
+
+1 回ダウンロードされるまでに画面が reruns 回再実行される想定で、合計時間を比べる。
+"""
+import argparse, time
+
+from bench.synthetic import make_availability
+from utils.loose_scheduler import build_assignment
+from utils.pipeline import BUNDLE, COMBINED, EXPORT_FILES, ExportBundle
+from utils.shift_index import shift_index
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reruns", type=int, default=20)
+    args = ap.parse_args(argv)
+    print(f"{'doctors':>7} {'every rerun [s]':>16} {'bundle [s]':>11} {'first files [s]':>16} "
+          f"{'combined [s]':>13} {'zip [s]':>8}")
+    for n in (30, 120, 400):
+        df = make_availability(n, seed=0)
+        index = shift_index(df, 2025, 5)
+        a = build_assignment(df, 2025, 5, restarts=1, workers=1, seed=0, index=index)
+        t = time.perf_counter()
+        for _ in range(args.reruns):                      # 従来：毎回作り直す
+            b = ExportBundle(a, df, 2025, 5, index, total=True)
+            b.schedule_df(), b.summary_df(), b.files(), b.warnings
+        every = time.perf_counter() - t
+
+        t = time.perf_counter()
+        b = ExportBundle(a, df, 2025, 5, index, total=True)
+        for _ in range(args.reruns):                      # 表・警告は覚えたものを使う
+            b.schedule_df(), b.summary_df(), b.warnings
+        for name in EXPORT_FILES:                         # ダウンロードは 1 回ずつ
+            b.get(name)
+        bundle = time.perf_counter() - t
+        first = sum(b.seconds[name] for name in EXPORT_FILES)
+        b.get(COMBINED), b.get(BUNDLE)
+        print(f"{n:>7} {every:>16.3f} {bundle:>11.3f} {first:>16.3f} "
+              f"{b.seconds[COMBINED]:>13.3f} {b.seconds[BUNDLE]:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
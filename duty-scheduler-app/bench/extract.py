@@ -0,0 +1,58 @@
+"""解の取り出し + 注釈入り CSV：セルごとの solver.Value / 名前検索 vs 割付行列。
+
+    python -m bench.extract
+"""
+import datetime, statistics, time
+
+from bench.synthetic import make_availability
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model, extract_assignment, solve_strict_model
+
+
+def legacy(sm, solver, df_raw):
+    # 旧実装：変数ごとに solver.Value、名前をつないだ表を作り、名前で引いて注釈
+    rows = []
+    for j, s in enumerate(sm.shifts):
+        d0 = [sm.doctors[i] for i in range(len(sm.doctors)) if (i, j) in sm.x and sm.group[i] == 0 and solver.Value(sm.x[i, j])]
+        d1 = [sm.doctors[i] for i in range(len(sm.doctors)) if (i, j) in sm.x and sm.group[i] == 1 and solver.Value(sm.x[i, j])]
+        oc = [sm.doctors[i] for i in range(len(sm.doctors)) if (i, j) in sm.y and solver.Value(sm.y[i, j])]
+        rows.append({"Shift": s, "Duty_G0": ", ".join(d0), "Duty_G1": ", ".join(d1), "Oncall_G0": ", ".join(oc)})
+    duty = [sum(solver.Value(v) for (i, _), v in sm.x.items() if i == k) for k in range(len(sm.doctors))]
+    df_ann, warnings = df_raw.copy(), []
+    for r in rows:
+        for col, code in (("Duty_G0", 3), ("Duty_G1", 3), ("Oncall_G0", 4)):
+            for name in r[col].split(","):
+                name = name.strip()
+                if name:
+                    if df_ann.loc[df_ann["Name"] == name, r["Shift"]].iat[0] != 0:
+                        warnings.append(name)
+                    df_ann.loc[df_ann["Name"] == name, r["Shift"]] = code
+    return rows, duty, df_ann
+
+
+def matrix(sm, solver, df_raw):
+    a = extract_assignment(sm, solver)
+    return a.schedule_df(), a.summary_df(), a.annotate(df_raw)
+
+
+def main(reps=5):
+    print(f"{'months':>6} {'doctors':>7} {'legacy[s]':>10} {'matrix[s]':>10}")
+    for months, n, density in ((1, 30, 0.6), (3, 32, 0.6)):
+        df = make_availability(n, density=density, months=months)
+        starts = [(datetime.date(2025, 5 + k, 1) - datetime.date(2025, 5, 1)).days + 1 for k in range(months)]
+        sm = build_strict_model(df, month_starts=starts)
+        solver = solve_strict_model(sm, SolverConfig(time_limit=60))
+        if solver is None:
+            print(f"{months:>6} {n:>7} {'infeasible':>21}")
+            continue
+        res = {}
+        for name, fn in (("legacy", legacy), ("matrix", matrix)):
+            times = []
+            for _ in range(reps):
+                t = time.perf_counter(); fn(sm, solver, df); times.append(time.perf_counter() - t)
+            res[name] = statistics.median(times)
+        print(f"{months:>6} {n:>7} {res['legacy']:>10.3f} {res['matrix']:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""公平性の目的あり：最初の可行解と、時間ごとの最良解の幅を比べる。
+
+    python -m bench.fairness [--time-limit 20]
+
+Minimize(0) の従来 strict は最初の可行解で止まるので、その幅が「今まで」の値。
+"""
+import argparse
+
+from bench.synthetic import roster
+from utils.fairness import AnytimeSolve, FairnessGoal, add_fairness_objective
+from utils.loose_scheduler import warm_start
+from utils.shift_index import shift_index
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model
+
+
+def at(history, t):
+    # t 秒時点の最良解
+    done = [h for h in history if h.seconds <= t]
+    return done[-1] if done else None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--time-limit", type=float, default=20.0)
+    args = ap.parse_args(argv)
+    goal = FairnessGoal(total_target=0, holiday_target=0)       # 打ち切らずに時間いっぱい
+    marks = (1, 5, args.time_limit)
+    print(f"{'doctors':>7} {'density':>7} {'first':>12} " + " ".join(f"{f'@{t:g}s':>9}" for t in marks) + "  reason")
+    for n, density in ((30, 0.7), (34, 0.8), (36, 0.6)):
+        y, m, df = roster(n, 31, density=density, holidays="random-2")
+        index = shift_index(df, y, m)
+        sm = build_strict_model(df, index=index)
+        warm_start(sm, df, y, m)
+        run = AnytimeSolve(sm, add_fairness_objective(sm, goal), SolverConfig(time_limit=args.time_limit))
+        if run.solve() is None:
+            print(f"{n:>7} {density:>7} {'infeasible':>12}")
+            continue
+        h = run.callback.history
+        cells = [at(h, t) for t in marks]
+        fmt = lambda x: f"{x.total_spread}/{x.holiday_spread}" if x else "-"
+        print(f"{n:>7} {density:>7} {fmt(h[0]) + f' {h[0].seconds:.1f}s':>12} "
+              + " ".join(f"{fmt(c):>9}" for c in cells) + f"  {run.stats['reason']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""loose のルール：greedy（64 回）と最小費用流（16 回）の時間・結果の質（空きコマ / ONCALL-MISSING / 回数不足）。
+
+    python -m bench.flow
+
+bound-filled は流れの緩和で埋まったコマ数（どう組んでもこれ以上は埋まらない）と採った解のコマ数の差（最大）。
+late は流れのあとの greedy・入れ替えで埋めたコマ数（合計）、gaps>greedy は flow の空きコマが greedy より多かった回数。
+"""
+import statistics, time
+
+from bench.synthetic import make_availability
+from utils.flow_scheduler import solve_flow
+from utils.loose_scheduler import make_instance, run_restarts
+
+
+def main(seeds=range(5)):
+    print(f"{'doctors':>7} {'density':>7} {'greedy [s]':>10} {'flow [s]':>9} "
+          f"{'greedy score':>14} {'flow score':>14} {'bound-filled':>12} {'late':>4} {'gaps>greedy':>11}  flow better/same/worse")
+    for n, density, g1 in ((24, 0.3, 1 / 3), (30, 0.2, 1 / 3), (40, 0.15, 1 / 3), (30, 0.7, 1 / 3),
+                           (120, 0.5, 0.2), (300, 0.5, 0.1), (500, 0.3, 0.05)):
+        tg, tf, sg, sf, fill, late, cmp = [], [], [], [], [], [], [0, 0, 0]
+        for seed in seeds:
+            inst, _ = make_instance(make_availability(n, density=density, g1_ratio=g1, seed=seed), 2025, 5)
+            t = time.perf_counter()
+            g = run_restarts(inst, 64, 1, seed=0)
+            tg.append(time.perf_counter() - t)
+            stats = {}
+            t = time.perf_counter()
+            f = solve_flow(inst, 16, 0, stats)
+            tf.append(time.perf_counter() - t)
+            sg.append(g.score(inst))
+            sf.append(f.score(inst))
+            fill.append(stats["relaxed_slots"] - stats["filled_slots"])
+            late.append(stats["leftover_filled"])
+            cmp[(f.score(inst) > g.score(inst)) - (f.score(inst) < g.score(inst)) + 1] += 1
+        med = lambda scores: str(tuple(statistics.median(s[k] for s in scores) for k in range(3)))
+        print(f"{n:>7} {density:>7} {statistics.median(tg):>10.3f} {statistics.median(tf):>9.3f} "
+              f"{med(sg):>14} {med(sf):>14} {max(fill):>12} {sum(late):>4} "
+              f"{sum(a[0] > b[0] for a, b in zip(sf, sg)):>11}  {cmp[0]}/{cmp[1]}/{cmp[2]}")
+
+
+if __name__ == "__main__":
+    main()
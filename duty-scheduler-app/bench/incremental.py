@@ -0,0 +1,55 @@
+"""公開後の可用性変更：差分再割付 vs 最初から解き直し。
+
+    python -m bench.incremental
+
+割付済みのセルを k 個「NG」に書き換え、かかった時間と前回からの変更セル数を比べる。
+"""
+import random, statistics, time
+
+from bench.synthetic import make_availability
+from utils.incremental import resolve_incremental, schedule_diff
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model, extract_schedule, solve_strict_model
+
+
+def cold(df, config):
+    sm = build_strict_model(df)
+    solver = solve_strict_model(sm, config)
+    return None if solver is None else extract_schedule(sm, solver)[0]
+
+
+def main(seeds=range(5), config=SolverConfig(time_limit=20, greedy_hint=False)):
+    print(f"{'doctors':>7} {'edits':>5} {'impl':>11} {'ok':>4} {'time med[s]':>12} {'changes med':>12}")
+    for n, density in ((30, 0.6), (35, 0.55)):
+        for k in (1, 3):
+            stats = {"cold": ([], [], 0), "incremental": ([], [], 0)}
+            for seed in seeds:
+                df = make_availability(n, density=density, seed=seed, g1_ratio=0.3)
+                prev = cold(df, config)
+                if prev is None:
+                    continue
+                rng = random.Random(seed)
+                edited = df.copy()
+                for _ in range(k):                       # 割付済みのセルを NG に
+                    r = prev.iloc[rng.randrange(len(prev))]
+                    name = (r["Duty_G0"] or r["Duty_G1"]).split(",")[0].strip()
+                    edited.loc[edited["Name"] == name, r["Shift"]] = 1
+                for impl in stats:
+                    t = time.perf_counter()
+                    if impl == "cold":
+                        sched = cold(edited, config)
+                    else:
+                        res = resolve_incremental(edited, prev, config=config)
+                        sched = None if res is None else res[0].schedule_df()
+                    times, changes, ok = stats[impl]
+                    times.append(time.perf_counter() - t)
+                    if sched is not None:
+                        changes.append(len(schedule_diff(prev, sched)))
+                        stats[impl] = (times, changes, ok + 1)
+            for impl, (times, changes, ok) in stats.items():
+                print(f"{n:>7} {k:>5} {impl:>11} {ok:>4} {statistics.median(times):>12.2f}"
+                      f" {statistics.median(changes) if changes else float('nan'):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""公平性の改善：モデル全体を 1 回で解く（AnytimeSolve）vs 窓ごとに解き直す LNS。時間ごとの目的値。
+
+    python -m bench.lns [--time-limit 20] [--workers 1]
+
+どちらも greedy（loose）の割付から始める（全体の方はヒントとして、LNS は出発点として）。
+目的値は add_fairness_objective と同じ（10 × Duty+Oncall の幅 + -1 の幅、グループの合計）。
+"""
+import argparse, time
+
+from bench.synthetic import roster
+from utils.fairness import AnytimeSolve, FairnessGoal, add_fairness_objective
+from utils.lns import lns_improve
+from utils.loose_scheduler import build_assignment, warm_start
+from utils.model_template import build_from_template
+from utils.shift_index import shift_index
+from utils.solver_config import SolverConfig
+
+
+def at(history, t):
+    # t 秒時点の最良の目的値
+    done = [h.objective for h in history if h.seconds <= t]
+    return f"{done[-1]:g}" if done else "-"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--time-limit", type=float, default=20.0)
+    ap.add_argument("--workers", type=int, default=1)
+    args = ap.parse_args(argv)
+    goal = FairnessGoal(total_target=0, holiday_target=0)       # 打ち切らずに時間いっぱい
+    marks = (0.5, 1, 2, 5, args.time_limit)
+    head = " ".join(f"{f'@{t:g}s':>6}" for t in marks)
+    print(f"{'doctors':>7} {'density':>7} {'engine':>7} {head}  note")
+    for n, density in ((30, 0.7), (34, 0.8), (36, 0.6), (40, 0.8), (40, 0.5)):
+        y, m, df = roster(n, 31, density=density, holidays="random-2")
+        index = shift_index(df, y, m)
+        # どちらも秒数は前処理（組み立て・ヒント / greedy）込み
+        t = time.perf_counter()
+        sm = build_from_template(df, index=index)
+        warm_start(sm, df, y, m)
+        run = AnytimeSolve(sm, add_fairness_objective(sm, goal), SolverConfig(args.time_limit, args.workers))
+        pre = time.perf_counter() - t
+        run.solve()
+        print(f"{n:>7} {density:>7} {'full':>7} " + " ".join(f"{at(run.callback.history, t - pre):>6}" for t in marks)
+              + f"  {run.stats['reason']}, bound {run.stats['bound']}")
+
+        t = time.perf_counter()
+        start = build_assignment(df, y, m, restarts=1, workers=1, seed=0, index=index)
+        pre = time.perf_counter() - t
+        res = lns_improve(df, start, index, goal=goal, time_budget=args.time_limit - pre, workers=args.workers)
+        s = res.stats
+        print(f"{'':>7} {'':>7} {'lns':>7} " + " ".join(f"{at(res.history, t - pre):>6}" for t in marks)
+              + f"  {s['rounds']} rounds, {s['accepted']} accepted" + (", repaired start" if s["repaired"] else ""))
+
+
+if __name__ == "__main__":
+    main()
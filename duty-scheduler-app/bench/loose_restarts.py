@@ -0,0 +1,27 @@
+"""loose の greedy：再試行回数・並列数と、結果の質（空きコマ / ONCALL-MISSING / 回数不足）。
+
+    python -m bench.loose_restarts
+"""
+import statistics, time
+
+from bench.synthetic import make_availability
+from utils.loose_scheduler import make_instance, run_restarts
+
+
+def main(seeds=range(5)):
+    print(f"{'doctors':>7} {'density':>7} {'restarts':>8} {'workers':>7} {'time med[s]':>12} {'score med':>18}")
+    for n, density in ((30, 0.6), (40, 0.4), (60, 0.3)):
+        for restarts, workers in ((1, 1), (16, 1), (64, 1), (64, 4), (256, 4)):
+            times, scores = [], []
+            for seed in seeds:
+                inst, _ = make_instance(make_availability(n, density=density, seed=seed), 2025, 5)
+                t = time.perf_counter()
+                r = run_restarts(inst, restarts, workers, seed=seed)
+                times.append(time.perf_counter() - t)
+                scores.append(r.score(inst))
+            med = tuple(statistics.median(s[k] for s in scores) for k in range(3))
+            print(f"{n:>7} {density:>7} {restarts:>8} {workers:>7} {statistics.median(times):>12.3f} {str(med):>18}")
+
+
+if __name__ == "__main__":
+    main()
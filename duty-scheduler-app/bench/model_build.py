@@ -0,0 +1,80 @@
+"""strict モデル構築の旧実装との比較。
+
+    python -m bench.model_build
+"""
+import re, time
+from ortools.sat.python import cp_model
+
+from bench.synthetic import make_availability
+from utils.strict_model import build_strict_model
+
+
+def build_model_legacy(df_raw):
+    # 変更前の app.build_schedule のモデル構築部分（比較用にそのまま残す）
+    doctors = df_raw["Name"].tolist()
+    group   = df_raw.set_index("Name")["Group"].to_dict()
+    avail   = 1 - df_raw.drop(columns=["Group", "Name"])
+    shifts = sorted(
+        avail.columns,
+        key=lambda c: (int(re.match(r"(\d+)", c).group(1)),
+                       int(re.search(r"-(\d)", c).group(1)) if "-" in c else 0)
+    )
+    day_of = {c: int(re.match(r"(\d+)", c).group(1)) for c in shifts}
+    sub_of = {c: int(re.search(r"-(\d)", c).group(1)) if "-" in c else 0 for c in shifts}
+    m = cp_model.CpModel()
+    x, y = {}, {}
+    for d in doctors:
+        for s in shifts:
+            x[d, s] = m.NewBoolVar(f"x_{d}_{s}")
+            y[d, s] = m.NewBoolVar(f"y_{d}_{s}")
+            if avail.loc[df_raw["Name"] == d, s].iat[0] == 0:
+                m.Add(x[d, s] == 0)
+                m.Add(y[d, s] == 0)
+    for s in shifts:
+        if sub_of[s] == 1:
+            m.Add(sum(x[d, s] for d in doctors if group[d] == 0) == 1)
+            m.Add(sum(x[d, s] for d in doctors if group[d] == 1) == 1)
+            m.Add(sum(y[d, s] for d in doctors) == 0)
+        else:
+            m.Add(sum(x[d, s] for d in doctors) == 1)
+            m.Add(sum(y[d, s] for d in doctors if group[d] == 0)
+                  == sum(x[d, s] for d in doctors if group[d] == 1))
+            m.Add(sum(y[d, s] for d in doctors if group[d] == 1) == 0)
+    for d in doctors:
+        duty_cnt   = sum(x[d, s] for s in shifts)
+        oncall_cnt = sum(y[d, s] for s in shifts)
+        if group[d] == 1:
+            m.Add(duty_cnt == 2)
+            m.Add(oncall_cnt == 0)
+        else:
+            m.Add(duty_cnt >= 1)
+            m.Add(duty_cnt <= 2)
+            m.Add(oncall_cnt <= 2)
+    for d in doctors:
+        for i, s1 in enumerate(shifts):
+            for s2 in shifts[i + 1:]:
+                if 1 <= day_of[s2] - day_of[s1] <= 2:
+                    m.Add(x[d, s1] + y[d, s1] + x[d, s2] + y[d, s2] <= 1)
+    return m
+
+
+def model_size(m: cp_model.CpModel):
+    p = m.Proto()
+    return len(p.variables), len(p.constraints)
+
+
+def main():
+    print(f"{'doctors':>7} {'impl':>6} {'build[s]':>9} {'vars':>7} {'cons':>8}")
+    for n in (30, 75, 150, 300):
+        df = make_availability(n, seed=n)
+        for name, build in (("legacy", build_model_legacy),
+                            ("sparse", lambda d: build_strict_model(d).model)):
+            t = time.perf_counter()
+            m = build(df)
+            dt = time.perf_counter() - t
+            v, c = model_size(m)
+            print(f"{n:>7} {name:>6} {dt:>9.3f} {v:>7} {c:>8}")
+
+
+if __name__ == "__main__":
+    main()
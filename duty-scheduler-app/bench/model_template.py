@@ -0,0 +1,59 @@
+"""what-if（可用性を数セルずつ変えて解き直す）：毎回 build_strict_model vs モデルの型を複製して固定。
+
+    python -m bench.model_template [--edits 20]
+
+型の初回（compile）は 1 回だけ。build は組み立ての中央値、solve は CP-SAT（ヒントなし）の中央値。
+"""
+import argparse, statistics, time
+
+import numpy as np
+
+from bench.synthetic import roster
+from utils.model_template import TemplateCache, build_from_template
+from utils.shift_index import shift_index
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model, solve_strict_model
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--edits", type=int, default=20)
+    args = ap.parse_args(argv)
+    config = SolverConfig(time_limit=30, workers=1)
+    print(f"{'doctors':>7} {'compile [s]':>11} {'build [s]':>10} {'template [s]':>12} "
+          f"{'solve [s]':>10} {'solve tmpl [s]':>14} {'same status':>11}")
+    for n in (30, 34, 36):
+        y, m, df = roster(n, 31, density=0.8, seed=0)
+        index = shift_index(df, y, m)
+        cache = TemplateCache()
+        t = time.perf_counter()
+        build_from_template(df, index=index, cache=cache)
+        compile_s = time.perf_counter() - t
+        rng = np.random.default_rng(0)
+        cols = df.columns[2:]
+        build, tmpl, solve, solve_t, same = [], [], [], [], 0
+        for _ in range(args.edits):
+            # 数セルだけ NG / 可を入れ替える（同じロースター・同じ月）
+            i, j = rng.integers(len(df), size=3), rng.integers(len(cols), size=3)
+            for a, b in zip(i, j):
+                df.loc[a, cols[b]] = 1 - df.loc[a, cols[b]]
+            t = time.perf_counter()
+            sm = build_strict_model(df, index=index)
+            build.append(time.perf_counter() - t)
+            st = {}
+            solve_strict_model(sm, config, stats=st)
+            solve.append(st["wall_time"])
+            t = time.perf_counter()
+            sm_t = build_from_template(df, index=index, cache=cache)
+            tmpl.append(time.perf_counter() - t)
+            st_t = {}
+            solve_strict_model(sm_t, config, stats=st_t)
+            solve_t.append(st_t["wall_time"])
+            same += st["status"] == st_t["status"]
+        med = statistics.median
+        print(f"{n:>7} {compile_s:>11.3f} {med(build):>10.4f} {med(tmpl):>12.4f} "
+              f"{med(solve):>10.3f} {med(solve_t):>14.3f} {f'{same}/{args.edits}':>11}")
+
+
+if __name__ == "__main__":
+    main()
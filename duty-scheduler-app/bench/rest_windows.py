@@ -0,0 +1,56 @@
+"""間隔制約: 旧ペア列挙 vs 窓ごとの AtMostOne。
+
+    python -m bench.rest_windows
+
+1 か月 ≒ 30 人として、1/3/6 か月ぶんを通し番号の 1 本のモデルで比較する。
+"""
+import statistics, time
+from ortools.sat.python import cp_model
+
+from bench.synthetic import make_availability
+from utils.rest_rules import STRICT_GAP
+from utils.strict_model import build_strict_model
+
+
+def add_rest_pairwise(sm, gap=STRICT_GAP):
+    # 変更前のペア列挙（可セルのみ）
+    m, x, y = sm.model, sm.x, sm.y
+    for i in range(len(sm.doctors)):
+        cols = [j for j in range(len(sm.shifts)) if sm.avail[i, j]]
+        for a, j1 in enumerate(cols):
+            for j2 in cols[a + 1:]:
+                if 1 <= sm.day[j2] - sm.day[j1] <= gap - 1:
+                    m.Add(sum(v for v in (x.get((i, j1)), y.get((i, j1)),
+                                          x.get((i, j2)), y.get((i, j2))) if v is not None) <= 1)
+
+
+def build(df, impl):
+    if impl == "window":
+        return build_strict_model(df)
+    sm = build_strict_model(df, gap=1)          # 間隔なしで作ってから旧方式を足す
+    add_rest_pairwise(sm)
+    return sm
+
+
+def main(time_limit=30.0, seeds=(0, 1, 2)):
+    # 解く時間は乱数シードでばらつくので中央値で見る
+    print(f"{'months':>6} {'impl':>8} {'build[s]':>9} {'cons':>8} {'solved':>7} {'solve[s] med':>13}")
+    for months in (1, 3, 6):
+        for impl in ("pairwise", "window"):
+            builds, cons, solved, walls = [], [], 0, []
+            for seed in seeds:
+                df = make_availability(30 * months, months=months, density=0.6, seed=seed)
+                t = time.perf_counter()
+                sm = build(df, impl)
+                builds.append(time.perf_counter() - t)
+                cons.append(len(sm.model.Proto().constraints))
+                solver = cp_model.CpSolver()
+                solver.parameters.max_time_in_seconds = time_limit
+                solved += solver.Solve(sm.model) in (cp_model.OPTIMAL, cp_model.FEASIBLE, cp_model.INFEASIBLE)
+                walls.append(solver.WallTime())
+            print(f"{months:>6} {impl:>8} {statistics.median(builds):>9.3f} {int(statistics.median(cons)):>8}"
+                  f" {solved:>3}/{len(seeds):<3} {statistics.median(walls):>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
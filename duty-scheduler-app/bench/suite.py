@@ -0,0 +1,136 @@
+"""合成ロースターでの段階別ベンチマーク（strict / loose）。
+
+    python -m bench.suite                       # 既定のグリッド、JSON lines を標準出力へ
+    python -m bench.suite --quick --out a.jsonl
+    python -m bench.suite --compare a.jsonl b.jsonl
+
+段階: load（CSV 読込）/ index / build / solve / extract / annotate / excel / calendar。
+1 行 = 1 シナリオ × モード × 段階で、seconds と peak_mib（tracemalloc。CP-SAT 内部の
+C++ 側のメモリは含まない）を出す。時間はメモリ計測なしのパスで、メモリは別のパスで測る。
+"""
+import argparse, io, itertools, json, subprocess, sys, time, tracemalloc
+
+import pandas as pd
+
+from bench.synthetic import roster, to_csv_bytes
+from utils.feasibility import precheck
+from utils.generate_calendar import generate_pretty_calendar
+from utils.loose_scheduler import make_instance, run_restarts
+from utils.shift_index import shift_index
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model, extract_assignment, solve_strict_model
+
+PHASES = ("load", "index", "build", "solve", "extract", "annotate", "excel", "calendar")
+GRID = {"doctors": (24, 30, 36), "g1_ratio": (0.33,), "density": (0.5, 0.8),
+        "month_length": (28, 31), "holidays": ("none", "random-2")}
+QUICK = {"doctors": (20, 30), "g1_ratio": (0.33,), "density": (0.7,),
+         "month_length": (31,), "holidays": ("none",)}
+
+
+def version() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def pipeline(mode: str, year: int, month: int, data: bytes, config: SolverConfig):
+    """アプリと同じ順に段階を回す generator（段階名, 結果の要約）を yield する。"""
+    df = pd.read_csv(io.BytesIO(data), encoding="cp932")
+    yield "load", {}
+    index = shift_index(df, year, month)
+    yield "index", {"shifts": len(index.shifts)}
+    if mode == "strict":
+        issues = precheck(df, index=index)
+        sm = None if issues else build_strict_model(df, index=index)
+        yield "build", {"precheck": len(issues),
+                        "vars": len(sm.model.Proto().variables) if sm else 0}
+        solver = None if sm is None else solve_strict_model(sm, config)
+        yield "solve", {"status": "FEASIBLE" if solver else "INFEASIBLE"}
+        if solver is None:
+            return
+        a = extract_assignment(sm, solver)
+    else:
+        inst, shifts = make_instance(df, year, month, index=index)
+        yield "build", {}
+        r = run_restarts(inst, 64, 1, seed=0)
+        yield "solve", {"score": list(r.score(inst))}
+        a = r.to_assignment(df["Name"].tolist(), inst.group, shifts)
+    sched, summary = a.schedule_df(), a.summary_df()
+    yield "extract", {}
+    a.annotate(df)[0].to_csv(io.BytesIO(), index=False, encoding="cp932")
+    yield "annotate", {}
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf) as w:
+        sched.to_excel(w, sheet_name="Schedule", index=False)
+        summary.to_excel(w, sheet_name="Summary")
+    yield "excel", {"bytes": len(buf.getvalue())}
+    yield "calendar", {"bytes": len(generate_pretty_calendar(sched, year, month, index=index))}
+
+
+def run(mode, year, month, data, config, memory: bool):
+    # 段階ごとの (秒, ピーク MiB, 要約)
+    out = {}
+    if memory:
+        tracemalloc.start()
+    t = time.perf_counter()
+    for phase, info in pipeline(mode, year, month, data, config):
+        now = time.perf_counter()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20 if memory else None
+        out[phase] = (now - t, peak, info)
+        if memory:
+            tracemalloc.reset_peak()
+        t = time.perf_counter()
+    if memory:
+        tracemalloc.stop()
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--quick", action="store_true")
+    ap.add_argument("--out", help="JSON lines の出力先（省略時は標準出力）")
+    ap.add_argument("--modes", default="strict,loose")
+    ap.add_argument("--time-limit", type=float, default=10.0)
+    ap.add_argument("--no-memory", action="store_true")
+    ap.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = ap.parse_args(argv)
+    if args.compare:
+        return compare(*args.compare)
+
+    grid = QUICK if args.quick else GRID
+    config = SolverConfig(time_limit=args.time_limit, workers=1, greedy_hint=False)
+    rev = version()
+    out = open(args.out, "w") if args.out else sys.stdout
+    for values in itertools.product(*grid.values()):
+        params = dict(zip(grid, values))
+        year, month, df = roster(params["doctors"], params["month_length"], params["g1_ratio"],
+                                 params["density"], params["holidays"])
+        data = to_csv_bytes(df)
+        for mode in args.modes.split(","):
+            timed = run(mode, year, month, data, config, memory=False)
+            mem = {} if args.no_memory else run(mode, year, month, data, config, memory=True)
+            for phase, (sec, _, info) in timed.items():
+                rec = {"version": rev, "mode": mode, **params, "phase": phase, "seconds": round(sec, 5),
+                       "peak_mib": round(mem[phase][1], 3) if phase in mem else None, **info}
+                print(json.dumps(rec, ensure_ascii=False), file=out, flush=True)
+            total = sum(v[0] for v in timed.values())
+            print(f"{mode:>6} {params} {total:.2f}s", file=sys.stderr)
+    if out is not sys.stdout:
+        out.close()
+
+
+def compare(before: str, after: str):
+    """2 つの結果ファイルを、両方にあるシナリオだけで (モード, 段階) ごとの合計時間で比べる。"""
+    keys = ["mode", *GRID, "phase"]
+    b, a = (pd.read_json(p, lines=True)[keys + ["seconds"]] for p in (before, after))
+    both = b.merge(a, on=keys, suffixes=("_before", "_after"))
+    df = both.groupby(["mode", "phase"])[["seconds_before", "seconds_after"]].sum()
+    df.columns = ["before", "after"]
+    df["ratio"] = df["after"] / df["before"]
+    print(df.reindex(PHASES, level="phase").to_string(float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
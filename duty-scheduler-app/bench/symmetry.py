@@ -0,0 +1,67 @@
+"""対称性の除去あり/なし：同じ条件の医師が多いロースターで、公平性の最適（＝それより良い解が
+ないこと）を証明するまでの時間を比べる。
+
+    python -m bench.symmetry [--time-limit 60] [--seeds 3]
+
+グループごとに可用性の行を数種類だけにして、入れ替えても同じ解になる医師の組を大きくする。
+"""
+import argparse, time
+
+import numpy as np
+
+from bench.synthetic import make_availability
+from utils.fairness import AnytimeSolve, FairnessGoal, add_fairness_objective
+from utils.feasibility import precheck
+from utils.loose_scheduler import warm_start
+from utils.shift_index import shift_index
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model
+from utils.symmetry import break_symmetry
+
+
+def homogeneous(n: int, kinds: int, seed: int = 0, density: float = 0.8):
+    # グループごとに kinds 種類の行を順に配る（同じ行の医師が同値類になる）
+    df = make_availability(n, density=density, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    cols = df.columns[2:]
+    for g in (0, 1):
+        rows = np.flatnonzero(df["Group"] == g)
+        proto = (rng.random((kinds, len(cols))) >= density).astype(int)
+        df.loc[rows, cols] = proto[np.arange(len(rows)) % kinds]
+    return df
+
+
+def prove(df, index, symmetry: bool, limit: float):
+    sm = build_strict_model(df, index=index)
+    warm_start(sm, df, 2025, 5)
+    fair = add_fairness_objective(sm, FairnessGoal(total_target=0, holiday_target=0))
+    classes = break_symmetry(sm) if symmetry else []
+    run = AnytimeSolve(sm, fair, SolverConfig(time_limit=limit))
+    t = time.perf_counter()
+    run.solve()
+    best = run.best and f"{run.best.total_spread}/{run.best.holiday_spread}"
+    return time.perf_counter() - t, run.stats.get("reason"), best, classes
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--time-limit", type=float, default=60.0)
+    ap.add_argument("--seeds", type=int, default=3)
+    args = ap.parse_args(argv)
+    print(f"{'doctors':>7} {'kinds':>5} {'seed':>4} {'classes':>18} {'off [s]':>8} {'on [s]':>8}  best / reason")
+    for n, kinds in ((30, 4), (30, 6), (36, 4)):
+        for seed in range(args.seeds):
+            df = homogeneous(n, kinds, seed)
+            index = shift_index(df, 2025, 5)
+            if precheck(df, index=index):
+                print(f"{n:>7} {kinds:>5} {seed:>4} {'precheck':>18}")
+                continue
+            off, reason0, best0, _ = prove(df, index, False, args.time_limit)
+            on, reason1, best1, classes = prove(df, index, True, args.time_limit)
+            sizes = "+".join(str(len(c.doctors)) for c in classes)
+            print(f"{n:>7} {kinds:>5} {seed:>4} {sizes:>18} {off:>8.2f} {on:>8.2f}  "
+                  f"{best0} {reason0} / {best1} {reason1}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import calendar, datetime
+import numpy as np
+import pandas as pd
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def shift_headers(year: int, month: int, holidays=(), months: int = 1) -> list[str]:
+    # 土日・祝日は -1/-2 の 2 コマ、平日は 1 コマ
+    # months > 1 は日番号を通しで振った長期ホライズン（ベンチマーク用）
+    cols = []
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + (month - 1 + months) // 12, (month - 1 + months) % 12 + 1, 1)
+    for d in range(1, (end - start).days + 1):
+        date = start + datetime.timedelta(days=d - 1)
+        wd = WEEKDAYS[date.weekday()]
+        if date.weekday() >= 5 or date in holidays:
+            cols += [f"{d}-1({wd})", f"{d}-2({wd})"]
+        else:
+            cols.append(f"{d}({wd})")
+    return cols
+
+
+def make_availability(n_doctors: int, year: int = 2025, month: int = 5, g1_ratio: float = 1 / 3,
+                      density: float = 0.7, holidays=(), seed: int = 0, months: int = 1) -> pd.DataFrame:
+    """アプリに読ませるのと同じ形（Group, Name, シフト列; 0=可/1=NG）の合成 CSV を作る。"""
+    rng = np.random.default_rng(seed)
+    cols = shift_headers(year, month, holidays, months)
+    n1 = round(n_doctors * g1_ratio)
+    ng = (rng.random((n_doctors, len(cols))) >= density).astype(int)
+    df = pd.DataFrame(ng, columns=cols)
+    df.insert(0, "Name", [f"Dr{i:03d}" for i in range(n_doctors)])
+    df.insert(0, "Group", np.r_[np.zeros(n_doctors - n1, int), np.ones(n1, int)])
+    return df
+
+
+# 月の長さ → その長さの月（ベンチマークのパラメータ用）
+MONTH_OF_LENGTH = {28: (2026, 2), 29: (2024, 2), 30: (2025, 6), 31: (2025, 5)}
+
+
+def holiday_pattern(year: int, month: int, pattern: str = "none", seed: int = 0) -> set:
+    """祝日の置き方：none / random-K（平日からランダムに K 日）/ bridge（月曜を全部祝日）。"""
+    first = datetime.date(year, month, 1)
+    days = [first + datetime.timedelta(days=k) for k in range(calendar.monthrange(year, month)[1])]
+    weekdays = [d for d in days if d.weekday() < 5]
+    if pattern == "none":
+        return set()
+    if pattern == "bridge":
+        return {d for d in weekdays if d.weekday() == 0}
+    if pattern.startswith("random-"):
+        k = int(pattern.split("-")[1])
+        rng = np.random.default_rng(seed)
+        return {weekdays[i] for i in rng.choice(len(weekdays), size=min(k, len(weekdays)), replace=False)}
+    raise ValueError(f"unknown holiday pattern: {pattern}")
+
+
+def roster(n_doctors: int, month_length: int = 31, g1_ratio: float = 1 / 3, density: float = 0.7,
+           holidays: str = "none", seed: int = 0) -> tuple[int, int, pd.DataFrame]:
+    """(year, month, df)：月の長さ・祝日パターンで指定する合成ロースター。"""
+    year, month = MONTH_OF_LENGTH[month_length]
+    hol = holiday_pattern(year, month, holidays, seed)
+    return year, month, make_availability(n_doctors, year, month, g1_ratio, density, hol, seed)
+
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """アプリにアップロードされるのと同じ cp932 の CSV。"""
+    return df.to_csv(index=False).encode("cp932")
@@ -0,0 +1,109 @@
+"""手で直した割付のチェック：validate_schedule（行列演算）vs strict モデルに割付を固定して CP-SAT で解く。
+
+    python -m bench.validate [--edits 20]
+
+solver の割付に 1〜3 か所の手直し（担当の差し替え・消去）を入れ、違反の有無が CP-SAT と一致するかも見る。
+CP-SAT は可行かどうかしか言わないが、validate_schedule は違反を全部（ルール・医師・シフト）返す。
+最初に同梱のサンプル（同名の医師がいる）の書き出したままの Schedule が、注釈入り CSV と同じ結果に
+なること（strict は ok）を確かめる。違えば終了コード 1。
+"""
+import argparse, statistics, sys, time
+
+import numpy as np
+import pandas as pd
+
+from bench.synthetic import make_availability, roster
+from utils.flow_scheduler import build_assignment as build_flow
+from utils.loose_scheduler import build_assignment as build_loose
+from utils.model_template import build_from_template
+from utils.pipeline import build_schedule
+from utils.shift_index import shift_index
+from utils.solver_config import SolverConfig
+from utils.strict_model import schedule_cells, solve_strict_model
+from utils.validate import validate_schedule
+
+ROLES = ("Duty_G0", "Duty_G1", "Oncall_G0")
+
+
+def edit(sd, names, rng):
+    # 1〜3 か所：空でない担当を別の医師に差し替えるか、消す
+    sd = sd.copy()
+    for _ in range(rng.integers(1, 4)):
+        col = ROLES[rng.integers(3)]
+        rows = np.flatnonzero(sd[col] != "")
+        if len(rows):
+            sd.loc[sd.index[rng.choice(rows)], col] = rng.choice(names) if rng.random() < 0.7 else ""
+    return sd
+
+
+def cp_check(df, sd, index) -> tuple[bool, float]:
+    # 全セルを割付の値に固定したモデルが解けるか（従来の「解き直して確かめる」）
+    t = time.perf_counter()
+    sm = build_from_template(df, index=index)
+    on = schedule_cells(sm, sd)
+    for is_y, var in ((False, sm.x), (True, sm.y)):
+        for (i, j), v in var.items():
+            sm.model.Add(v == int((is_y, i, j) in on))
+    # 表にあっても NG のセル（変数がない）に入っていれば不可行
+    cells = {(r["Shift"], n.strip()) for _, r in sd.iterrows() for c in ROLES for n in str(r[c]).split(",") if n.strip()}
+    ok = solve_strict_model(sm, SolverConfig(30, 1)) is not None and len(cells) == len(on)
+    return ok, time.perf_counter() - t
+
+
+def check_sample(path: str = "sample/availability_sample.csv", year: int = 2025, month: int = 5) -> bool:
+    # 書き出したままの Schedule（名前だけで行を持たない）で違反をでっち上げないか
+    df = pd.read_csv(path, encoding="cp932")
+    index = shift_index(df, year, month)
+    ok = True
+    for mode, a in (("strict", build_schedule(df, year, month, config=SolverConfig(30, 1), index=index)[0]),
+                    ("loose", build_loose(df, year, month, index=index)),
+                    ("flow", build_flow(df, year, month, index=index))):
+        rules = "strict" if mode == "strict" else "loose"
+        v = validate_schedule(df, a.schedule_df(), year, month, rules, index=index)
+        ref = validate_schedule(df, a.annotate(df)[0], year, month, rules, index=index)
+        same = v.counts() == ref.counts() and (v.ok or mode != "strict")
+        ok &= same
+        print(f"sample {mode:<6} schedule {v.counts() or 'ok'}  annotated {ref.counts() or 'ok'}  "
+              f"{'same' if same else 'DIFFERENT'}")
+    return ok
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--edits", type=int, default=20)
+    args = ap.parse_args(argv)
+    if not check_sample():
+        sys.exit(1)
+    print(f"{'doctors':>7} {'rules':>6} {'validate [ms]':>13} {'annotated [ms]':>14} {'cp-sat [s]':>10} "
+          f"{'violations':>10} {'agree':>6}")
+    for n, rules in ((30, "strict"), (34, "strict"), (36, "strict"), (120, "loose"), (400, "loose")):
+        if rules == "strict":
+            y, m, df = roster(n, 31, density=0.8)
+            index = shift_index(df, y, m)
+            a = build_schedule(df, y, m, config=SolverConfig(30, 1), index=index)[0]
+        else:
+            y, m, df = 2025, 5, make_availability(n, seed=0)
+            index = shift_index(df, y, m)
+            a = build_flow(df, y, m, index=index)
+        rng = np.random.default_rng(0)
+        names = df["Name"].tolist()
+        ann, _ = a.annotate(df)
+        v_ms, a_ms, cp_s, found, agree = [], [], [], [], 0
+        for k in range(args.edits):
+            sd = a.schedule_df() if k == 0 else edit(a.schedule_df(), names, rng)
+            v = validate_schedule(df, sd, y, m, rules, index=index)
+            v_ms.append(v.seconds * 1000)
+            found.append(len(v.issues))
+            a_ms.append(validate_schedule(df, ann, y, m, rules, index=index).seconds * 1000)
+            if rules == "strict":
+                ok, s = cp_check(df, sd, index)
+                cp_s.append(s)
+                agree += ok == v.ok
+        med = statistics.median
+        print(f"{n:>7} {rules:>6} {med(v_ms):>13.1f} {med(a_ms):>14.1f} "
+              f"{f'{med(cp_s):.3f}' if cp_s else '-':>10} {med(found):>10} "
+              f"{f'{agree}/{args.edits}' if cp_s else '-':>6}")
+
+
+if __name__ == "__main__":
+    main()
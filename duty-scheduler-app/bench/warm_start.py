@@ -0,0 +1,68 @@
+"""greedy ヒントあり/なしで最初の可行解までの時間を比べる。
+
+    python -m bench.warm_start [--workers N]
+
+1 か月（きつめの 35 人）と 3 か月通し（32 人 × 3）を、乱数シード（CP-SAT と greedy ヒントで同じ）を変えて解く。
+"""
+import argparse, statistics
+
+from ortools.sat.python import cp_model
+
+from bench.synthetic import make_availability
+from utils.horizon import Carry, greedy_hint, next_month, stack_months
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model, solve_strict_model
+
+
+class FirstSolution(cp_model.CpSolverSolutionCallback):
+    def __init__(self):
+        super().__init__()
+        self.at = None
+
+    def on_solution_callback(self):
+        if self.at is None:
+            self.at = self.WallTime()
+
+
+def instance(months: int, n: int, density: float, seed: int):
+    part = []
+    for k in range(months):
+        y, m = next_month(2025, 4, k)
+        part.append((y, m, make_availability(n, y, m, g1_ratio=0.3, density=density, seed=seed * 10 + k)))
+    return part
+
+
+def time_to_feasible(part, hint: bool, config: SolverConfig):
+    # greedy のヒントも CP-SAT と同じシードで作る
+    df, month_starts, present, _, cols_of = stack_months(part)
+    sm = build_strict_model(df, month_starts=month_starts, present=present)
+    if hint:
+        greedy_hint(sm, part, cols_of, Carry(), seed=config.seed)
+    cb = FirstSolution()
+    solve_strict_model(sm, config, cb)
+    return cb.at
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--time-limit", type=float, default=20.0)
+    ap.add_argument("--seeds", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'case':>14} {'hint':>5} {'found':>6} {'median[s]':>10} {'max[s]':>8}")
+    for label, months, n, density in (("1 month x35", 1, 35, 0.5), ("3 months x32", 3, 32, 0.55)):
+        part = instance(months, n, density, seed=0)
+        for hint in (False, True):
+            times = []
+            for seed in range(args.seeds):
+                cfg = SolverConfig(args.time_limit, args.workers, seed, hint)
+                t = time_to_feasible(part, hint, cfg)
+                times.append(args.time_limit if t is None else t)
+            found = sum(t < args.time_limit for t in times)
+            print(f"{label:>14} {str(hint):>5} {found:>3}/{args.seeds:<2} {statistics.median(times):>10.2f}"
+                  f" {max(times):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# 割付行列の値
+NONE, DUTY, ONCALL = 0, 1, 2
+# 注釈入り CSV に書く値
+ANNOTATE = {DUTY: 3, ONCALL: 4}
+
+
+@dataclass
+class Assignment:
+    """割付結果の正本：医師 × シフトの整数行列（NONE / DUTY / ONCALL）。
+
+    schedule_df・summary_df・注釈入り CSV はすべてここから作る。医師は行番号で持つので
+    同名の医師がいても取り違えない。
+    """
+    doctors: list[str]
+    group: np.ndarray                 # (D,) 0/1
+    shifts: list[str]
+    matrix: np.ndarray                # (D, S) int8
+    warnings: list[str] = field(default_factory=list)   # loose の ONCALL-MISSING など
+
+    @classmethod
+    def empty(cls, doctors, group, shifts, warnings=None) -> "Assignment":
+        return cls(list(doctors), np.asarray(group, dtype=int), list(shifts),
+                   np.zeros((len(doctors), len(shifts)), dtype=np.int8), list(warnings or []))
+
+    def counts(self) -> tuple[np.ndarray, np.ndarray]:
+        return (self.matrix == DUTY).sum(axis=1), (self.matrix == ONCALL).sum(axis=1)
+
+    def _names(self, mask: np.ndarray) -> list[str]:
+        # 列ごとに True の医師名を ", " でつなぐ
+        names = np.asarray(self.doctors, dtype=object)
+        return [", ".join(names[col]) for col in mask.T]
+
+    def schedule_df(self) -> pd.DataFrame:
+        duty = self.matrix == DUTY
+        g0 = (self.group == 0)[:, None]
+        df = pd.DataFrame({
+            "Shift": self.shifts,
+            "Duty_G0": self._names(duty & g0),
+            "Duty_G1": self._names(duty & ~g0),
+            "Oncall_G0": self._names(self.matrix == ONCALL),
+        })
+        df.attrs["warnings"] = list(self.warnings)
+        return df
+
+    def summary_df(self, total: bool = False) -> pd.DataFrame:
+        duty, oncall = self.counts()
+        df = pd.DataFrame({"Group": self.group, "Duty": duty, "Oncall": oncall}, index=self.doctors)
+        if total:
+            df["Total"] = df["Duty"] + df["Oncall"]
+        return df
+
+    def annotate(self, df_raw: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
+        """元の可用性 CSV に Duty=3 / OC=4 を書き込んだ表と、元が 0 でなかったセルの警告。
+
+        df_raw の行は self.doctors と同じ順（同じ CSV から作った割付）であること。
+        """
+        raw = df_raw[self.shifts].to_numpy()
+        code = np.select([self.matrix == DUTY, self.matrix == ONCALL], [ANNOTATE[DUTY], ANNOTATE[ONCALL]], raw)
+        df_ann = df_raw.copy()
+        df_ann[self.shifts] = code
+        j, i = np.nonzero(((self.matrix != NONE) & (raw != 0)).T)      # シフト順に並べる
+        warnings = [f"{self.doctors[a]} {self.shifts[b]}{' (OC)' if self.matrix[a, b] == ONCALL else ''}"
+                    f" は元が 0 でない" for a, b in zip(i, j)]
+        return df_ann, warnings
+
+    def take(self, rows=None, cols=None, names=None) -> "Assignment":
+        """一部の医師・シフトだけを取り出す（複数月を月ごとに分けるとき）。names はシフトの表示名。"""
+        rows = np.arange(len(self.doctors)) if rows is None else np.asarray(rows, dtype=int)
+        cols = np.arange(len(self.shifts)) if cols is None else np.asarray(cols, dtype=int)
+        return Assignment([self.doctors[i] for i in rows], self.group[rows],
+                          list(names) if names is not None else [self.shifts[j] for j in cols],
+                          self.matrix[np.ix_(rows, cols)], list(self.warnings))
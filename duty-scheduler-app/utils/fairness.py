@@ -0,0 +1,176 @@
+import threading, time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from utils.assignment import DUTY, ONCALL, Assignment
+from utils.instrument import solver_stats
+from utils.solver_config import SolverConfig
+
+
+@dataclass(frozen=True)
+class FairnessGoal:
+    """公平性の目的関数の重みと「これで十分」の基準（グループごとの max - min）。"""
+    total_weight: int = 10       # Duty+Oncall 回数の幅
+    holiday_weight: int = 1      # -1 シフト（日直）回数の幅
+    total_target: int = 1        # 幅が両方とも目標以下になったら打ち切る
+    holiday_target: int = 1
+
+
+@dataclass
+class Fairness:
+    """モデルに入れた公平性の項（グループごとの幅の変数）。"""
+    goal: FairnessGoal
+    total: list = field(default_factory=list)      # グループごとの Duty+Oncall の幅
+    holiday: list = field(default_factory=list)    # グループごとの -1 回数の幅
+
+
+@dataclass
+class Improvement:
+    """改善解 1 つ分（最良解は割付行列ごと持つ）。"""
+    seconds: float
+    objective: float
+    bound: float
+    total_spread: int
+    holiday_spread: int
+    assignment: Assignment
+
+
+def _spread(m: cp_model.CpModel, exprs: list, name: str, lo: int, hi: int):
+    top, bottom = m.NewIntVar(lo, hi, f"{name}_max"), m.NewIntVar(lo, hi, f"{name}_min")
+    m.AddMaxEquality(top, exprs)
+    m.AddMinEquality(bottom, exprs)
+    width = m.NewIntVar(0, hi - lo, name)
+    m.Add(width == top - bottom)
+    return width
+
+
+def add_fairness_objective(sm, goal: FairnessGoal | None = None, prior=None) -> Fairness:
+    """strict モデルの目的を「偏りの小ささ」に差し替える（Minimize(0) / 累計項の代わり）。
+
+    グループごとに Duty+Oncall の回数（prior があれば前月までの累計を足した値）の
+    max - min と、-1 シフトの回数の max - min を重み付きで最小化する。
+    -1 に 1 つも入れない医師は -1 の幅から外す（居ると最小が 0 に張り付く）。
+    """
+    goal = goal or FairnessGoal()
+    m, Sum = sm.model, cp_model.LinearExpr.Sum
+    prior = np.zeros(len(sm.doctors), dtype=int) if prior is None else np.asarray(prior, dtype=int)
+    total = [[] for _ in sm.doctors]
+    hol = [[] for _ in sm.doctors]
+    for var in (sm.x, sm.y):
+        for (i, j), v in var.items():
+            total[i].append(v)
+            if var is sm.x and sm.sub[j] == 1:
+                hol[i].append(v)
+
+    fair = Fairness(goal)
+    n_hol = int((sm.sub == 1).sum())
+    for g in (0, 1):
+        rows = np.flatnonzero(sm.group == g)
+        if len(rows) > 1:
+            hi = int(prior[rows].max()) + len(sm.shifts) * 2
+            fair.total.append(_spread(m, [Sum(total[i]) + int(prior[i]) for i in rows],
+                                      f"spread_total_{g}", 0, hi))
+        rows = [i for i in rows if hol[i]]
+        if len(rows) > 1:
+            fair.holiday.append(_spread(m, [Sum(hol[i]) for i in rows], f"spread_hol_{g}", 0, n_hol))
+    m.Minimize(goal.total_weight * Sum(fair.total) + goal.holiday_weight * Sum(fair.holiday))
+    return fair
+
+
+class AnytimeCallback(cp_model.CpSolverSolutionCallback):
+    """改善解が出るたびに割付行列を取り出して on_solution(Improvement) に渡す。
+
+    幅が両方とも目標以下になったら探索を止める（reason = "good enough"）。
+    """
+
+    def __init__(self, sm, fair: Fairness, on_solution=None):
+        super().__init__()
+        self.sm, self.fair, self.on_solution = sm, fair, on_solution
+        self.t0 = time.perf_counter()
+        self.history: list[Improvement] = []
+        self.reason = ""
+        # 変数の添字を先にまとめておき、解は response の配列から一括で引く
+        self._cells = [(np.array(list(var.keys())).reshape(-1, 2), np.array([v.Index() for v in var.values()]), code)
+                       for var, code in ((sm.x, DUTY), (sm.y, ONCALL))]
+        self._spreads = [np.array([v.Index() for v in vs], dtype=int) for vs in (fair.total, fair.holiday)]
+
+    @property
+    def best(self) -> Improvement | None:
+        return self.history[-1] if self.history else None
+
+    def on_solution_callback(self):
+        values = np.asarray(self.response_proto.solution)
+        a = Assignment.empty(self.sm.doctors, self.sm.group, self.sm.shifts)
+        for ij, idx, code in self._cells:
+            on = values[idx].astype(bool)
+            a.matrix[ij[on, 0], ij[on, 1]] = code
+        total, hol = (int(values[ix].max(initial=0)) for ix in self._spreads)
+        imp = Improvement(time.perf_counter() - self.t0, self.objective_value, self.best_objective_bound,
+                          total, hol, a)
+        self.history.append(imp)
+        if self.on_solution:
+            self.on_solution(imp)
+        g = self.fair.goal
+        if total <= g.total_target and hol <= g.holiday_target:
+            self.reason = "good enough"
+            self.stop_search()
+
+    def frame(self) -> pd.DataFrame:
+        """改善の推移（秒・目的値・下界・幅）。"""
+        return pd.DataFrame([(h.seconds, h.objective, h.bound, h.total_spread, h.holiday_spread)
+                             for h in list(self.history)],
+                            columns=["seconds", "objective", "bound", "total_spread", "holiday_spread"])
+
+
+class AnytimeSolve:
+    """公平性モデルを別スレッドで解く。stop() でいつでも止められ、best は常に最良解。
+
+        run = AnytimeSolve(sm, fair, config, on_solution=q.put)
+        run.start(); ...; run.stop(); run.join()
+    """
+
+    def __init__(self, sm, fair: Fairness, config: SolverConfig | None = None, on_solution=None):
+        self.sm = sm
+        self.solver = (config or SolverConfig()).make_solver()
+        self.callback = AnytimeCallback(sm, fair, on_solution)
+        self.stats: dict = {}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        status = self.solver.Solve(self.sm.model, self.callback)
+        self.stats.update(solver_stats(self.sm.model, self.solver, status))
+        cb = self.callback
+        if not cb.reason:
+            cb.reason = ("optimal" if status == cp_model.OPTIMAL else
+                         "infeasible" if status == cp_model.INFEASIBLE else "time limit")
+        self.stats.update(solutions=len(cb.history), reason=cb.reason,
+                          bound=self.solver.best_objective_bound if cb.history else None,
+                          first_solution_s=round(cb.history[0].seconds, 4) if cb.history else None)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread.is_alive() and not self.callback.reason:
+            self.callback.reason = "stopped"
+        self.solver.stop_search()
+
+    def join(self, timeout: float | None = None):
+        self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    @property
+    def best(self) -> Improvement | None:
+        return self.callback.best
+
+    def solve(self) -> Improvement | None:
+        """同期で解いて最良解を返す（解がなければ None）。"""
+        self.start().join()
+        return self.best
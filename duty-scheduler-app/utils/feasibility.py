@@ -0,0 +1,135 @@
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from utils.rest_rules import STRICT_GAP
+from utils.solver_config import SolverConfig
+from utils.shift_index import ShiftIndex
+from utils.strict_model import availability_matrix, build_strict_model
+
+
+@dataclass
+class Issue:
+    """解けない理由の候補 1 件。"""
+    rule: str                                       # shift / doctor / capacity / core
+    message: str
+    doctors: list = field(default_factory=list)
+    shifts: list = field(default_factory=list)
+
+
+def issues_frame(issues: list[Issue]) -> pd.DataFrame:
+    return pd.DataFrame({"ルール": [x.rule for x in issues], "内容": [x.message for x in issues],
+                         "医師": [", ".join(x.doctors) for x in issues],
+                         "シフト": [", ".join(x.shifts) for x in issues]})
+
+
+def max_duties(days: np.ndarray, gap: int) -> int:
+    """可の日 days（同じ日は何コマでも）から gap 日間隔で取れる最大コマ数。"""
+    u, cnt = np.unique(days, return_counts=True)
+    prev = np.searchsorted(u, u - gap, side="right")     # k 日目を取るなら prev[k] 未満の日まで使える
+    best = np.zeros(len(u) + 1, dtype=int)
+    for k in range(len(u)):
+        best[k + 1] = max(best[k], cnt[k] + best[prev[k]])
+    return int(best[-1])
+
+
+def precheck(df_raw: pd.DataFrame, gap: int = STRICT_GAP, last_day=None,
+             index: ShiftIndex | None = None) -> list[Issue]:
+    """モデルを組む前の数え上げだけで分かる「明らかに解けない」理由（ミリ秒で終わる）。
+
+    - シフトごとの候補：-1 は G0・G1 が 1 人ずつ、それ以外は G0 が 1 人は要る
+      （G0 Duty か、G1 Duty + G0 Oncall のどちらかになるため）
+    - 医師ごと：gap 日間隔で G1 は 2 コマ、G0 は 1 コマ取れるか
+    - 全体の数：G1 はちょうど 2 回、G0 は 1〜2 回 Duty、Oncall は 2 回まで
+    """
+    index = index or ShiftIndex.from_columns(df_raw.columns)
+    shifts, day, hol = index.shifts, index.day, index.sub == 1
+    names = df_raw["Name"].tolist()
+    group = df_raw["Group"].to_numpy(dtype=int)
+    avail = availability_matrix(df_raw, shifts, last_day, gap, day)
+    g0, g1 = group == 0, group == 1
+    issues = []
+
+    # シフトごとの候補数
+    n0, n1 = avail[g0].sum(axis=0), avail[g1].sum(axis=0)
+    for j in np.flatnonzero(n0 == 0):
+        what = "-1 の Duty に入れる G0" if hol[j] else "Duty（G0）か Oncall に入れる G0"
+        issues.append(Issue("shift", f"{shifts[j]}: {what}がいない", [], [shifts[j]]))
+    for j in np.flatnonzero(hol & (n1 == 0)):
+        issues.append(Issue("shift", f"{shifts[j]}: -1 の Duty に入れる G1 がいない", [], [shifts[j]]))
+
+    # 医師ごとの取れる最大コマ数
+    for i in range(len(names)):
+        need = 2 if g1[i] else 1
+        cols = np.flatnonzero(avail[i])
+        if max_duties(day[cols], gap) < need:
+            issues.append(Issue("doctor", f"{names[i]}: G{group[i]} は Duty {need} 回要るが、"
+                                          f"{gap} 日間隔で入れるのは {max_duties(day[cols], gap)} コマ",
+                                [names[i]], [shifts[j] for j in cols]))
+
+    # 全体の数
+    n_hol, n_non = int(hol.sum()), int((~hol).sum())
+    d1 = 2 * int(g1.sum())                             # G1 Duty の合計（ちょうど）
+    if d1 < n_hol:
+        issues.append(Issue("capacity", f"-1 が {n_hol} コマあるが G1 Duty は合計 {d1} 回しかない"))
+    elif d1 - n_hol > n_non:
+        issues.append(Issue("capacity", f"G1 Duty {d1} 回のうち -1 以外に {d1 - n_hol} 回要るが、"
+                                        f"-1 以外のシフトは {n_non} コマ"))
+    else:
+        d0 = n_hol + n_non - (d1 - n_hol)              # G0 Duty の合計
+        if not int(g0.sum()) <= d0 <= 2 * int(g0.sum()):
+            issues.append(Issue("capacity", f"G0 Duty は合計 {d0} 回になるが、G0 {int(g0.sum())} 人で"
+                                            f"1〜2 回ずつだと {int(g0.sum())}〜{2 * int(g0.sum())} 回"))
+        if d1 - n_hol > 2 * int(g0.sum()):
+            issues.append(Issue("capacity", f"G0 Oncall が {d1 - n_hol} 回要るが、G0 {int(g0.sum())} 人で"
+                                            f"2 回までだと {2 * int(g0.sum())} 回"))
+    return issues
+
+
+def _describe(sm, key: tuple, gap: int) -> Issue:
+    rule, k = key[0], key[1]
+    if rule == "cover":
+        return Issue("core", f"{sm.shifts[k]} の Duty 充足", [], [sm.shifts[k]])
+    if rule == "oncall":
+        return Issue("core", f"{sm.shifts[k]} の G1 Duty → G0 Oncall", [], [sm.shifts[k]])
+    name = sm.doctors[k]
+    if rule == "count":
+        return Issue("core", f"{name} の回数（G1 は Duty 2 回 / G0 は Duty 1〜2 回・Oncall 2 回まで）", [name])
+    return Issue("core", f"{name} の {gap} 日間隔", [name])
+
+
+def explain_infeasible(df_raw: pd.DataFrame, gap: int = STRICT_GAP, last_day=None,
+                       time_limit: float = 10.0, index: ShiftIndex | None = None) -> list[Issue] | None:
+    """ルールを仮定リテラルで入れたモデルを解き、同時には満たせないルールの組（コア）を返す。
+
+    CP-SAT の SufficientAssumptionsForInfeasibility で得たコアから 1 つずつ外して
+    まだ解けないか試し、外せるものは外して小さくする（time_limit 秒まで）。
+    実は解ける / 時間内に分からなければ None。
+    """
+    deadline = time.perf_counter() + time_limit
+    sm = build_strict_model(df_raw, gap, last_day=last_day, assumptions=True, index=index)
+    lit_of = {v.Index(): v for v in sm.rules.values()}
+    key_of = {v.Index(): k for k, v in sm.rules.items()}
+
+    def core_of(idx, limit):                             # 解けない → そのコア（添字）/ それ以外 → None
+        sm.model.ClearAssumptions()
+        sm.model.AddAssumptions([lit_of[k] for k in idx])
+        solver = SolverConfig(time_limit=max(0.1, limit), workers=1).make_solver()  # コアは 1 ワーカーで
+        if solver.Solve(sm.model) != cp_model.INFEASIBLE:
+            return None
+        return list(solver.SufficientAssumptionsForInfeasibility())
+
+    core = core_of(list(lit_of), time_limit)
+    if core is None:
+        return None
+    k = 0
+    while k < len(core) and time.perf_counter() < deadline:
+        smaller = core_of(core[:k] + core[k + 1:], min(1.0, deadline - time.perf_counter()))
+        if smaller is None:
+            k += 1                                       # 外すと解ける（か分からない）→ 残す
+        else:
+            core = [c for c in core if c in set(smaller)]
+    return [_describe(sm, key_of[c], gap) for c in core]
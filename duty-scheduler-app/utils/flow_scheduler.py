@@ -0,0 +1,274 @@
+import numpy as np
+import pandas as pd
+from ortools.graph.python import min_cost_flow
+
+from utils.assignment import Assignment
+from utils.loose_scheduler import SPACE, LooseInstance, LooseResult, greedy, make_instance
+from utils.rest_rules import rest_ok
+from utils.shift_index import ShiftIndex
+
+# 費用の重み（最大流を先に取り、その中で費用最小）
+SECOND = 1000      # G0 の 2 回目の Duty（G1 の 2 回・G0 の 1 回を先に埋める）
+PRIOR = 10         # 前月までの累計 1 回あたり
+ONCALL_STEP = 100  # on-call の k 回目は k 倍（回数を均す）
+ONCALL_GAP = 10000 # 4 日間隔を破る on-call（候補がほかにないときだけ）
+AUGMENT_DEPTH = 3  # 空きコマを埋める入れ替えで動かす医師の数の上限
+
+
+def _noise(n: int, seed: int) -> np.ndarray:
+    # 同点の順番づけだけに使う乱数（費用の 1 単位未満の差）
+    return np.random.default_rng(seed).integers(0, PRIOR, n)
+
+
+def _week_flow(inst: LooseInstance, w: int, last: np.ndarray, cnt: np.ndarray, hol1: np.ndarray,
+               noise: np.ndarray):
+    """週 w 以降の Duty を最小費用最大流で割り付け、(医師, シフト) の組と流れた量を返す。
+
+    ネットワーク：始点 → 医師（残りの回数ぶん 1 回ごとの弧）→ 医師×週（容量 1）→ コマ → 終点。
+    -1 は G0 用と G1 用の 2 コマ、それ以外は G0/G1 どちらでもよい 1 コマ。
+    週 w までの勤務（last・cnt・hol1）は正確に効く。先の週どうしの 4 日間隔と -1 月 1 回は
+    流れで書けないので緩めてある（先の週の分は見込みとして使うだけで、確定しない）。
+    """
+    avail, group, day, sub, week = inst.avail, inst.group, inst.day, inst.sub, inst.week
+    D, S = avail.shape
+    W = week.max(initial=-1) + 1
+    hol = sub == 1
+    # コマ：-1 は (j, G0) と (j, G1)、それ以外は (j, どちらでも)
+    slot_shift = np.r_[np.arange(S), np.flatnonzero(hol)]
+    slot_group = np.r_[np.where(hol, 0, -1), np.ones(hol.sum(), int)]
+    live = week[slot_shift] >= w
+    slot_shift, slot_group = slot_shift[live], slot_group[live]
+    edge = (avail[:, slot_shift] & rest_ok(day[slot_shift][None, :], last[:, None], SPACE)
+            & ~inst.weekly0[:, week[slot_shift]]
+            & ((slot_group[None, :] < 0) | (slot_group[None, :] == group[:, None]))
+            & ~(hol[slot_shift][None, :] & (hol1 >= 1)[:, None]))
+    di, k = np.nonzero(edge)
+
+    source, sink = 0, 1
+    doc = 2 + np.arange(D)
+    dw = 2 + D + np.arange(D * W).reshape(D, W)
+    slot = 2 + D + D * W + np.arange(len(slot_shift))
+    f = min_cost_flow.SimpleMinCostFlow()
+    for unit in (0, 1):                                  # cnt + unit 回目の Duty
+        n = cnt + unit
+        cost = inst.prior * PRIOR + noise + np.where((group == 0) & (n == 1), SECOND, 0)
+        f.add_arcs_with_capacity_and_unit_cost(np.full(D, source), doc, (n < 2).astype(int), cost)
+    used = np.unique(di * W + week[slot_shift[k]])
+    f.add_arcs_with_capacity_and_unit_cost(doc[used // W], dw.ravel()[used], np.ones(len(used), int),
+                                           np.zeros(len(used), int))
+    arcs = f.add_arcs_with_capacity_and_unit_cost(dw[di, week[slot_shift[k]]], slot[k], np.ones(len(k), int),
+                                                  np.zeros(len(k), int))
+    f.add_arcs_with_capacity_and_unit_cost(slot, np.full(len(slot), sink), np.ones(len(slot), int),
+                                           np.zeros(len(slot), int))
+    f.set_node_supply(source, len(slot))
+    f.set_node_supply(sink, -len(slot))
+    if f.solve_max_flow_with_min_cost() != f.OPTIMAL:
+        raise RuntimeError("min cost flow が解けませんでした")
+    on = f.flows(arcs) > 0
+    return di[on], slot_shift[k[on]], int(on.sum())
+
+
+def rolling_flow(inst: LooseInstance, seed: int = 0) -> tuple[LooseResult, int]:
+    """週ごとに _week_flow を解き、その週の分だけ確定して次の週へ（週の数だけ流れを解く）。
+
+    戻り値: (Duty だけ埋めた LooseResult, 最初の流れで埋まったコマ数 = 埋められるコマ数の上界)
+    """
+    group, day, sub, week = inst.group, inst.day, inst.sub, inst.week
+    D, S = inst.avail.shape
+    noise = _noise(D, seed)
+    last, cnt, hol1 = inst.last0.copy(), np.zeros(D, int), np.zeros(D, int)
+    duty0, duty1 = np.full(S, -1, dtype=int), np.full(S, -1, dtype=int)
+    bound = None
+    for w in range(week.max(initial=-1) + 1):
+        di, sj, filled = _week_flow(inst, w, last, cnt, hol1, noise)
+        bound = filled if bound is None else bound
+        now = week[sj] == w
+        for i, j in zip(di[now], sj[now]):
+            (duty1 if group[i] == 1 else duty0)[j] = i
+            cnt[i] += 1
+            last[i] = day[j]
+            hol1[i] += sub[j] == 1
+    return LooseResult(duty0, duty1, np.full(S, -1, dtype=int), cnt, np.zeros(D, int), [], seed), bound or 0
+
+
+def _slots(hol: bool):
+    # シフトのコマ：-1 は G0 用・G1 用の 2 つ、それ以外はどちらでもよい 1 つ（-1 = グループを問わない）
+    return (0, 1) if hol else (-1,)
+
+
+def _empty(r: LooseResult, j: int, g: int) -> bool:
+    return (r.duty1 if g == 1 else r.duty0)[j] < 0 and (g >= 0 or r.duty1[j] < 0)
+
+
+def _takers(inst: LooseInstance, r: LooseResult, j: int, g: int) -> np.ndarray:
+    """今の割付のまま、シフト j のコマ（グループ g）に loose のルールを守って入れられる医師 (D,) bool。"""
+    group, day, week, hol = inst.group, inst.day, inst.week, inst.sub == 1
+    work = (r.duty0[:, None] == np.arange(len(group))) | (r.duty1[:, None] == np.arange(len(group)))
+    near = (work & (np.abs(day - day[j]) < SPACE)[:, None]).any(axis=0)   # (D,) 4 日以内の Duty
+    same_week = (work & (week == week[j])[:, None]).any(axis=0) | inst.weekly0[:, week[j]]
+    ok = (inst.avail[:, j] & (r.duty_cnt < 2) & ~near & ~same_week & rest_ok(day[j], inst.last0, SPACE)
+          & ((group == g) if g >= 0 else True))
+    if hol[j]:
+        ok &= (work & hol[:, None]).sum(axis=0) < 1
+    return ok
+
+
+def _put(r: LooseResult, i: int, j: int, group: np.ndarray, step: int = 1):
+    # step = 1 で医師 i をシフト j に入れる、-1 で外す
+    (r.duty1 if group[i] == 1 else r.duty0)[j] = i if step > 0 else -1
+    r.duty_cnt[i] += step
+
+
+def _pick(inst: LooseInstance, r: LooseResult, cands: np.ndarray, noise: np.ndarray) -> int:
+    # G1 の回数不足 → G0 の 0 回 → 累計の少ない順
+    short = np.where(inst.group[cands] == 1, 2 - r.duty_cnt[cands], (r.duty_cnt[cands] == 0).astype(int))
+    return int(cands[np.lexsort((noise[cands], inst.prior[cands], -short))[0]])
+
+
+def _fill_leftovers(inst: LooseInstance, r: LooseResult, noise: np.ndarray) -> int:
+    """rolling_flow が空けた Duty のコマを、今の割付のままルールを守って入れられる医師で埋める（greedy）。
+
+    rolling_flow は週ごとに先の週を緩和して決めるので、全部の週を決めたあとで見ると入れられる
+    医師がいるのに空いたコマが残ることがある。G1 の回数不足 → G0 の 0 回 → 累計の少ない順に入れる。
+    戻り値: 埋めたコマ数（r を書き換える）。
+    """
+    hol = inst.sub == 1
+    filled = 0
+    for j in range(len(inst.day)):
+        for g in _slots(hol[j]):
+            if not _empty(r, j, g):
+                continue
+            cands = np.flatnonzero(_takers(inst, r, j, g))
+            if len(cands):
+                _put(r, _pick(inst, r, cands, noise), j, inst.group)
+                filled += 1
+    return filled
+
+
+def _augment(inst: LooseInstance, r: LooseResult, j: int, g: int, noise: np.ndarray, depth: int,
+             seen: frozenset = frozenset()) -> bool:
+    """空いたコマ (j, g) を埋める。入れる医師がいなければ、別のシフト k の Duty を外せば入れる医師 i を
+    j に移し、空いた k を同じように埋める（i → k → … の増加路・移す医師は depth 人まで）。
+    埋まれば True（r を書き換える）、だめなら r を元に戻して False。
+    """
+    group, hol = inst.group, inst.sub == 1
+    cands = np.flatnonzero(_takers(inst, r, j, g))
+    if len(cands):
+        _put(r, _pick(inst, r, cands, noise), j, group)
+        return True
+    if depth == 0:
+        return False
+    movers = np.flatnonzero(inst.avail[:, j] & ((group == g) if g >= 0 else True))
+    for i in movers[np.lexsort((noise[movers], inst.prior[movers]))]:
+        if i in seen:
+            continue
+        for k in np.flatnonzero((r.duty0 == i) | (r.duty1 == i)):
+            _put(r, i, k, group, -1)
+            if _takers(inst, r, j, g)[i]:
+                _put(r, i, j, group)
+                if _augment(inst, r, k, group[i] if hol[k] else -1, noise, depth - 1, seen | {i}):
+                    return True
+                _put(r, i, j, group, -1)
+            _put(r, i, k, group)
+    return False
+
+
+def _swap_repair(inst: LooseInstance, r: LooseResult, noise: np.ndarray, depth: int = AUGMENT_DEPTH) -> int:
+    """_fill_leftovers のあとも空いたコマを、Duty を入れ替える増加路（_augment）で埋める。
+
+    埋まるコマは 1 つずつ増えるだけで減らない。戻り値: 増えたコマ数（r を書き換える）。
+    """
+    hol = inst.sub == 1
+    return sum(_augment(inst, r, j, g, noise, depth)
+               for j in range(len(inst.day)) for g in _slots(hol[j]) if _empty(r, j, g))
+
+
+def _oncall_flow(inst: LooseInstance, duty0: np.ndarray, duty1: np.ndarray, noise: np.ndarray):
+    """G1 が Duty の通常コマに G0 の on-call を最小費用の割当で付ける。
+
+    その日に Duty の医師は外す。4 日間隔を破る候補は大きな費用で最後の手段に、
+    k 回目の on-call は k 倍の費用にして回数を均す。戻り値: (oncall, 候補のなかったシフト)
+    """
+    avail, group, day, sub = inst.avail, inst.group, inst.day, inst.sub
+    D, S = avail.shape
+    need = np.flatnonzero((sub != 1) & (duty1 >= 0))
+    oncall = np.full(S, -1, dtype=int)
+    if not len(need):
+        return oncall, []
+
+    # 医師ごとの Duty 日（前月の最終勤務日も）から、4 日間隔を破るかどうか
+    duty_day = np.full((D, S), False)
+    for slot in (duty0, duty1):
+        j = np.flatnonzero(slot >= 0)
+        duty_day[slot[j], j] = True
+    dist = np.abs(day[:, None] - day[need][None, :])                 # (S, len(need))
+    near = (duty_day @ (dist < SPACE)) | ~rest_ok(day[need][None, :], inst.last0[:, None], SPACE)
+    same_day = duty_day @ (dist == 0)
+    edge = avail[:, need] & (group == 0)[:, None] & ~same_day
+    di, k = np.nonzero(edge)
+
+    source, sink = 0, 1
+    doc = 2 + np.arange(D)
+    slot = 2 + D + np.arange(len(need))
+    f = min_cost_flow.SimpleMinCostFlow()
+    steps = len(need)
+    for unit in range(steps):                          # k 回目の弧（容量 1・費用 k 倍）
+        f.add_arcs_with_capacity_and_unit_cost(np.full(D, source), doc, np.ones(D, int),
+                                               unit * ONCALL_STEP + inst.prior * PRIOR + noise)
+    arcs = f.add_arcs_with_capacity_and_unit_cost(doc[di], slot[k], np.ones(len(k), int),
+                                                  np.where(near[di, k], ONCALL_GAP, 0))
+    f.add_arcs_with_capacity_and_unit_cost(slot, np.full(len(slot), sink), np.ones(len(slot), int),
+                                           np.zeros(len(slot), int))
+    f.set_node_supply(source, len(slot))
+    f.set_node_supply(sink, -len(slot))
+    if f.solve_max_flow_with_min_cost() != f.OPTIMAL:
+        raise RuntimeError("min cost flow が解けませんでした")
+    on = f.flows(arcs) > 0
+    oncall[need[k[on]]] = di[on]
+    return oncall, [int(j) for j in need if oncall[j] < 0]
+
+
+def solve_flow(inst: LooseInstance, restarts: int = 8, seed: int = 0, stats: dict | None = None) -> LooseResult:
+    """loose のルールを最小費用流で割り付ける（Duty は rolling_flow + _fill_leftovers + _swap_repair、
+    on-call は _oncall_flow）。
+
+    週ごとの流れを積み上げるヒューリスティックで、最適（空きコマ最小）の保証はない。同じシードの greedy の
+    結果も同じように空きを埋めて候補に入れるので、同じ回数の greedy より空きコマが多くはならない。
+
+    1 回はシフト数・医師数に対して多項式時間（入れ替えは空きコマのぶんだけ）。乱数は同点の順番づけだけなので、
+    restarts 回シードを変えて score の一番よいものを採る（(0, 0, 0) が出たらそこで止める）。
+    stats があれば緩和で埋まったコマ数（上界）と、採った解の出どころ（flow / greedy）・コマ数・
+    あとから埋めたコマ数・試した回数を入れる。
+    """
+    best, bound, tried, late, picked = None, 0, 0, 0, "flow"
+    for s in range(seed, seed + max(1, restarts)):
+        noise = _noise(len(inst.group), s)
+        flow, filled = rolling_flow(inst, s)
+        bound = max(bound, filled)
+        for name, r in (("flow", flow), ("greedy", greedy(inst, s))):
+            n_late = _fill_leftovers(inst, r, noise) + _swap_repair(inst, r, noise)
+            r.oncall, r.missing_oc = _oncall_flow(inst, r.duty0, r.duty1, noise)
+            r.oncall_cnt = np.bincount(r.oncall[r.oncall >= 0], minlength=len(inst.group))
+            if best is None or r.score(inst) < best.score(inst):
+                best, late, picked = r, n_late, name
+        tried += 1
+        if best.score(inst) == (0, 0, 0):
+            break
+    if stats is not None:
+        stats.update(engine="flow", picked=picked, relaxed_slots=bound,
+                     filled_slots=int((best.duty0 >= 0).sum() + (best.duty1 >= 0).sum()), leftover_filled=late,
+                     restarts=tried)
+    return best
+
+
+def build_assignment(df_raw: pd.DataFrame, year: int, month: int, carry=None, restarts: int = 8,
+                     seed: int | None = None, index: ShiftIndex | None = None,
+                     stats: dict | None = None) -> Assignment:
+    """loose のルール（週 1 回／-1 月 1 回・連続 4 日間隔）を最小費用流で割り付ける。
+
+    greedy と違い、各週で先の週の空き具合（流れの緩和）を見込んで決める。空きコマは greedy より多くならない
+    （solve_flow）。carry・index は loose_scheduler.build_assignment と同じ。
+    """
+    inst, shifts = make_instance(df_raw, year, month, carry, index)
+    r = solve_flow(inst, restarts, seed or 0, stats)
+    return r.to_assignment(df_raw["Name"].tolist(), inst.group, shifts)
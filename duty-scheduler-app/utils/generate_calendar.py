@@ -1,81 +1,154 @@
-
-import pandas as pd, openpyxl, datetime, re
+import pandas as pd, openpyxl, datetime, io, re
 from collections import defaultdict
-from openpyxl.styles import Alignment, Border, Side, PatternFill, Font
+from dataclasses import dataclass, field
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Side, PatternFill, Font, NamedStyle
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
 
-def generate_pretty_calendar(schedule_df: pd.DataFrame, year:int, month:int, holidays:set|None=None,
-                             out_path:str="pretty_calendar.xlsx")->str:
-    if holidays is None:
-        holidays=set()
-    def to_date(d:int): return datetime.date(year,month,d)
-    # collect duty info
-    day_info=defaultdict(lambda:{"日直":[],"当直":[],"OC":""})
-    for _,row in schedule_df.iterrows():
-        day=int(re.match(r'(\d+)',row['Shift']).group(1))
-        sub=int(re.search(r'-(\d)',row['Shift']).group(1)) if '-' in row['Shift'] else 0
-        names="/".join([n for n in [row['Duty_G0'],row['Duty_G1']] if n])
-        if sub==1:
-            day_info[day]['日直'].append(names)
+from utils.shift_index import ShiftIndex
+
+WEEKDAYS = ["日","月","火","水","木","金","土"]
+LEGEND = "日直 = -1 シフト   当直 = -2 / 平日シフト   OC: Oncall"
+
+
+@dataclass
+class CalendarMonth:
+    """1 シート分のカレンダー（日ごとの文字列は前もって作っておく）。"""
+    year: int
+    month: int
+    texts: dict                              # 日 -> セルの文字列
+    holidays: set = field(default_factory=set)
+    title: str = ""                          # シート名（省略時は YYYY-MM）
+
+
+def day_texts(schedule_df: pd.DataFrame, index: ShiftIndex | None = None) -> dict:
+    """schedule_df を日ごとのセル文字列 {日: "3\n日直 …\n当直 …/OC:…"} にまとめる。"""
+    s = schedule_df.fillna("")
+    index = index or ShiftIndex.from_columns(s["Shift"])
+    j = s["Shift"].map(index.pos).to_numpy()
+    nichoku, tochoku, oc = defaultdict(list), defaultdict(list), {}
+    for d, sub, g0, g1, o in zip(index.day[j], index.sub[j], s["Duty_G0"].to_numpy(), s["Duty_G1"].to_numpy(),
+                                 s["Oncall_G0"].to_numpy()):
+        d, names = int(d), "/".join(n for n in (g0, g1) if n)
+        if sub == 1:
+            nichoku[d].append(names)
         else:
-            day_info[day]['当直'].append(names)
-            if row['Oncall_G0']:
-                day_info[day]['OC']=row['Oncall_G0']
-    # workbook
-    wb=openpyxl.Workbook()
-    ws=wb.active
-    ws.title="Calendar"
-    # styles
-    thin=Side(style="thin",color="000000")
-    border=Border(top=thin,left=thin,right=thin,bottom=thin)
-    center=Alignment(horizontal="center",vertical="center",wrap_text=True)
-    hdr_fill=PatternFill("solid",fgColor="DDDDDD")
-    hdr_font=Font(bold=True)
-    red_font=Font(color="FF0000")
-    blue_font=Font(color="0000FF")
-    # title
-    ws.merge_cells(start_row=1,start_column=1,end_row=1,end_column=7)
-    t=ws.cell(1,1,f"{year}年{month}月")
-    t.alignment=center; t.font=Font(bold=True,size=14)
-    # headers
-    weekdays=["日","月","火","水","木","金","土"]
-    for col,wd in enumerate(weekdays,1):
-        c=ws.cell(2,col,wd); c.alignment=center; c.font=hdr_font; c.fill=hdr_fill; c.border=border
-        ws.column_dimensions[get_column_letter(col)].width=22
-    for r in range(3,10):
-        ws.row_dimensions[r].height=48
-    # fill days
-    first_wd=to_date(1).weekday() # Mon=0
-    col=((first_wd+1)%7)+1
-    row=3
-    day=1
-    while True:
-        try:
-            date=to_date(day)
-        except ValueError:
-            break
-        info=day_info.get(day,{})
-        parts=[]
-        if info.get('日直'):
-            parts.append("日直 "+"/".join(info['日直']))
-        if info.get('当直'):
-            line="当直 "+"/".join(info['当直'])
-            if info.get('OC'):
-                line+="/OC:"+info['OC']
-            parts.append(line)
-        text=str(day) if not parts else f"{day}\n" + "\n".join(parts)
-        cell=ws.cell(row,col,text)
-        cell.alignment=center; cell.border=border
-        if date in holidays or date.weekday()==6:
-            cell.font=red_font
-        elif date.weekday()==5:
-            cell.font=blue_font
-        col+=1
-        if col>7:
-            col=1; row+=1
-        day+=1
-    lg=row+2
-    ws.merge_cells(start_row=lg,start_column=1,end_row=lg,end_column=7)
-    ws.cell(lg,1,"日直 = -1 シフト   当直 = -2 / 平日シフト   OC: Oncall").alignment=center
-    wb.save(out_path)
-    return out_path
+            tochoku[d].append(names)
+            if o: oc[d] = o                                   # 同じ日に複数あれば後のシフト
+    texts = {}
+    for d in sorted({*nichoku, *tochoku}):
+        lines = [str(d)]
+        if d in nichoku:
+            lines.append("日直 " + "/".join(nichoku[d]))
+        if d in tochoku:
+            lines.append("当直 " + "/".join(tochoku[d]) + (f"/OC:{oc[d]}" if d in oc else ""))
+        texts[d] = "\n".join(lines)
+    return texts
+
+
+def _styles() -> list[NamedStyle]:
+    thin = Side(style="thin", color="000000")
+    border = Border(top=thin, left=thin, right=thin, bottom=thin)
+    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    def ns(name, **kw): return NamedStyle(name, alignment=center, **kw)
+    return [ns("cal_title", font=Font(bold=True, size=14)),
+            ns("cal_header", font=Font(bold=True), fill=PatternFill("solid", fgColor="DDDDDD"), border=border),
+            ns("cal_day", border=border),
+            ns("cal_sat", border=border, font=Font(color="0000FF")),
+            ns("cal_sun", border=border, font=Font(color="FF0000")),
+            ns("cal_legend")]
+
+
+def _rows(cm: CalendarMonth):
+    # (値, スタイル名) の行を上から順に返す
+    yield [(f"{cm.year}年{cm.month}月", "cal_title")] + [(None, None)] * 6
+    yield [(wd, "cal_header") for wd in WEEKDAYS]
+    first = datetime.date(cm.year, cm.month, 1)
+    n_days = ((first + datetime.timedelta(days=31)).replace(day=1) - first).days
+    col = (first.weekday() + 1) % 7                          # 日曜始まり
+    row = [(None, None)] * col
+    for d in range(1, n_days + 1):
+        date = first.replace(day=d)
+        style = ("cal_sun" if date in cm.holidays or date.weekday() == 6 else
+                 "cal_sat" if date.weekday() == 5 else "cal_day")
+        row.append((cm.texts.get(d, str(d)), style))
+        if len(row) == 7:
+            yield row; row = []
+    if row:
+        yield row
+    yield []
+    yield [(LEGEND, "cal_legend")] + [(None, None)] * 6
+
+
+def _sheet_title(cm: CalendarMonth, used: set) -> str:
+    base = re.sub(r"[\[\]:*?/\\]", "_", cm.title or f"{cm.year}-{cm.month:02d}")[:31]
+    title, k = base, 1
+    while title in used:
+        k += 1; title = f"{base[:28]}_{k}"
+    used.add(title)
+    return title
+
+
+def add_calendar_sheets(wb: openpyxl.Workbook, months: list[CalendarMonth], write_only: bool = False) -> None:
+    """既存のブックにカレンダーのシートを足す（名前付きスタイルはまだなければ登録）。"""
+    have = set(wb.named_styles)
+    for s in _styles():
+        if s.name not in have:
+            wb.add_named_style(s)
+    used = set(wb.sheetnames)
+    for cm in months:
+        ws = wb.create_sheet(_sheet_title(cm, used))
+        for c in range(1, 8):
+            ws.column_dimensions[get_column_letter(c)].width = 22
+        n = 0
+        for n, cells in enumerate(_rows(cm), 1):
+            if 3 <= n <= 9:
+                ws.row_dimensions[n].height = 48
+            if write_only:
+                out = []
+                for v, style in cells:
+                    c = WriteOnlyCell(ws, v)
+                    if style: c.style = style
+                    out.append(c)
+                ws.append(out)
+            else:
+                for k, (v, style) in enumerate(cells, 1):
+                    if style:
+                        ws.cell(n, k, v).style = style
+        for r in ("A1:G1", f"A{n}:G{n}"):                    # タイトルと凡例
+            ws.merged_cells.add(CellRange(r)) if write_only else ws.merge_cells(r)
+
+
+def render_calendars(months: list[CalendarMonth], write_only: bool = False) -> bytes:
+    """複数のカレンダーを 1 つのブックのシートにして xlsx のバイト列で返す。
+
+    スタイルは名前付きスタイルとしてブックに 1 回だけ登録し、セルは名前で参照する。
+    write_only=True なら openpyxl の書き込み専用モード（行を流し込むだけ・大量出力向け）。
+    """
+    wb = openpyxl.Workbook(write_only=write_only)
+    if not write_only:
+        wb.remove(wb.active)
+    add_calendar_sheets(wb, months, write_only)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def calendar_month(schedule_df: pd.DataFrame, year: int, month: int, holidays: set | None = None,
+                   title: str = "", index: ShiftIndex | None = None) -> CalendarMonth:
+    """schedule_df から 1 か月分のシートを作る。holidays 省略時は列の切り方（平日の -1/-2）から読む。"""
+    index = index or ShiftIndex.from_columns(schedule_df["Shift"], year, month)
+    if holidays is None:
+        holidays = index.public_holidays()
+    return CalendarMonth(year, month, day_texts(schedule_df, index), set(holidays), title)
+
+
+def generate_pretty_calendar(schedule_df: pd.DataFrame, year:int, month:int, holidays:set|None=None,
+                             out_path:str|None=None, index: ShiftIndex | None = None)->bytes:
+    """1 か月分のカレンダー xlsx（バイト列）。out_path があればファイルにも書く。"""
+    data = render_calendars([calendar_month(schedule_df, year, month, holidays, "Calendar", index)])
+    if out_path:
+        with open(out_path, "wb") as f:
+            f.write(data)
+    return data
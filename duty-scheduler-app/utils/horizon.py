@@ -0,0 +1,165 @@
+import dataclasses, datetime, time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from utils.loose_scheduler import build_schedule as build_schedule_loose
+from utils.shift_index import ShiftIndex
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model, extract_schedule, hint_from_schedule, solve_strict_model
+from utils.symmetry import break_symmetry
+
+NO_LAST = -10**6   # 引継ぎなし（いつ入ってもよい）
+
+
+@dataclass
+class Carry:
+    """前月までの引継ぎ情報（医師名キー）。"""
+    last_work: dict = field(default_factory=dict)   # Name -> 最終勤務日 (datetime.date)
+    duty: dict = field(default_factory=dict)        # Name -> 累計 Duty
+    oncall: dict = field(default_factory=dict)      # Name -> 累計 Oncall
+
+    def total(self, name: str) -> int:
+        return self.duty.get(name, 0) + self.oncall.get(name, 0)
+
+    def arrays(self, names, year: int, month: int) -> dict:
+        """build_strict_model に渡す last_day / prior（year-month の 1 日 = 1）。"""
+        first = datetime.date(year, month, 1)
+        last_day = np.array([(self.last_work[n] - first).days + 1 if n in self.last_work else NO_LAST
+                             for n in names], dtype=int)
+        prior = np.array([self.total(n) for n in names], dtype=int)
+        return {"last_day": last_day, "prior": prior}
+
+    def advance(self, schedule_df: pd.DataFrame, year: int, month: int) -> "Carry":
+        """この月の割付結果を足した新しい Carry を返す。"""
+        new = Carry(dict(self.last_work), dict(self.duty), dict(self.oncall))
+        idx = ShiftIndex.from_columns(schedule_df["Shift"], year, month)
+        for _, r in schedule_df.iterrows():
+            date = idx.date(idx.day[idx.pos[r["Shift"]]])
+            for col, cnt in (("Duty_G0", new.duty), ("Duty_G1", new.duty), ("Oncall_G0", new.oncall)):
+                for name in str(r[col]).split(","):
+                    name = name.strip()
+                    if name:
+                        cnt[name] = cnt.get(name, 0) + 1
+                        if new.last_work.get(name, date) <= date:
+                            new.last_work[name] = date
+        return new
+
+    @classmethod
+    def from_schedule(cls, schedule_df: pd.DataFrame, year: int, month: int) -> "Carry":
+        return cls().advance(schedule_df.fillna(""), year, month)
+
+
+@dataclass
+class MonthResult:
+    year: int
+    month: int
+    schedule_df: pd.DataFrame | None    # None = 解けなかった / 未着手
+    summary_df: pd.DataFrame | None
+    seconds: float = 0.0
+
+
+def next_month(year: int, month: int, k: int = 1) -> tuple[int, int]:
+    return year + (month - 1 + k) // 12, (month - 1 + k) % 12 + 1
+
+
+def stack_months(months: list[tuple[int, int, pd.DataFrame]]):
+    """複数月の CSV を日番号通しの 1 枚にまとめる。
+
+    医師は (Name, 同名内の出現順) で突き合わせ、その月に居ない医師は全 NG。
+    戻り値: (df, month_starts, present, rows_of, cols_of)
+      rows_of[k]  k か月目の CSV の各行 → まとめた df の行
+      cols_of[k]  k か月目の (まとめた列名, 元の列名) のリスト
+    """
+    y0, m0, _ = months[0]
+    start = datetime.date(y0, m0, 1)
+    keys, group, rows_of = {}, [], []
+    for _, _, df in months:
+        seen, rows = {}, []
+        for name, g in zip(df["Name"], df["Group"]):
+            k = (name, seen.get(name, 0)); seen[name] = k[1] + 1
+            if k not in keys:
+                keys[k] = len(keys); group.append(int(g))
+            rows.append(keys[k])
+        rows_of.append(rows)
+
+    blocks, month_starts, present, cols_of = [], [], np.zeros((len(keys), len(months)), dtype=bool), []
+    for p, (y, m, df) in enumerate(months):
+        offset = (datetime.date(y, m, 1) - start).days
+        month_starts.append(offset + 1)
+        idx = ShiftIndex.from_columns(df.columns)
+        cols = idx.shifts
+        new_cols = [f"{d + offset}" + (f"-{sub}" if sub else "") + (f"({label})" if label else "")
+                    for d, sub, label in zip(idx.day, idx.sub, idx.labels)]
+        block = np.ones((len(keys), len(cols)), dtype=int)          # 居ない月は NG
+        block[rows_of[p]] = df[cols].to_numpy()
+        blocks.append(pd.DataFrame(block, columns=new_cols))
+        present[rows_of[p], p] = True
+        cols_of.append(list(zip(new_cols, cols)))
+
+    head = pd.DataFrame({"Group": group, "Name": [k[0] for k in keys]})
+    return pd.concat([head, *blocks], axis=1), month_starts, present, rows_of, cols_of
+
+
+def greedy_hint(sm, part, cols_of, carry: Carry, seed: int = 0) -> int:
+    """窓内の各月を loose の greedy で順に埋め、まとめた列名に直して sm のヒントにする（seed 固定）。"""
+    greedy = []
+    for p, (y, m, df) in enumerate(part):
+        g, _ = build_schedule_loose(df, y, m, carry, workers=1, seed=seed)
+        carry = carry.advance(g, y, m)
+        greedy.append(g.assign(Shift=g["Shift"].map({o: n for n, o in cols_of[p]})))
+    return hint_from_schedule(sm, pd.concat(greedy, ignore_index=True))
+
+
+def solve_horizon(months: list[tuple[int, int, pd.DataFrame]], mode: str = "strict", window: int = 1,
+                  time_budget: float = 60.0, carry: Carry | None = None, config: SolverConfig | None = None):
+    """複数月を前から順に割り付ける（ローリングホライズン）。
+
+    strict では window か月ぶんを 1 つのモデルで解き、先頭の 1 か月だけ確定して次へ進む
+    （window = 月数なら全体を 1 回で解く）。確定した月の最終勤務日・累計回数は
+    Carry として次の窓の間隔制約と目的関数に入る。loose は 1 か月ずつ Carry 付きで回す。
+    time_budget は残りの解く回数で割って各回に配る（config.time_limit より優先）。
+
+    戻り値: (list[MonthResult], 最後まで進んだ Carry)
+    """
+    carry = carry or Carry()
+    config = config or SolverConfig()
+    window = 1 if mode == "loose" else max(1, min(window, len(months)))
+    results = [MonthResult(y, m, None, None) for y, m, _ in months]
+    deadline = time.perf_counter() + time_budget
+    k = 0
+    while k < len(months):
+        t0 = time.perf_counter()
+        y, m, df = months[k]
+        if mode == "loose":
+            sched, summary = build_schedule_loose(df, y, m, carry, workers=1)
+            results[k] = MonthResult(y, m, sched, summary, time.perf_counter() - t0)
+            carry = carry.advance(sched, y, m)
+            k += 1
+            continue
+
+        part = months[k:k + window]
+        last = k + window >= len(months)                 # 最後の窓は全部確定
+        solves_left = max(1, len(months) - window + 1 - k)
+        limit = max(1.0, (deadline - t0) / solves_left)
+        df_all, month_starts, present, rows_of, cols_of = stack_months(part)
+        arrays = carry.arrays(df_all["Name"], y, m)
+        sm = build_strict_model(df_all, month_starts=month_starts, present=present, **arrays)
+        if config.greedy_hint:
+            greedy_hint(sm, part, cols_of, carry, config.seed)
+        if config.symmetry:
+            break_symmetry(sm, arrays.get("prior"), present)
+        solver = solve_strict_model(sm, dataclasses.replace(config, time_limit=limit))
+        if solver is None:
+            break                                        # 以降の月は未着手のまま返す
+        col_idx = {c: j for j, c in enumerate(sm.shifts)}
+        for p in range(len(part) if last else 1):
+            yp, mp, _ = part[p]
+            cols = sorted(cols_of[p], key=lambda c: col_idx[c[0]])
+            sched, summary = extract_schedule(sm, solver, cols=[col_idx[c] for c, _ in cols],
+                                              rows=rows_of[p], names=[o for _, o in cols])
+            results[k + p] = MonthResult(yp, mp, sched, summary, time.perf_counter() - t0)
+            carry = carry.advance(sched, yp, mp)
+        k += len(part) if last else 1
+    return results, carry
@@ -0,0 +1,119 @@
+import threading, time
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from utils.rest_rules import STRICT_GAP
+from utils.solver_config import SolverConfig
+from utils.strict_model import (StrictModel, build_strict_model, extract_assignment, schedule_cells,
+                                solve_strict_model)
+
+ROLES = ("Duty_G0", "Duty_G1", "Oncall_G0")
+LOCAL_SHARE = 0.5   # 近傍だけの解き直しに使う制限時間の割合（残りは全体の解き直しへ）
+
+
+def schedule_diff(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """2 つの割付表の差分（Shift × 役割ごとに名前が変わったセル）。"""
+    b = before.fillna("").set_index("Shift")
+    a = after.fillna("").set_index("Shift")
+    shifts = list(dict.fromkeys([*a.index, *b.index]))
+    rows = []
+    for s in shifts:
+        for role in ROLES:
+            old = b[role].get(s, "") if s in b.index else ""
+            new = a[role].get(s, "") if s in a.index else ""
+            if old != new:
+                rows.append({"Shift": s, "Role": role, "Before": old, "After": new})
+    return pd.DataFrame(rows, columns=["Shift", "Role", "Before", "After"])
+
+
+def _churn_objective(sm: StrictModel, prev: set):
+    # 前回 1 のセルを 0 にする / 前回 0 のセルを 1 にする、をそれぞれ 1 回の変更と数える
+    Sum = cp_model.LinearExpr.Sum
+    on  = [v for is_y, var in ((False, sm.x), (True, sm.y)) for (i, j), v in var.items() if (is_y, i, j) in prev]
+    off = [v for is_y, var in ((False, sm.x), (True, sm.y)) for (i, j), v in var.items() if (is_y, i, j) not in prev]
+    sm.model.Minimize(Sum(off) - Sum(on))
+
+
+def _free_cells(sm: StrictModel, broken: list[tuple[int, int]], gap: int) -> tuple[set, np.ndarray]:
+    # 壊れたセルの医師は全部、壊れたセルの前後 gap 日のシフトは全員ぶん自由にする
+    doctors = {i for i, _ in broken}
+    days = np.zeros(len(sm.shifts), dtype=bool)
+    for _, j in broken:
+        days |= np.abs(sm.day - sm.day[j]) <= gap
+    return doctors, days
+
+
+def resolve_incremental(df_raw: pd.DataFrame, prev_schedule: pd.DataFrame, carry_arrays: dict | None = None,
+                        config: SolverConfig | None = None, gap: int = STRICT_GAP, callback=None,
+                        cancel: threading.Event | None = None, stats: dict | None = None):
+    """公開済みの割付 prev_schedule を、編集後の可用性 df_raw に合わせて最小変更で直す。
+
+    1) 可用性が変わって続けられなくなったセルの周り（その医師・前後 gap 日）だけを動かし、
+       それ以外は前回の値に固定して解く（小さいので速い）。
+    2) それで直せなければ、全体を「前回からの変更数最小」で解き直す。
+    どちらも前回の割付をヒントに入れる。制限時間は 2 つ合わせて config.time_limit で、1) は
+    LOCAL_SHARE まで、2) は残りの時間だけ使う。callback は CP-SAT に渡す解のコールバック
+    （ProgressCallback.cancel() で探索を止められる）。cancel が立ったらそこまでの解を返す。
+
+    stats があれば全体の解き直しの solver_stats（status で不可能か時間切れかが分かる）を入れる。
+
+    戻り値: (Assignment, diff_df) / 解けなければ（止めたときに解がなければ）None
+    """
+    config = config or SolverConfig()
+    deadline = time.perf_counter() + config.time_limit
+    sm = build_strict_model(df_raw, gap, **(carry_arrays or {}))
+    prev = schedule_cells(sm, prev_schedule)
+
+    # 前回の割付のうち変数がない（= もう入れない）セル
+    idx = {}
+    for i, name in enumerate(sm.doctors):
+        idx.setdefault(name, i)
+    col = {s: j for j, s in enumerate(sm.shifts)}
+    broken = []
+    for _, r in prev_schedule.fillna("").iterrows():
+        j = col.get(r["Shift"])
+        for role in ROLES:
+            for name in str(r[role]).split(","):
+                i = idx.get(name.strip())
+                if name.strip() and j is not None and i is not None and \
+                        (role == "Oncall_G0", i, j) not in prev:
+                    broken.append((i, j))
+
+    _churn_objective(sm, prev)
+    for is_y, var in ((False, sm.x), (True, sm.y)):
+        for (i, j), v in var.items():
+            sm.model.AddHint(v, (is_y, i, j) in prev)
+
+    solver = None
+    if broken:
+        # 1) 近傍だけ動かす
+        doctors, days = _free_cells(sm, broken, gap)
+        local = sm.model.Clone()
+        proto = local.Proto()
+        for is_y, var in ((False, sm.x), (True, sm.y)):
+            for (i, j), v in var.items():
+                if i not in doctors and not days[j]:
+                    val = int((is_y, i, j) in prev)
+                    dom = proto.variables[v.Index()].domain     # Bool は [0, 1]
+                    dom[0] = dom[1] = val
+        s = replace(config, time_limit=config.time_limit * LOCAL_SHARE).make_solver()
+        if s.Solve(local, callback) in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            solver = s
+    if solver is None:
+        if cancel is not None and cancel.is_set():
+            return None
+        # 2) 全体を変更数最小で（残りの時間だけ）
+        left = deadline - time.perf_counter()
+        if left <= 0:
+            if stats is not None:
+                stats["status"] = "UNKNOWN"
+            return None
+        solver = solve_strict_model(sm, replace(config, time_limit=left), callback, stats)
+        if solver is None:
+            return None
+
+    a = extract_assignment(sm, solver)
+    return a, schedule_diff(prev_schedule, a.schedule_df())
@@ -0,0 +1,121 @@
+import datetime, json, resource, sys, threading, time, tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+from ortools.sat.python import cp_model
+
+
+def _rss_mib() -> float:
+    # プロセスの最大常駐メモリ（Linux は KiB、macOS は B）
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / 2**20 if sys.platform == "darwin" else r / 2**10
+
+# tracemalloc はプロセスに 1 つなので、測っている段階の数を数えて最初の 1 つで始め、最後の 1 つで止める
+_trace_lock = threading.Lock()
+_tracers = 0
+_owned = False          # 自分で start したか（外で始めた tracemalloc は止めない）
+
+
+def _trace_start() -> None:
+    global _tracers, _owned
+    with _trace_lock:
+        if _tracers == 0:
+            _owned = not tracemalloc.is_tracing()
+            if _owned:
+                tracemalloc.start()
+            tracemalloc.reset_peak()            # ほかに測っている段階がないときだけ
+        _tracers += 1
+
+
+def _trace_stop() -> float:
+    global _tracers
+    with _trace_lock:
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        _tracers -= 1
+        if _tracers == 0 and _owned:
+            tracemalloc.stop()
+    return peak
+
+
+@dataclass
+class Stage:
+    name: str
+    seconds: float
+    peak_mib: float | None        # tracemalloc のピーク（memory=True のときだけ。C++ 側は含まない）
+    max_rss_mib: float            # その段階の終わりでのプロセス最大 RSS
+
+
+class FirstSolutionTimer(cp_model.CpSolverSolutionCallback):
+    """最初の解までの時間と解の数を数えるコールバック。"""
+
+    def __init__(self):
+        super().__init__()
+        self.t0 = time.perf_counter()
+        self.first: float | None = None
+        self.count = 0
+
+    def on_solution_callback(self):
+        self.count += 1
+        if self.first is None:
+            self.first = time.perf_counter() - self.t0
+
+
+def solver_stats(model: cp_model.CpModel, solver: cp_model.CpSolver, status) -> dict:
+    """CP-SAT の統計（モデルの大きさ・状態・衝突・分岐・時間）。status は Solve の戻り値。"""
+    p = model.Proto()
+    solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    return {"variables": len(p.variables), "constraints": len(p.constraints),
+            "status": solver.status_name(status), "conflicts": solver.num_conflicts,
+            "branches": solver.num_branches, "wall_time": round(solver.wall_time, 4),
+            "objective": solver.objective_value if solved else None}
+
+
+class Profiler:
+    """段階ごとの時間・メモリと、ソルバーの統計を集める。
+
+        prof = Profiler(memory=True)
+        with prof.stage("build"):
+            ...
+        prof.solver.update(...)
+
+    memory=True なら tracemalloc で段階ごとの Python 側ピークも測る（そのぶん遅くなる）。
+    段階は入れ子にしない。別スレッドの Profiler と段階が重なったときのピークは、重なった段階の分も
+    含む（多めに出る）上限になる。
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.stages: list[Stage] = []
+        self.solver: dict = {}
+        self.current: str | None = None            # いま走っている段階（別スレッドから覗く用）
+        self.started = datetime.datetime.now().isoformat(timespec="seconds")
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.memory:
+            _trace_start()
+        t = time.perf_counter()
+        self.current = name
+        try:
+            yield
+        finally:
+            self.current = None
+            sec = time.perf_counter() - t
+            peak = None
+            if self.memory:
+                peak = _trace_stop()
+            self.stages.append(Stage(name, sec, peak, _rss_mib()))
+
+    def frame(self) -> pd.DataFrame:
+        df = pd.DataFrame([asdict(s) for s in self.stages], columns=["name", "seconds", "peak_mib", "max_rss_mib"])
+        return df.set_index("name")
+
+    def record(self, **meta) -> dict:
+        return {"time": self.started, **meta, "total_seconds": round(sum(s.seconds for s in self.stages), 4),
+                "stages": [asdict(s) for s in self.stages], "solver": self.solver}
+
+    def append_jsonl(self, path: str, **meta) -> None:
+        """1 回分を JSON lines で追記する（月をまたいで本番の推移を見る用）。"""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.record(**meta), ensure_ascii=False, default=str) + "\n")
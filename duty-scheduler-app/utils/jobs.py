@@ -0,0 +1,104 @@
+import threading, time
+
+from utils.fairness import AnytimeSolve
+from utils.instrument import FirstSolutionTimer, Profiler
+
+
+class ProgressCallback(FirstSolutionTimer):
+    """解の数・最初の解までの時間に加えて、最新の目的値・下界を持つ。
+
+    cancel() は別スレッドから呼んでよい（解いている最中なら探索を止める）。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.objective: float | None = None
+        self.bound: float | None = None
+        self.cancelled = threading.Event()
+
+    def on_solution_callback(self):
+        super().on_solution_callback()
+        self.objective, self.bound = self.objective_value, self.best_objective_bound
+        if self.cancelled.is_set():
+            self.stop_search()
+
+    def cancel(self):
+        self.cancelled.set()
+        try:
+            self.stop_search()
+        except RuntimeError:          # いまは解いていない（モデル構築中・解き直しの合間）
+            pass
+
+
+class SolveJob:
+    """fn(job) をバックグラウンドのスレッドで 1 回走らせ、進み具合と結果を持つ。
+
+    Streamlit の session_state に置き、再実行のあいだも key が同じなら同じジョブにつなぎ直す。
+    fn には job.progress（CP-SAT のコールバック）・job.progress.cancelled・job.watch
+    （公平性モードの AnytimeSolve を受け取る）・job.prof を渡して使う。memory なら段階ごとのメモリも測る。
+    """
+
+    def __init__(self, key: str, fn, time_limit: float | None = None, memory: bool = False):
+        self.key = key
+        self.time_limit = time_limit
+        self.progress = ProgressCallback()
+        self.prof = Profiler(memory=memory)
+        self.anytime: AnytimeSolve | None = None
+        self.result = None
+        self.error: BaseException | None = None
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+        self._thread = threading.Thread(target=self._run, args=(fn,), daemon=True)
+
+    def _run(self, fn):
+        try:
+            self.result = fn(self)
+        except Exception as e:                  # 画面側で Infeasible / Cancelled などを出し分ける
+            self.error = e
+        finally:
+            self.finished = time.perf_counter()
+
+    def start(self) -> "SolveJob":
+        self._thread.start()
+        return self
+
+    def watch(self, run: AnytimeSolve):
+        # 公平性モード：打ち切りは run.stop()（そこまでの最良解が残る）
+        self.anytime = run
+        if self.cancelled:
+            run.stop()
+        run.join()
+
+    def cancel(self):
+        self.progress.cancel()
+        if self.anytime is not None:
+            self.anytime.stop()
+
+    @property
+    def token(self) -> str:
+        # ジョブ 1 回ごとの印（同じ入力で解き直したら変わる）
+        return f"{self.key}:{self.started}"
+
+    @property
+    def cancelled(self) -> bool:
+        return self.progress.cancelled.is_set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def status(self) -> dict:
+        """いまの段階・経過秒・見つけた解の数・最良の目的値と下界。"""
+        if self.anytime is not None:
+            history = list(self.anytime.callback.history)
+            best = history[-1] if history else None
+            solutions, objective, bound = len(history), best and best.objective, best and best.bound
+        else:
+            p = self.progress
+            solutions, objective, bound = p.count, p.objective, p.bound
+        return {"stage": self.prof.current, "elapsed": self.elapsed, "solutions": solutions,
+                "objective": objective, "bound": bound}
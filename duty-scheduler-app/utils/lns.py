@@ -0,0 +1,235 @@
+import multiprocessing, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from utils.assignment import DUTY, ONCALL, Assignment
+from utils.fairness import FairnessGoal, Improvement, add_fairness_objective
+from utils.model_template import build_from_template
+from utils.shift_index import ShiftIndex
+from utils.solver_config import SolverConfig
+from utils.strict_model import extract_assignment, schedule_cells
+
+KINDS = ("week", "doctors", "group")
+
+
+@dataclass
+class Window:
+    """1 回に解き直す範囲：rows の医師 × cols のシフト（それ以外のセルは今の値に固定）。"""
+    kind: str
+    rows: np.ndarray        # 医師の行番号
+    cols: np.ndarray        # (S,) bool
+    label: str = ""
+
+
+@dataclass
+class LNSResult:
+    best: Improvement | None
+    history: list[Improvement] = field(default_factory=list)
+    stats: dict = field(default_factory=dict)
+
+    def frame(self) -> pd.DataFrame:
+        """改善の推移（秒・目的値・幅）。"""
+        return pd.DataFrame([(h.seconds, h.objective, h.total_spread, h.holiday_spread) for h in self.history],
+                            columns=["seconds", "objective", "total_spread", "holiday_spread"])
+
+
+# ---------- 目的値（NumPy） ----------
+def fairness_value(matrix: np.ndarray, group: np.ndarray, hol_ok: np.ndarray, sub: np.ndarray,
+                   goal: FairnessGoal, prior=None) -> tuple[int, int, int]:
+    """add_fairness_objective と同じ目的値を割付行列から数える（(目的値, Duty+Oncall の幅, -1 の幅)）。
+
+    hol_ok は -1 シフトに可のセルがある医師（モデルで -1 の幅に入る医師）。
+    """
+    total = (matrix != 0).sum(axis=1) + (0 if prior is None else np.asarray(prior, dtype=int))
+    hol = (matrix[:, sub == 1] == DUTY).sum(axis=1)
+    spreads = ([], [])
+    for g in (0, 1):
+        rows = group == g
+        for k, (v, r) in enumerate(((total, rows), (hol, rows & hol_ok))):
+            if r.sum() > 1:
+                spreads[k].append(int(v[r].max() - v[r].min()))
+    obj = goal.total_weight * sum(spreads[0]) + goal.holiday_weight * sum(spreads[1])
+    return obj, max(spreads[0], default=0), max(spreads[1], default=0)
+
+
+# ---------- 窓 ----------
+def make_windows(kind: str, n: int, group: np.ndarray, week: np.ndarray, rng: np.random.Generator,
+                 size: int = 12) -> list[Window]:
+    """kind の窓を n 個（ワーカーごとに 1 つ。窓どうしは重なってよい）。
+
+    week:    全医師 × 1 週（窓ごとに別の週）
+    doctors: ランダムな size 人 × 全シフト
+    group:   G0 か G1 の全員 × 全シフト
+    """
+    D, W = len(group), int(week.max(initial=-1)) + 1
+    if kind == "week":
+        weeks = np.r_[rng.permutation(W), rng.integers(W, size=max(0, n - W))]
+        return [Window(kind, np.arange(D), week == w, f"week {w}") for w in weeks[:n]]
+    if kind == "doctors":
+        return [Window(kind, np.sort(rng.choice(D, min(size, D), replace=False)), np.ones(len(week), bool),
+                       f"{min(size, D)} doctors") for _ in range(n)]
+    if kind == "group":
+        g0 = int(rng.integers(2))
+        return [Window(kind, np.flatnonzero(group == (g0 + k) % 2), np.ones(len(week), bool), f"G{(g0 + k) % 2}")
+                for k in range(n)]
+    raise ValueError(f"窓の種類は {KINDS} のどれかです: {kind}")
+
+
+def _solve_window(task: dict, out: dict | None = None):
+    """窓 1 つを解き直す（プロセスプールの中でも動くようにモジュールの関数に）。
+
+    型はプロセスごとのキャッシュから引き、窓の外の変数は今の値に固定、窓の中は今の値をヒントにする。
+    first なら最初の解で止める（可行解を作るだけ）。戻り値: 窓のセルの新しい値（解がなければ None）。
+    out があれば CP-SAT の状態名（"INFEASIBLE" / "UNKNOWN" など）を入れる。
+    """
+    sm = build_from_template(task["df_raw"], index=task["index"], **task["arrays"])
+    add_fairness_objective(sm, task["goal"], task["arrays"].get("prior"))
+    cur, free = task["matrix"], np.zeros(sm.avail.shape, bool)
+    free[np.ix_(task["rows"], np.flatnonzero(task["cols"]))] = True
+    proto = sm.model.Proto()
+    for var, code in ((sm.x, DUTY), (sm.y, ONCALL)):
+        for (i, j), v in var.items():
+            on = int(cur[i, j] == code)
+            if free[i, j]:
+                sm.model.AddHint(v, on)
+            else:
+                d = proto.variables[v.Index()].domain
+                d[0] = d[1] = on                                  # [0, 1] → [on, on]
+    solver = SolverConfig(task["time_limit"], 1, task["seed"], presolve=True).make_solver()
+    solver.parameters.stop_after_first_solution = task.get("first", False)
+    status = solver.Solve(sm.model)
+    if out is not None:
+        out["status"] = solver.status_name(status)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    return extract_assignment(sm, solver).matrix[free]
+
+
+def _apply(cur: np.ndarray, w: Window, new: np.ndarray) -> np.ndarray:
+    out = cur.copy()
+    out[np.ix_(w.rows, np.flatnonzero(w.cols))] = new.reshape(len(w.rows), -1)
+    return out
+
+
+# ---------- 本体 ----------
+def start_matrix(df_raw: pd.DataFrame, start, index: ShiftIndex) -> np.ndarray:
+    """出発点の割付行列。Assignment ならそのまま、schedule_df（公開済み・前回の割付）なら名前で引く。"""
+    if isinstance(start, Assignment):
+        return start.matrix.astype(np.int8)
+    sm = build_from_template(df_raw, index=index)
+    m = np.zeros(sm.avail.shape, np.int8)
+    for is_y, i, j in schedule_cells(sm, start):
+        m[i, j] = ONCALL if is_y else DUTY
+    return m
+
+
+def lns_improve(df_raw: pd.DataFrame, start, index: ShiftIndex, arrays: dict | None = None,
+                goal: FairnessGoal | None = None, time_budget: float = 30.0, window_time: float = 1.0,
+                workers: int = 1, kinds=KINDS, size: int = 12, seed: int = 0, on_solution=None,
+                cancel: threading.Event | None = None) -> LNSResult:
+    """可行な割付（loose の greedy・前回の割付など）から、窓ごとの解き直しで公平性を上げる（LNS）。
+
+    1 巡ごとに kinds の窓を順に使い、同じ種類の窓を workers 個（workers > 1 ならプロセスプールで
+    並列に）今の割付から解き直す。一番よい窓を採り、医師の重ならない窓も悪くならない限り足す
+    （strict の制約は「シフトごとの人数」と「医師ごとの回数・間隔」だけなので、医師の重ならない
+    窓の結果は合わせても可行）。同点でも別解には移る。出発点が strict で不可行なら、まず全体を
+    出発点のヒントで解いて可行解にする。
+    幅が goal の目標以下・time_budget 秒・cancel のどれかで止める。
+    1 か月ぶんだけ（型は build_from_template の単月モデル。前月からの引き継ぎは arrays で渡す）。
+    複数月の horizon モデルには使えない。画面からは呼ばず batch.py --mode lns だけで使う。
+    """
+    goal = goal or FairnessGoal()
+    arrays = arrays or {}
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    sm = build_from_template(df_raw, index=index, **arrays)
+    group, sub, prior = sm.group, sm.sub, arrays.get("prior")
+    hol_ok = sm.avail[:, sub == 1].any(axis=1)
+    D, S = sm.avail.shape
+    cur = start_matrix(df_raw, start, index)
+    stats = {"engine": "lns", "workers": workers, "rounds": 0, "windows": 0, "accepted": 0, "repaired": False}
+    result = LNSResult(None, stats=stats)
+    base = {"df_raw": df_raw, "index": index, "arrays": arrays, "goal": goal}
+    left = lambda: time_budget - (time.perf_counter() - t0)
+    stopped = cancel.is_set if cancel is not None else lambda: False
+
+    def record(matrix):
+        obj, total, hol = fairness_value(matrix, group, hol_ok, sub, goal, prior)
+        imp = Improvement(time.perf_counter() - t0, obj, float("nan"), total, hol,
+                          Assignment(sm.doctors, group, sm.shifts, matrix.copy()))
+        result.history.append(imp)
+        result.best = imp
+        if on_solution:
+            on_solution(imp)
+        return obj
+
+    # 出発点が strict で可行か（全セル固定で解く）。だめなら出発点をヒントに全体を解いて最初の解で止める
+    task = dict(base, matrix=cur, rows=np.arange(0), cols=np.zeros(S, bool), time_limit=max(left(), 0.1), seed=seed)
+    if _solve_window(task) is None:
+        stats["repaired"] = True
+        out = {}
+        new = _solve_window(dict(task, rows=np.arange(D), cols=np.ones(S, bool), first=True), out)
+        if new is None:
+            stats["reason"] = "infeasible" if out.get("status") == "INFEASIBLE" else "time limit"
+            return result
+        cur = new.reshape(D, S).astype(np.int8)
+    obj = record(cur)
+
+    ctx = multiprocessing.get_context("spawn")          # ストリームリットのスレッドを fork に持ち込まない
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx) if workers > 1 else None
+    reason = "time limit"
+    try:
+        k = 0
+        while True:
+            if result.best.total_spread <= goal.total_target and result.best.holiday_spread <= goal.holiday_target:
+                reason = "good enough"
+                break
+            if stopped():
+                reason = "stopped"
+                break
+            limit = min(window_time, left())
+            if limit <= 0.05:
+                break
+            wins = make_windows(kinds[k % len(kinds)], workers, group, index.week, rng, size)
+            k += 1
+            tasks = [dict(base, matrix=cur, rows=w.rows, cols=w.cols, time_limit=limit,
+                          seed=int(rng.integers(1 << 30))) for w in wins]
+            outs = list(pool.map(_solve_window, tasks)) if pool else [_solve_window(t) for t in tasks]
+            stats["rounds"] += 1
+            stats["windows"] += len(wins)
+            # 一番よい窓から、医師の重ならない窓を順に足していく（悪くならない間だけ）
+            done = []
+            for w, new in zip(wins, outs):
+                if new is not None:
+                    one = _apply(cur, w, new)
+                    done.append((fairness_value(one, group, hol_ok, sub, goal, prior)[0], len(done), one, w.rows))
+            done = [d for d in sorted(done, key=lambda d: d[:2]) if d[0] <= obj]
+            if not done:
+                continue
+            best_val, _, cand, rows = done[0]
+            used = set(rows.tolist())
+            for _, _, one, rows in done[1:]:
+                if used.isdisjoint(rows.tolist()):
+                    merged = np.where(one != cur, one, cand)
+                    v = fairness_value(merged, group, hol_ok, sub, goal, prior)[0]
+                    if v <= best_val:
+                        best_val, cand = v, merged
+                        used.update(rows.tolist())
+            changed = not np.array_equal(cand, cur)
+            cur = cand
+            if best_val < obj:
+                stats["accepted"] += 1
+                obj = record(cur)
+            elif changed:                                 # 同点の別解にも移る（局所解から出る）
+                result.best = Improvement(result.best.seconds, obj, float("nan"), result.best.total_spread,
+                                          result.best.holiday_spread,
+                                          Assignment(sm.doctors, group, sm.shifts, cur.copy()))
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    stats.update(reason=reason, objective=obj, seconds=round(time.perf_counter() - t0, 3))
+    return result
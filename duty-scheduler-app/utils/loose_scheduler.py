@@ -1,346 +1,224 @@
-# -*- coding: utf-8 -*-
-"""20250509 当直 制限緩い版.ipynb
-
-Automatically generated by Colab.
-
-Original file is located at
-    https://colab.research.google.com/drive/1OeywIHF70fVlZyWgOpd9GLqqOma8yG7l
-"""
-
-!pip -q install pandas openpyxl ortools python-dateutil
+import datetime, multiprocessing, os, random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 
+import numpy as np
 import pandas as pd
-import streamlit as st
-import re, random, datetime, tempfile, os, io, csv
-from collections import defaultdict
-from ortools.sat.python import cp_model
-from google.colab import files
-import openpyxl
-from openpyxl.styles import Alignment, Border, Side, PatternFill, Font
-from openpyxl.utils import get_column_letter
-
-# =========================
-# 1) CSV アップロード
-# =========================
-uploaded = files.upload()
-csv_path = next(iter(uploaded))
-
-# =========================
-# 2) 基本データ読み込み
-# =========================
-df_raw = pd.read_csv(csv_path, encoding='cp932')
-doctors   = df_raw['Name'].tolist()
-group_map = df_raw.set_index('Name')['Group'].to_dict()
-avail_df  = 1 - df_raw.drop(columns=['Group','Name'])
-
-# ---- シフト列ユーティリティ -------------------------
-def shift_sort_key(col):
-    day = int(re.match(r'(\d+)', col).group(1))
-    sub = int(re.search(r'-(\d)', col).group(1)) if '-' in col else 0  # 0=通常 1=-1 2=-2
-    return (day, sub)
-
-shift_cols = sorted(avail_df.columns, key=shift_sort_key)
-
-"""月は都度変更"""
-
-# 月を推定（今回は 2025-06 固定）
-YEAR, MONTH = 2025, 5
-def to_date(day): return datetime.date(YEAR, MONTH, day)
-
-# ---- 各シフト属性 ------------------
-shift_day   = {c: int(re.match(r'(\d+)', c).group(1)) for c in shift_cols}
-shift_sub   = {c: int(re.search(r'-(\d)', c).group(1)) if '-' in c else 0 for c in shift_cols}
-shift_week  = {c: to_date(shift_day[c]).isocalendar().week for c in shift_cols}  # ISO 週
-shift_kind  = {c: 'holiday_double' if shift_sub[c]==1 else 'single' for c in shift_cols}
-
-"""どうしてもシフト組めなそうなら3に緩和"""
-
-SPACE = 4  # 連続勤務間隔
-
-# =========================
-# 3) 割付アルゴリズム
-# =========================
-duty, oncall = defaultdict(dict), {}
-last_work = {d:-10 for d in doctors}
-duty_cnt, oncall_cnt = defaultdict(int), defaultdict(int)
-weekly_cnt   = defaultdict(lambda: defaultdict(int))  # weekly_cnt[doc][week]
-holiday1_cnt = defaultdict(int)                       # -1 Duty 回数
-
-def can_work(doc, col):
-    return (avail_df.loc[df_raw['Name']==doc, col].iat[0]==1 and
-            shift_day[col]-last_work[doc]>=SPACE and
-            weekly_cnt[doc][shift_week[col]]==0 and
-            (holiday1_cnt[doc] < 1 if shift_sub[col]==1 else True))
-
-g1 = [d for d in doctors if group_map[d]==1]
-g0 = [d for d in doctors if group_map[d]==0]
-hd = [c for c in shift_cols if shift_sub[c]==1]  # -1
-sg = [c for c in shift_cols if shift_sub[c]!=1]
-
-# --- Group1 Duty 2 回固定 ---
-random.shuffle(g1)
-for doc in g1:
-    for colset in (hd, sg):
-        for col in random.sample(colset, len(colset)):
-            if 'G1' in duty[col].values(): continue
-            if can_work(doc,col):
-                duty[col][doc]='G1'
-                duty_cnt[doc]+=1
-                last_work[doc]=shift_day[col]
-                weekly_cnt[doc][shift_week[col]]=1
-                if shift_sub[col]==1: holiday1_cnt[doc]+=1
-                if duty_cnt[doc]==2: break
-        if duty_cnt[doc]==2: break
-
-# --- Group0 Duty 1〜2 回 ---
-random.shuffle(g0)
-for doc in g0:  # 1 回目
-    if duty_cnt[doc]>0: continue
-    for col in shift_cols:
-        need = (shift_sub[col]==1 and 'G0' not in duty[col].values()) or \
-               (shift_sub[col]!=1 and not duty[col])
-        if need and can_work(doc,col):
-            duty[col][doc]='G0'; duty_cnt[doc]+=1; last_work[doc]=shift_day[col]
-            weekly_cnt[doc][shift_week[col]]=1
-            if shift_sub[col]==1: holiday1_cnt[doc]+=1
-            break
-
-for col in shift_cols:  # 2 回目
-    if (shift_sub[col]==1 and 'G0' not in duty[col].values()) or \
-       (shift_sub[col]!=1 and not duty[col]):
-        cands=[d for d in g0 if duty_cnt[d]<2 and can_work(d,col)]
-        if cands:
-            doc=random.choice(cands)
-            duty[col][doc]='G0'; duty_cnt[doc]+=1; last_work[doc]=shift_day[col]
-            weekly_cnt[doc][shift_week[col]]=1
-            if shift_sub[col]==1: holiday1_cnt[doc]+=1
-
-# --- on-call (G0) : Duty が G1 の single 列に必ず付与 ---
-for col in sg:
-    if 'G1' in duty[col].values():
-
-        # ① 標準条件 ─ 勤務可 (0) & 4 日間隔クリア
-        cands = [
-            d for d in g0
-            if d not in duty[col]                                       # その日 Duty ではない
-            and avail_df.loc[df_raw['Name'] == d, col].iat[0] == 1      # 勤務可(0)
-            and shift_day[col] - last_work[d] >= SPACE                  # 4 日間隔
-        ]
-
-        # ② 候補ゼロなら 4日間隔だけ緩和（勤務可フラグは堅持）
-        if not cands:
-            cands = [
-                d for d in g0
-                if d not in duty[col]
-                and avail_df.loc[df_raw['Name'] == d, col].iat[0] == 1  # 勤務可(0)
-            ]
-
-        # ③ まだゼロなら警告を出して空欄に
-        if not cands:
-            warnings.append(f"[ONCALL-MISSING] {col} に割当候補なし")
-            continue
 
-        # --- 確定 ---
-        doc = random.choice(cands)
-        oncall[col]   = doc
-        oncall_cnt[doc] += 1
-        last_work[doc] = shift_day[col]
-
-# =========================
-# 4) DataFrame 作成
-# =========================
-rows=[]
-for col in shift_cols:
-    rows.append({'Shift':col,
-                 'Duty_G0':', '.join([d for d,g in duty[col].items() if g=='G0']),
-                 'Duty_G1':', '.join([d for d,g in duty[col].items() if g=='G1']),
-                 'Oncall_G0': oncall.get(col,'')})
-schedule_df = pd.DataFrame(rows)
-
-summary_df = pd.DataFrame({
-    'Group':[group_map[d] for d in doctors],
-    'Duty':[duty_cnt[d] for d in doctors],
-    'Oncall':[oncall_cnt[d] for d in doctors]
-}, index=doctors)
-summary_df['Total']=summary_df['Duty']+summary_df['Oncall']
-
-# =========================
-# 5) カレンダーシート
-# =========================
-def build_calendar_df():
-    cal=[['' for _ in range(7)] for _ in range(6)]
-    first_weekday = to_date(1).weekday()  # 0=Mon
-    for col in shift_cols:
-        day = shift_day[col]
-        date = to_date(day)
-        row = (day + first_weekday -1)//7
-        col_idx = (date.weekday()+1)%7  # Sun=0
-        duty_info = f"D0:{', '.join([d for d,g in duty[col].items() if g=='G0'])}\n" \
-                    f"D1:{', '.join([d for d,g in duty[col].items() if g=='G1'])}"
-        if oncall.get(col):
-            duty_info += f"\nOC:{oncall[col]}"
-        cal[row][col_idx] = f"{day}\n{duty_info}"
-    return pd.DataFrame(cal, columns=['Sun','Mon','Tue','Wed','Thu','Fri','Sat'])
-
-calendar_df = build_calendar_df()
-
-# =========================
-# 6) 元 CSV に Duty=3 / on-call=4 を書き込み
-# =========================
-df_annot = df_raw.copy()
-warnings = []
-
-# Duty → 3
-for _, row in schedule_df.iterrows():
-    for name in row['Duty_G0'].split(', ') + row['Duty_G1'].split(', '):
-        if name:
-            if df_annot.loc[df_annot['Name']==name, row['Shift']].iat[0] != 0:
-                warnings.append(f"[DUTY] {name} – {row['Shift']} は元が 0 でない")
-            df_annot.loc[df_annot['Name']==name, row['Shift']] = 3
-
-# on-call → 4
-for _, row in schedule_df.iterrows():
-    if row['Oncall_G0']:
-        name = row['Oncall_G0']
-        if df_annot.loc[df_annot['Name']==name, row['Shift']].iat[0] != 0:
-            warnings.append(f"[ONCALL] {name} – {row['Shift']} は元が 0 でない")
-        df_annot.loc[df_annot['Name']==name, row['Shift']] = 4
-
-# CSV 出力
-annot_path = 'availability_with_assignments.csv'
-df_annot.to_csv(annot_path, index=False, encoding='cp932')
-
-# =========================
-# 7) Excel 出力も（同名で上書き）
-# =========================
-excel_path = 'schedule_with_calendar.xlsx'
-with pd.ExcelWriter(excel_path) as w:
-    schedule_df.to_excel(w,index=False,sheet_name='Schedule')
-    summary_df.to_excel(w,            sheet_name='Summary')
-    calendar_df.to_excel(w,index=False,sheet_name='Calendar')
-
-# =========================
-# 8) ダウンロード & 上書きチェック
-# =========================
-if warnings:
-    print("⚠️  上書き警告あり：")
-    for wmsg in warnings:
-        print("  ", wmsg)
-else:
-    print("✅  すべて元が 0 のセルに書き込みました。")
-
-files.download(excel_path)
-files.download(annot_path)
-
-import pandas as pd, openpyxl, datetime, re
-from openpyxl.styles import Alignment, Border, Side, PatternFill, Font
-from openpyxl.utils import get_column_letter
-from collections import defaultdict
-from google.colab import files
-
-# ======================================================
-# 1) 割付結果 Excel (Schedule シート) をアップロード
-# ======================================================
-uploaded = files.upload()               # schedule_with_calendar.xlsx を選択
-source_excel = next(iter(uploaded))
-schedule_df = pd.read_excel(source_excel, sheet_name="Schedule").fillna('')
-
-# ======================================================
-# 2) 年月を手入力 or 推定
-# ======================================================
-YEAR, MONTH = 2025, 6
-def to_date(day): return datetime.date(YEAR, MONTH, day)
-
-# ======================================================
-# 3) 日本の祝日（簡易）
-# ======================================================
-jp_holidays_2025 = {
-    datetime.date(2025,5,3), datetime.date(2025,5,4),
-    datetime.date(2025,5,5), datetime.date(2025,5,6),
-}
-
-# ======================================================
-# 4) day_info 構築
-# ======================================================
-day_info = defaultdict(lambda: {"日直":"", "当直":"", "OC":""})
-
-for _, row in schedule_df.iterrows():
-    # 日付・サブ番号取得
-    day   = int(re.match(r'(\d+)', row["Shift"]).group(1))
-    sub   = int(re.search(r'-(\d)', row["Shift"]).group(1)) if '-' in row["Shift"] else 0
-    # Duty 名をまとめて '/' で結合
-    names = "/".join([n for n in [row["Duty_G0"], row["Duty_G1"]] if n])
-    if sub == 1:              # -1 → 日直
-        day_info[day]["日直"] = names
-    else:                     # -2 または通常 → 当直
-        day_info[day]["当直"] = names
-        if row["Oncall_G0"]:
-            day_info[day]["OC"] = row["Oncall_G0"]
-
-# ======================================================
-# 5) Excel カレンダー作成
-# ======================================================
-wb = openpyxl.Workbook()
-ws = wb.active
-ws.title = "Calendar"
-
-# --- Styles ---
-thin   = Side(style="thin", color="000000")
-border = Border(top=thin, left=thin, right=thin, bottom=thin)
-center = Alignment(horizontal="center", vertical="center", wrap_text=True)
-hdr_fill  = PatternFill("solid", fgColor="DDDDDD")
-hdr_font  = Font(bold=True)
-red_font  = Font(color="FF0000")
-blue_font = Font(color="0000FF")
-
-# --- タイトル ---
-ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=7)
-ws.cell(1,1, f"{YEAR}年{MONTH}月").alignment=center
-ws.cell(1,1).font=Font(bold=True,size=14)
-
-# --- 曜日ヘッダ ---
-week = ["日","月","火","水","木","金","土"]
-for col,wd in enumerate(week,1):
-    c=ws.cell(2,col,wd); c.alignment=center; c.font=hdr_font; c.fill=hdr_fill; c.border=border
-    ws.column_dimensions[get_column_letter(col)].width=22
-for r in range(3,10): ws.row_dimensions[r].height=48
-
-# --- カレンダー本体 ---
-first_wd = to_date(1).weekday()          # Mon=0
-col      = (first_wd+1)%7 + 1           # Sun=1
-row, day = 3, 1
-while True:
-    try: date = to_date(day)
-    except ValueError: break
-
-    info = day_info[day]
-    lines = []
-    if info["日直"]:
-        lines.append(f"日直 {info['日直']}")
-    if info["当直"]:
-        line = f"当直 {info['当直']}"
-        if info["OC"]:
-            line += f"/OC:{info['OC']}"
-        lines.append(line)
-    text = str(day) if not lines else f"{day}\n" + "\n".join(lines)
-
-    cell = ws.cell(row,col,text); cell.alignment=center; cell.border=border
-    if date in jp_holidays_2025 or date.weekday()==6:
-        cell.font = red_font
-    elif date.weekday()==5:
-        cell.font = blue_font
-
-    col += 1
-    if col>7: col=1; row+=1
-    day += 1
-
-# --- 凡例 ---
-legend_row = row + 2
-ws.merge_cells(start_row=legend_row, start_column=1, end_row=legend_row, end_column=7)
-#ws.cell(legend_row,1,"日直 = -1 シフト   当直 = -2/平日シフト   OC: On-call").alignment=center
-
-# --- 保存 & DL ---
-out_path="pretty_calendar.xlsx"
-wb.save(out_path)
-print("✔ 完了 – pretty_calendar.xlsx を生成しました。")
-files.download(out_path)
+from utils.assignment import DUTY, ONCALL, Assignment
+from utils.rest_rules import LOOSE_GAP, rest_ok
+from utils.shift_index import ShiftIndex
+from utils.strict_model import hint_from_assignment
+
+# どうしてもシフト組めなそうなら 3 に緩和
+SPACE = LOOSE_GAP  # 連続勤務間隔（strict の 3 日間隔と同じ rest_rules で扱う）
+
+
+@dataclass
+class LooseInstance:
+    """greedy に渡す配列化した入力（プロセス間でそのまま受け渡す）。"""
+    avail: np.ndarray      # (D, S) bool  可 = 元 CSV が 0
+    group: np.ndarray      # (D,)
+    day: np.ndarray        # (S,)
+    sub: np.ndarray        # (S,) 0=通常 1=-1 2=-2
+    week: np.ndarray       # (S,) ISO 週を 0.. に詰めた番号
+    last0: np.ndarray      # (D,) 最終勤務日の初期値（前月からの引継ぎ）
+    weekly0: np.ndarray    # (D, W) bool その週にもう入っているか
+    prior: np.ndarray      # (D,) 前月までの累計（順番づけ用）
+
+
+@dataclass
+class LooseResult:
+    duty0: np.ndarray      # (S,) Duty G0 の医師添字（-1 = 空き）
+    duty1: np.ndarray      # (S,) Duty G1
+    oncall: np.ndarray     # (S,) Oncall G0
+    duty_cnt: np.ndarray   # (D,)
+    oncall_cnt: np.ndarray
+    missing_oc: list       # on-call 候補がなかったシフトの添字
+    seed: int = 0
+
+    def score(self, inst: LooseInstance) -> tuple:
+        """小さいほど良い：(空きコマ, ONCALL-MISSING, 回数不足)。"""
+        hol = inst.sub == 1
+        unfilled = int(np.sum(hol & (self.duty0 < 0)) + np.sum(hol & (self.duty1 < 0))
+                       + np.sum(~hol & (self.duty0 < 0) & (self.duty1 < 0)))
+        g1 = inst.group == 1
+        short = int(np.sum(np.maximum(0, 2 - self.duty_cnt[g1])) + np.sum(self.duty_cnt[~g1] == 0))
+        return unfilled, len(self.missing_oc), short
+
+    def to_assignment(self, doctors, group, shifts) -> Assignment:
+        a = Assignment.empty(doctors, group, shifts,
+                             [f"[ONCALL-MISSING] {shifts[j]} に割当候補なし" for j in self.missing_oc])
+        for slot, code in ((self.duty0, DUTY), (self.duty1, DUTY), (self.oncall, ONCALL)):
+            j = np.flatnonzero(slot >= 0)
+            a.matrix[slot[j], j] = code
+        return a
+
+
+def make_instance(df_raw: pd.DataFrame, year: int, month: int, carry=None, index: ShiftIndex | None = None):
+    index = index or ShiftIndex.from_columns(df_raw.columns, year, month)
+    shifts, week = index.shifts, index.week                     # week: ISO 週
+
+    names = df_raw["Name"].tolist()
+    last0 = np.full(len(names), -10, dtype=int)
+    weekly0 = np.zeros((len(names), week.max(initial=-1) + 1), dtype=bool)
+    prior = np.zeros(len(names), dtype=int)
+    if carry is not None:
+        first = datetime.date(year, month, 1)
+        for i, n in enumerate(names):
+            last = carry.last_work.get(n)
+            if last is not None:
+                last0[i] = (last - first).days + 1              # 前月末 = 0, 前々日 = -1 …
+                same = week[index.iso_week == last.isocalendar()[1]]
+                if 0 <= first.toordinal() - last.toordinal() < 7 and len(same):   # 月をまたぐ同じ ISO 週
+                    weekly0[i, same[0]] = True
+            prior[i] = carry.total(n)
+
+    inst = LooseInstance(df_raw[shifts].to_numpy() == 0, df_raw["Group"].to_numpy(dtype=int),
+                         index.day, index.sub, week, last0, weekly0, prior)
+    return inst, shifts
+
+
+def greedy(inst: LooseInstance, seed: int) -> LooseResult:
+    """週 1 回／-1 月 1 回・連続 4 日間隔の greedy を 1 回まわす。
+
+    医師ごとの状態（最終勤務日・週ごとの勤務・-1 回数）を配列で持ち、
+    「このシフトに入れる医師」「この医師が入れるシフト」をまとめて判定する。
+    """
+    rng = np.random.default_rng(seed)
+    avail, group, day, sub, week = inst.avail, inst.group, inst.day, inst.sub, inst.week
+    D, S = avail.shape
+    hol = sub == 1
+    last = inst.last0.copy()
+    weekly = inst.weekly0.copy()
+    hol1 = np.zeros(D, dtype=int)                       # -1 Duty 回数
+    duty_cnt = np.zeros(D, dtype=int)
+    oncall_cnt = np.zeros(D, dtype=int)
+    duty0, duty1, oncall = (np.full(S, -1, dtype=int) for _ in range(3))
+
+    def cols_ok(i):                                     # 医師 i が入れるシフト (S,)
+        return avail[i] & rest_ok(day, last[i], SPACE) & ~weekly[i, week] & (~hol | (hol1[i] < 1))
+
+    def docs_ok(j):                                     # シフト j に入れる医師 (D,)
+        ok = avail[:, j] & rest_ok(day[j], last, SPACE) & ~weekly[:, week[j]]
+        return ok & (hol1 < 1) if hol[j] else ok
+
+    def assign(i, j, slot):
+        slot[j] = i; duty_cnt[i] += 1; last[i] = day[j]
+        weekly[i, week[j]] = True
+        if hol[j]: hol1[i] += 1
+
+    def by_prior(idx):                                  # 累計の少ない順・同点はランダム
+        return idx[np.lexsort((rng.random(len(idx)), inst.prior[idx]))]
+
+    g1 = by_prior(np.flatnonzero(group == 1))
+    g0 = by_prior(np.flatnonzero(group == 0))
+    is_g0 = group == 0
+
+    # --- Group1 Duty 2 回固定 ---
+    for i in g1:
+        for colset in (np.flatnonzero(hol), np.flatnonzero(~hol)):
+            perm = rng.permutation(colset)
+            pos = 0
+            while duty_cnt[i] < 2 and pos < len(perm):  # 並べた順に、入れる最初の列を取っていく
+                ok = (cols_ok(i) & (duty1 < 0))[perm[pos:]]
+                if not ok.any():
+                    break
+                pos += int(np.argmax(ok))
+                assign(i, perm[pos], duty1)
+                pos += 1
+            if duty_cnt[i] == 2: break
+
+    def need():                                         # Duty がまだ要るシフト (S,)
+        return np.where(hol, duty0 < 0, (duty0 < 0) & (duty1 < 0))
+
+    # --- Group0 Duty 1〜2 回 ---
+    for i in g0:  # 1 回目
+        if duty_cnt[i] > 0: continue
+        ok = need() & cols_ok(i)
+        if ok.any():
+            assign(i, int(np.argmax(ok)), duty0)
+
+    for j in range(S):  # 2 回目
+        if need()[j]:
+            cands = np.flatnonzero(is_g0 & (duty_cnt < 2) & docs_ok(j))
+            if len(cands):
+                cands = cands[inst.prior[cands] == inst.prior[cands].min()]
+                assign(int(rng.choice(cands)), j, duty0)
+
+    # --- on-call (G0) : Duty が G1 の single 列に必ず付与 ---
+    missing = []
+    for j in np.flatnonzero(~hol & (duty1 >= 0)):
+        base = is_g0 & avail[:, j]                                # 勤務可(0)
+        if duty0[j] >= 0:
+            base[duty0[j]] = False                                # その日 Duty ではない
+        cands = np.flatnonzero(base & rest_ok(day[j], last, SPACE))  # ① 4 日間隔クリア
+        if not len(cands):
+            cands = np.flatnonzero(base)                          # ② 4 日間隔だけ緩和
+        if not len(cands):
+            missing.append(int(j))                                # ③ 空欄
+            continue
+        i = int(rng.choice(cands))
+        oncall[j] = i; oncall_cnt[i] += 1; last[i] = day[j]
+
+    return LooseResult(duty0, duty1, oncall, duty_cnt, oncall_cnt, missing, seed)
+
+
+def best_of(inst: LooseInstance, seeds) -> LooseResult:
+    best = None
+    for s in seeds:
+        r = greedy(inst, s)
+        if best is None or r.score(inst) < best.score(inst):
+            best = r
+            if best.score(inst) == (0, 0, 0):
+                break
+    return best
+
+
+def run_restarts(inst: LooseInstance, restarts: int = 64, workers: int | None = None,
+                 seed: int | None = None) -> LooseResult:
+    """乱数を変えて greedy を restarts 回まわし、score の一番よいものを返す。
+
+    workers > 1 ならシードを分けてプロセスプールで並列に回す（spawn。Streamlit のスレッドからも呼ばれる）。
+    """
+    base = random.randrange(2**31) if seed is None else seed
+    seeds = [base + k for k in range(max(1, restarts))]
+    workers = min(workers or os.cpu_count() or 1, len(seeds))
+    if workers <= 1:
+        return best_of(inst, seeds)
+    chunks = [seeds[k::workers] for k in range(workers)]
+    ctx = multiprocessing.get_context("spawn")          # ストリームリットのスレッドを fork に持ち込まない
+    with ProcessPoolExecutor(workers, mp_context=ctx) as ex:
+        results = list(ex.map(best_of, [inst] * workers, chunks))
+    return min(results, key=lambda r: (r.score(inst), r.seed))
+
+
+def build_assignment(df_raw: pd.DataFrame, year: int, month: int, carry=None, restarts: int = 64,
+                     workers: int | None = None, seed: int | None = None,
+                     index: ShiftIndex | None = None) -> Assignment:
+    """週 1 回／-1 月 1 回・連続 4 日間隔の“緩い”割付（greedy の多重スタート）。
+
+    carry（utils.horizon.Carry）があれば前月の最終勤務日で間隔・週回数を初期化し、
+    累計回数の少ない医師から順に割り付ける。index はアップロード時に作った ShiftIndex。
+    """
+    inst, shifts = make_instance(df_raw, year, month, carry, index)
+    r = run_restarts(inst, restarts, workers, seed)
+    return r.to_assignment(df_raw["Name"].tolist(), inst.group, shifts)
+
+
+def build_schedule(df_raw: pd.DataFrame, year: int, month: int, carry=None, restarts: int = 64,
+                   workers: int | None = None, seed: int | None = None):
+    """build_assignment の表形式 (schedule_df, summary_df)。"""
+    a = build_assignment(df_raw, year, month, carry, restarts, workers, seed)
+    return a.schedule_df(), a.summary_df(total=True)
+
+
+def warm_start(sm, df_raw: pd.DataFrame, year: int, month: int, carry=None, seed: int = 0,
+               index: ShiftIndex | None = None) -> int:
+    """greedy で割り付けて strict モデル sm のヒントにする（CP-SAT の初期解）。
+
+    loose の方が間隔・週回数が厳しいので、埋まったところはほぼそのまま strict でも通る。
+    seed を固定するので同じ入力・同じシードなら同じヒント。行番号で当てる（同名の医師がいてもずれない）。
+    """
+    a = build_assignment(df_raw, year, month, carry, workers=1, seed=seed, index=index)
+    return hint_from_assignment(sm, a)
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from utils.rest_rules import STRICT_GAP
+from utils.result_cache import make_key
+from utils.shift_index import ShiftIndex
+from utils.strict_model import StrictModel, availability_matrix, build_strict_model, set_prior_objective
+
+
+@dataclass
+class ModelTemplate:
+    """strict モデルの型：全セルを可として 1 回だけ組んだモデルと、セル → 変数の添字。
+
+    構造（充足・G1 Duty→G0 Oncall・回数・間隔）はグループの並びとシフトの並び（日・-1/-2）
+    だけで決まるので、可用性が変わっても同じ型を複製して使える。
+    """
+    model: cp_model.CpModel
+    x_index: np.ndarray        # (D, S) Duty 変数の proto 上の添字（-1 = なし）
+    y_index: np.ndarray        # (D, S) Oncall 変数（G0 × 非 -1 だけ）
+
+
+def compile_template(group: np.ndarray, index: ShiftIndex, gap: int = STRICT_GAP) -> ModelTemplate:
+    """グループの並びとシフトの並びから型を組む（build_strict_model に全セル可の表を渡す）。"""
+    dense = pd.DataFrame(0, index=range(len(group)), columns=index.shifts)
+    dense.insert(0, "Name", [f"d{i}" for i in range(len(group))])
+    dense.insert(0, "Group", np.asarray(group, dtype=int))
+    sm = build_strict_model(dense, gap, index=index)
+    x_index = np.full(sm.avail.shape, -1, dtype=np.int64)
+    y_index = np.full(sm.avail.shape, -1, dtype=np.int64)
+    for var, out in ((sm.x, x_index), (sm.y, y_index)):
+        for (i, j), v in var.items():
+            out[i, j] = v.Index()
+    return ModelTemplate(sm.model, x_index, y_index)
+
+
+class TemplateCache:
+    """(グループの並び, シフトの並び, 間隔) → ModelTemplate のプロセス内 LRU。
+
+    proto はプロセスの外に出せない（pybind の proto でシリアライズできない）のでメモリだけ。
+    バックグラウンドのジョブから同時に引かれるのでロックする。
+    """
+
+    def __init__(self, max_items: int = 8):
+        self.max_items = max_items
+        self._mem: OrderedDict[str, ModelTemplate] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, group: np.ndarray, index: ShiftIndex, gap: int = STRICT_GAP) -> tuple[ModelTemplate, bool]:
+        """(型, キャッシュに当たったか)。"""
+        key = make_key("template", np.asarray(group, dtype=np.int8).tobytes(), index.day.astype(np.int32).tobytes(),
+                       index.sub.astype(np.int8).tobytes(), gap)
+        with self._lock:
+            t = self._mem.get(key)
+            if t is not None:
+                self._mem.move_to_end(key)
+                self.stats["hits"] += 1
+                return t, True
+        t = compile_template(group, index, gap)
+        with self._lock:
+            self._mem[key] = t
+            while len(self._mem) > self.max_items:
+                self._mem.popitem(last=False)
+            self.stats["misses"] += 1
+        return t, False
+
+
+TEMPLATES = TemplateCache()
+
+
+def instantiate(t: ModelTemplate, df_raw: pd.DataFrame, index: ShiftIndex, gap: int = STRICT_GAP,
+                last_day=None, prior=None) -> StrictModel:
+    """型を複製し、不可のセルの変数を 0 に固定して StrictModel にする（build_strict_model と同じ解集合）。
+
+    sm.x / sm.y には可のセルの変数だけを入れる（固定した変数は presolve で消える）。
+    """
+    group = df_raw["Group"].to_numpy(dtype=int)
+    day = index.day
+    avail = availability_matrix(df_raw, index.shifts, last_day, gap, day)
+    m = t.model.Clone()
+    proto = m.Proto()
+    for idx in (t.x_index, t.y_index):
+        for k in idx[~avail & (idx >= 0)]:
+            proto.variables[int(k)].domain[1] = 0              # [0, 1] → [0, 0]
+    sm = StrictModel(m, df_raw["Name"].tolist(), group, index.shifts, day, index.sub, avail,
+                     np.zeros(len(index.shifts), dtype=int))
+    for idx, var in ((t.x_index, sm.x), (t.y_index, sm.y)):
+        for i, j in zip(*np.nonzero(avail & (idx >= 0))):
+            var[i, j] = m.GetBoolVarFromProtoIndex(int(idx[i, j]))
+    set_prior_objective(sm, prior)
+    return sm
+
+
+def build_from_template(df_raw: pd.DataFrame, gap: int = STRICT_GAP, last_day=None, prior=None,
+                        index: ShiftIndex | None = None, cache: TemplateCache = TEMPLATES,
+                        stats: dict | None = None) -> StrictModel:
+    """build_strict_model の代わり（単月・仮定リテラルなし）。型はキャッシュから引く。
+
+    stats があれば "template" に hit / miss を入れる。
+    """
+    index = index or ShiftIndex.from_columns(df_raw.columns)
+    t, hit = cache.get(df_raw["Group"].to_numpy(dtype=int), index, gap)
+    if stats is not None:
+        stats["template"] = "hit" if hit else "miss"
+    return instantiate(t, df_raw, index, gap, last_day, prior)
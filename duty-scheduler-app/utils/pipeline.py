@@ -0,0 +1,286 @@
+"""Streamlit に依存しない割付と書き出し（app.py と batch.py で共通）。
+
+解けないときは st.stop ではなく Infeasible（不可能と分かった）か TimedOut（時間内に解けなかった）を投げる。
+"""
+import io, os, threading, time, zipfile
+
+import pandas as pd
+
+from utils.assignment import Assignment
+from utils.fairness import AnytimeSolve, FairnessGoal, add_fairness_objective
+from utils.feasibility import Issue, explain_infeasible, precheck
+from utils.generate_calendar import add_calendar_sheets, calendar_month, render_calendars
+from utils.horizon import Carry
+from utils.incremental import resolve_incremental
+from utils.instrument import FirstSolutionTimer, Profiler
+from utils.lns import lns_improve
+from utils.loose_scheduler import warm_start
+from utils.model_template import build_from_template
+from utils.shift_index import ShiftIndex, shift_index
+from utils.solver_config import SolverConfig
+from utils.strict_model import build_strict_model, extract_assignment, solve_alternatives, solve_strict_model
+from utils.symmetry import break_symmetry, symmetry_stats
+
+EXPORT_FILES = ("schedule.xlsx", "pretty_calendar.xlsx", "availability_annotated.csv")
+COMBINED, BUNDLE = "duty_schedule.xlsx", "duty_schedule.zip"   # 4 シートを 1 ブックに / EXPORT_FILES の ZIP
+STAGE = dict(zip((*EXPORT_FILES, COMBINED, BUNDLE), ("excel", "calendar", "annotated_csv", "combined", "zip")))
+
+
+class Cancelled(Exception):
+    """cancel で途中で止めた（解がまだない）。"""
+
+
+class Infeasible(Exception):
+    """割り付けられない（issues に理由の候補）。"""
+
+    def __init__(self, message: str, issues: list[Issue] | None = None):
+        super().__init__(message)
+        self.message = message
+        self.issues = issues or []
+
+
+class TimedOut(Exception):
+    """制限時間内に解が見つからなかった（割り付け不可とは限らない）。"""
+
+    def __init__(self, time_limit: float):
+        super().__init__(f"制限時間（{time_limit:g} 秒）内に解が見つかりませんでした。"
+                         "割り付け不可とは限らないので、制限時間を延ばしてください。")
+        self.message = str(self)
+
+
+def explain(df_raw: pd.DataFrame, arrays: dict, config: SolverConfig, index: ShiftIndex | None = None) -> Infeasible:
+    # ルールを仮定リテラルにして、同時に満たせないルールの組を探す
+    limit = config.time_limit if config.explain_limit is None else config.explain_limit
+    core = explain_infeasible(df_raw, last_day=arrays.get("last_day"), time_limit=limit, index=index)
+    if core:
+        return Infeasible("割り付け不可：次のルール・医師の組が同時には満たせません。", core)
+    return Infeasible("割り付け不可：可勤務日かルールを見直してください。")
+
+
+def unsolved(status: str, stopped: bool, df_raw: pd.DataFrame, arrays: dict, config: SolverConfig,
+             index: ShiftIndex | None = None) -> Exception:
+    # 解がないとき：止めた → Cancelled、不可能と証明された → 理由を探す、それ以外（時間切れ） → TimedOut
+    if stopped:
+        return Cancelled()
+    if status == "INFEASIBLE":
+        return explain(df_raw, arrays, config, index)
+    return TimedOut(config.time_limit)
+
+
+def build_schedule(df_raw: pd.DataFrame, year: int, month: int, carry: Carry | None = None,
+                   config: SolverConfig | None = None, index: ShiftIndex | None = None,
+                   prof: Profiler | None = None, goal: FairnessGoal | None = None, watch=None,
+                   alternatives: int = 1, min_distance: int = 0, timer: FirstSolutionTimer | None = None,
+                   cancel: threading.Event | None = None) -> list[Assignment]:
+    """strict（3 日間隔 + 5 ルール）で割り付けて案のリストを返す。解けなければ Infeasible。
+
+    goal があれば公平性の目的で制限時間まで改善する。watch(run) を渡すと、開始した
+    AnytimeSolve を途中経過の表示などに使える（run.join() まで待つこと）。
+    alternatives > 1 なら互いに min_distance セル以上違う案を最大その数。
+    timer は CP-SAT に渡す解のコールバック（進み具合を見る用）。cancel が立ったら
+    そこまでの解を返し、解がなければ Cancelled（公平性モードの打ち切りは watch 側で）。
+    """
+    stopped = cancel.is_set if cancel is not None else lambda: False
+    config = config or SolverConfig()
+    prof = prof or Profiler()
+    index = index or shift_index(df_raw, year, month)
+    arrays = carry.arrays(df_raw["Name"], year, month) if carry else {}
+    # 数えるだけで分かる無理は、モデルを組む前に返す
+    with prof.stage("precheck"):
+        issues = precheck(df_raw, last_day=arrays.get("last_day"), index=index)
+    if issues:
+        raise Infeasible("割り付け不可：次の条件がそもそも満たせません。", issues)
+
+    with prof.stage("build"):
+        # 可用性だけ違う解き直し（what-if）は、キャッシュした型を複製して NG のセルを 0 に固定する
+        sm = (build_from_template(df_raw, index=index, stats=prof.solver, **arrays) if config.template
+              else build_strict_model(df_raw, index=index, **arrays))
+    if config.greedy_hint:
+        with prof.stage("hint"):
+            prof.solver["hinted_cells"] = warm_start(sm, df_raw, year, month, carry, config.seed, index)
+    if config.symmetry:
+        # ヒントを入れたあとに（ヒントも辞書式の順に並べ替える）
+        with prof.stage("symmetry"):
+            prof.solver["symmetry"] = symmetry_stats(sm, break_symmetry(sm, arrays.get("prior")))
+
+    if stopped():
+        raise Cancelled()
+
+    if goal is not None:
+        # 偏りを小さくする方向に制限時間まで改善し続ける
+        run = AnytimeSolve(sm, add_fairness_objective(sm, goal, arrays.get("prior")), config)
+        with prof.stage("solve"):
+            run.start()
+            (watch or AnytimeSolve.join)(run)
+        prof.solver.update(run.stats)
+        if run.best is None:
+            raise unsolved(run.stats.get("status", ""), stopped(), df_raw, arrays, config, index)
+        return [run.best.assignment]
+
+    if alternatives > 1:
+        # モデル 1 つで解き直して別案を集める（2 案目以降は presolve なし・直前の案をヒントに）
+        with prof.stage("solve"):
+            found = solve_alternatives(sm, alternatives, min_distance, config, prof.solver, timer, cancel)
+        if not found:
+            raise unsolved(prof.solver.get("status", ""), stopped(), df_raw, arrays, config, index)
+        return found
+
+    # 可行解だけ探す（引継ぎがあれば累計の少ない人を優先）
+    timer = timer or FirstSolutionTimer()
+    timer.t0 = time.perf_counter()              # 最初の解までの時間は解き始めから
+    with prof.stage("solve"):
+        solver = solve_strict_model(sm, config, timer, stats=prof.solver)
+    prof.solver.update(solutions=timer.count,
+                       first_solution_s=None if timer.first is None else round(timer.first, 4))
+    if solver is None:
+        raise unsolved(prof.solver.get("status", ""), stopped(), df_raw, arrays, config, index)
+
+    with prof.stage("extract"):
+        return [extract_assignment(sm, solver)]
+
+
+def improve_schedule(df_raw: pd.DataFrame, start, year: int, month: int, carry: Carry | None = None,
+                     config: SolverConfig | None = None, index: ShiftIndex | None = None,
+                     prof: Profiler | None = None, goal: FairnessGoal | None = None, window_time: float = 1.0,
+                     cancel: threading.Event | None = None) -> Assignment:
+    """可行な割付（loose / flow の結果・前回の割付）を LNS で strict の公平な割付に直す。
+
+    制限時間は config.time_limit、並列に解く窓の数は config.workers。解けなければ Infeasible / TimedOut。
+    単月だけ（複数月は build_horizon）。今は batch.py --mode lns からだけ呼ぶ。
+    """
+    config = config or SolverConfig()
+    prof = prof or Profiler()
+    index = index or shift_index(df_raw, year, month)
+    arrays = carry.arrays(df_raw["Name"], year, month) if carry else {}
+    with prof.stage("precheck"):
+        issues = precheck(df_raw, last_day=arrays.get("last_day"), index=index)
+    if issues:
+        raise Infeasible("割り付け不可：次の条件がそもそも満たせません。", issues)
+    with prof.stage("lns"):
+        res = lns_improve(df_raw, start, index, arrays, goal, config.time_limit, window_time,
+                          config.workers or os.cpu_count() or 1, seed=config.seed, cancel=cancel)
+    prof.solver.update(res.stats)
+    if res.best is None:
+        status = "INFEASIBLE" if res.stats.get("reason") == "infeasible" else ""
+        raise unsolved(status, cancel is not None and cancel.is_set(), df_raw, arrays, config, index)
+    return res.best.assignment
+
+
+def rebuild_schedule(df_raw: pd.DataFrame, published: pd.DataFrame, year: int, month: int,
+                     carry: Carry | None = None, config: SolverConfig | None = None,
+                     index: ShiftIndex | None = None, callback=None, cancel: threading.Event | None = None):
+    """公開済みの割付を、直した可用性に合わせて最小変更で組み直す（(Assignment, 差分)）。
+
+    callback・cancel は build_schedule と同じ：cancel が立ったらそこまでの解、解がなければ Cancelled。
+    """
+    arrays = carry.arrays(df_raw["Name"], year, month) if carry else {}
+    stats = {}
+    res = resolve_incremental(df_raw, published, arrays or None, config, callback=callback, cancel=cancel,
+                              stats=stats)
+    if res is None:
+        raise unsolved(stats.get("status", ""), cancel is not None and cancel.is_set(), df_raw, arrays,
+                       config or SolverConfig(), index)
+    return res
+
+
+# ---------- 書き出し ----------
+def schedule_xlsx(a: Assignment, total: bool = False) -> bytes:
+    """Schedule / Summary の 2 シートの xlsx。"""
+    return ExportBundle(a, total=total).get("schedule.xlsx")
+
+
+def annotated_csv(a: Assignment, df_raw: pd.DataFrame) -> tuple[bytes, list[str]]:
+    """可用性 CSV に Duty=3 / OC=4 を書き込んだもの（cp932）と、元が 0 でなかったセルの警告。"""
+    b = ExportBundle(a, df_raw)
+    return b.get("availability_annotated.csv"), b.overrides
+
+
+class ExportBundle:
+    """1 つの割付の書き出しを全部メモリ上で作る（要るものだけ・1 回ずつ作って覚えておく）。
+
+    get(name) で EXPORT_FILES・COMBINED（Schedule / Summary / Calendar / Annotated の 1 ブック）・
+    BUNDLE（EXPORT_FILES の ZIP）を返す。schedule_df・注釈入りの表は各ファイルで共有する。
+    Streamlit の download_button に渡す callable は別スレッドで動くのでロックで 1 回にする。
+    seconds に作ったものごとの秒数、prof があれば段階としても記録する。
+    """
+
+    def __init__(self, a: Assignment, df_raw: pd.DataFrame | None = None, year: int | None = None,
+                 month: int | None = None, index: ShiftIndex | None = None, total: bool = False,
+                 prof: Profiler | None = None):
+        self.a, self.df_raw, self.year, self.month, self.index, self.total = a, df_raw, year, month, index, total
+        self.prof = prof
+        self.seconds: dict[str, float] = {}
+        self._memo: dict = {}
+        self._lock = threading.RLock()
+
+    def _once(self, name: str, make, stage: str | None = None):
+        with self._lock:
+            if name not in self._memo:
+                t = time.perf_counter()
+                if self.prof is not None and stage:
+                    with self.prof.stage(stage):
+                        self._memo[name] = make()
+                else:
+                    self._memo[name] = make()
+                self.seconds[name] = round(time.perf_counter() - t, 4)
+            return self._memo[name]
+
+    # ---- 共有する表 ----
+    def schedule_df(self) -> pd.DataFrame:
+        return self._once("tables", self.a.schedule_df)
+
+    def summary_df(self) -> pd.DataFrame:
+        return self._once("summary", lambda: self.a.summary_df(total=self.total))
+
+    def _annotated(self) -> tuple[pd.DataFrame, list[str]]:
+        return self._once("annotate", lambda: self.a.annotate(self.df_raw))
+
+    @property
+    def overrides(self) -> list[str]:
+        return self._annotated()[1]
+
+    @property
+    def warnings(self) -> list[str]:
+        """loose の ONCALL-MISSING と、元が 0 でなかったセルへの上書き。"""
+        return self.a.warnings + self.overrides
+
+    def _calendar(self):
+        # 祝日は CSV の列の切り方（平日の -1/-2）から読む
+        return calendar_month(self.schedule_df(), self.year, self.month, title="Calendar", index=self.index)
+
+    def _write(self, calendar: bool = False, annotated: bool = False) -> bytes:
+        buf = io.BytesIO()
+        with pd.ExcelWriter(buf, engine="openpyxl") as w:
+            self.schedule_df().to_excel(w, sheet_name="Schedule", index=False)
+            self.summary_df().to_excel(w, sheet_name="Summary")
+            if calendar:
+                add_calendar_sheets(w.book, [self._calendar()])
+            if annotated:
+                self._annotated()[0].to_excel(w, sheet_name="Annotated", index=False)
+        return buf.getvalue()
+
+    def _zip(self) -> bytes:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+            for name in EXPORT_FILES:
+                z.writestr(name, self.get(name))
+        return buf.getvalue()
+
+    def get(self, name: str) -> bytes:
+        make = {"schedule.xlsx": self._write,
+                "pretty_calendar.xlsx": lambda: render_calendars([self._calendar()]),
+                "availability_annotated.csv": lambda: self._annotated()[0].to_csv(index=False).encode("cp932"),
+                COMBINED: lambda: self._write(calendar=True, annotated=True),
+                BUNDLE: self._zip}[name]
+        return self._once(name, make, STAGE[name])
+
+    def files(self) -> dict:
+        """EXPORT_FILES の {ファイル名: バイト列}。"""
+        return {name: self.get(name) for name in EXPORT_FILES}
+
+
+def export_files(a: Assignment, df_raw: pd.DataFrame, year: int, month: int, index: ShiftIndex | None = None,
+                 total: bool = False, prof: Profiler | None = None) -> tuple[dict, list[str]]:
+    """EXPORT_FILES の {ファイル名: バイト列} と警告（loose の ONCALL-MISSING・上書き）。"""
+    b = ExportBundle(a, df_raw, year, month, index, total, prof)
+    return b.files(), b.warnings
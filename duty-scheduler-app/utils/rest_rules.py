@@ -0,0 +1,29 @@
+import numpy as np
+
+STRICT_GAP = 3   # strict: 勤務日の差は 3 日以上
+LOOSE_GAP  = 4   # loose: 連続 4 日間隔（loose_scheduler の SPACE）
+
+
+def rest_windows(day: np.ndarray, gap: int) -> list[np.ndarray]:
+    """``day`` の添字を「連続 gap 日に収まる極大な窓」に分ける。
+
+    2 つの勤務日の差が gap 未満になるのは必ずどれか 1 つの窓の中なので、
+    窓ごとに「勤務日は高々 1 日」とすれば gap 日間隔を表せる。
+    ``day`` は昇順（同日の -1/-2 は並んでいる）を前提とする。
+    """
+    if gap <= 1 or len(day) == 0:
+        return []
+    ends = np.searchsorted(day, day + gap, side="left")     # 各開始点の窓の終わり（排他的）
+    out, prev_end = [], 0
+    for a, b in enumerate(ends):
+        if a > 0 and day[a] == day[a - 1]:
+            continue
+        if b > prev_end and day[b - 1] > day[a]:            # 前の窓に含まれない & 2 日以上
+            out.append(np.arange(a, b))
+        prev_end = max(prev_end, b)
+    return out
+
+
+def rest_ok(day, last_day, gap: int):
+    """greedy・flow 側の判定（last_day = その医師が最後に入った日）。配列どうしでもよい（ブロードキャスト）。"""
+    return day - last_day >= gap
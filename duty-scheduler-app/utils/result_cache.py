@@ -0,0 +1,138 @@
+import hashlib, os, pickle, threading, time
+from collections import OrderedDict
+
+# 共有の一時ディレクトリだと他のユーザーが pickle を置けるので、ユーザーごとのキャッシュディレクトリに
+DEFAULT_DIR = os.environ.get("DUTY_CACHE_DIR",
+                             os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                                          "duty-scheduler"))
+# 割付結果（pickle する型）の形を変えたら上げる。古い形のキャッシュはキーごと外れる
+CACHE_VERSION = 2
+
+
+def make_key(*parts) -> str:
+    """CSV の中身（bytes）・年月・モードなどから作るキャッシュキー（CACHE_VERSION 込み）。"""
+    h = hashlib.sha256()
+    for p in (CACHE_VERSION, *parts):
+        b = p if isinstance(p, bytes) else repr(p).encode()
+        h.update(len(b).to_bytes(8, "little"))
+        h.update(b)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """割付結果のキャッシュ（プロセス内 LRU + ディスク上の pickle）。
+
+    プロセス内は max_items 件、ディスクは合計 max_bytes まで。どちらも max_age 秒より
+    古いものは捨てる。ディスク側はアプリを再起動しても残る。ディレクトリは 0700 で作り、
+    自分のものでないか他のユーザーが書けるなら使わない（プロセス内だけ）。
+    st.cache_resource でセッション間に 1 つを共有するので、中身はロックして触る。
+    """
+
+    def __init__(self, directory: str | None = DEFAULT_DIR, max_items: int = 32,
+                 max_bytes: int = 64 * 2**20, max_age: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.max_items, self.max_bytes, self.max_age = max_items, max_bytes, max_age
+        self._mem: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self.directory = _private_dir(directory) if directory else None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None and now - hit[0] <= self.max_age:
+                self._mem.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return hit[1]
+            self._mem.pop(key, None)
+
+        if self.directory:
+            path = self._path(key)
+            try:
+                if now - os.path.getmtime(path) <= self.max_age:
+                    with open(path, "rb") as f:
+                        value = pickle.load(f)
+                    os.utime(path)                      # LRU 用に触っておく
+                    with self._lock:
+                        self._remember(key, value, now)
+                        self.stats["disk_hits"] += 1
+                    return value
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception:
+                # 壊れた・古いコードの pickle（AttributeError / ModuleNotFoundError など）は捨ててミス扱い
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, value) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+        if self.directory:
+            tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+            with self._lock:
+                self._evict_disk(now)
+
+    def _remember(self, key: str, value, now: float) -> None:
+        self._mem[key] = (now, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        files = []
+        for e in os.scandir(self.directory):
+            if not e.name.endswith(".pkl"):
+                continue
+            try:
+                st = e.stat()
+                if now - st.st_mtime > self.max_age:
+                    os.remove(e.path)
+                else:
+                    files.append((st.st_mtime, st.st_size, e.path))
+            except FileNotFoundError:                        # 別のプロセスが先に消した
+                pass
+        total = sum(f[1] for f in files)
+        for _, size, path in sorted(files):                  # 古い順に消す
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self.directory:
+                for e in os.scandir(self.directory):
+                    if e.name.endswith(".pkl"):
+                        os.remove(e.path)
+
+
+def _private_dir(directory: str) -> str | None:
+    # 0700 で作る。自分のものでない・グループや他人が書ける場所なら disk は使わない
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        st = os.stat(directory)
+        if hasattr(os, "getuid") and st.st_uid != os.getuid():
+            return None
+        if st.st_mode & 0o077:
+            os.chmod(directory, 0o700)
+        return directory
+    except OSError:
+        return None
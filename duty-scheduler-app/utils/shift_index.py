@@ -0,0 +1,106 @@
+import calendar, datetime, re
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# 3-1(Sat) / 7(Wed)：日・(-1/-2)・曜日
+SHIFT_RE = re.compile(r"^(\d+)(?:-(\d))?(?:\((\w+)\))?$")
+WEEKDAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+KINDS = np.array(["平日", "日直", "当直"])        # sub 0 / 1 (-1) / 2 (-2)
+
+
+def parse_shift(col: str) -> tuple[int, int, str | None]:
+    m = SHIFT_RE.match(col)
+    if m is None:
+        raise ValueError(f"シフト列名が読めません: {col!r}（例: 7(Wed), 3-1(Sat)）")
+    return int(m.group(1)), int(m.group(2) or 0), m.group(3)
+
+
+def shift_sort_key(col: str):
+    # 1-1,1-2,2… の順
+    return parse_shift(col)[:2]
+
+
+@dataclass
+class ShiftIndex:
+    """シフト列の解釈を 1 回だけして配列で持つ（strict / loose / カレンダーで共通）。
+
+    year / month があれば日付まわり（ISO 週・曜日・休日）も埋める。日番号が月をまたぐ
+    （複数月を通し番号にした）列でも、year-month の 1 日からの通し日として扱う。
+    """
+    shifts: list[str]                 # 日付順（shift_sort_key 順）
+    day: np.ndarray                   # (S,)
+    sub: np.ndarray                   # (S,) 0=通常 1=-1 2=-2
+    labels: list                      # (S,) 列名の曜日（なければ None）
+    year: int | None = None
+    month: int | None = None
+    weekday: np.ndarray | None = None   # (S,) 0=月
+    iso_week: np.ndarray | None = None  # (S,) ISO 週番号
+    week: np.ndarray | None = None      # (S,) ISO 週を 0.. に詰めた番号
+    holiday: np.ndarray | None = None   # (S,) -1/-2 に分かれている日（土日・祝日）
+    pos: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_columns(cls, columns, year: int | None = None, month: int | None = None) -> "ShiftIndex":
+        cols = [c for c in columns if c not in ("Group", "Name")]
+        parsed = {c: parse_shift(c) for c in cols}
+        shifts = sorted(cols, key=lambda c: parsed[c][:2])
+        day = np.array([parsed[c][0] for c in shifts], dtype=int)
+        sub = np.array([parsed[c][1] for c in shifts], dtype=int)
+        idx = cls(shifts, day, sub, [parsed[c][2] for c in shifts], year, month,
+                  pos={c: j for j, c in enumerate(shifts)})
+        idx.holiday = np.isin(day, day[sub == 1])
+        if year is not None:
+            first = datetime.date(year, month, 1).toordinal()
+            dates = [datetime.date.fromordinal(first + d - 1) for d in np.unique(day)]
+            wd = {d.toordinal() - first + 1: (d.weekday(), *d.isocalendar()[:2]) for d in dates}
+            idx.weekday = np.array([wd[d][0] for d in day], dtype=int)
+            iso = [wd[d][1:] for d in day]
+            weeks = sorted(set(iso))
+            idx.iso_week = np.array([w for _, w in iso], dtype=int)
+            idx.week = np.array([weeks.index(w) for w in iso], dtype=int)
+        return idx
+
+    @property
+    def kind(self) -> np.ndarray:
+        return KINDS[self.sub]
+
+    def date(self, d: int) -> datetime.date:
+        return datetime.date(self.year, self.month, 1) + datetime.timedelta(days=int(d) - 1)
+
+    def public_holidays(self) -> set:
+        """平日なのに -1/-2 に分かれている日 = 祝日。"""
+        return {self.date(d) for d in np.unique(self.day[self.holiday & (self.weekday < 5)])}
+
+    def validate(self) -> list[str]:
+        """列名が year-month のカレンダーと合っているか（合わない点を文字列で返す）。"""
+        errors = []
+        n_days = calendar.monthrange(self.year, self.month)[1]
+        if (self.day < 1).any() or (self.day > n_days).any():
+            errors.append(f"{self.year}年{self.month}月は {n_days} 日までですが、"
+                          f"{int(self.day.max())} 日の列があります")
+        for c, d, label in zip(self.shifts, self.day, self.labels):
+            if label is not None and 1 <= d <= n_days and label != WEEKDAY_LABELS[self.date(d).weekday()]:
+                errors.append(f"{c}: {self.year}年{self.month}月{d}日は "
+                              f"{WEEKDAY_LABELS[self.date(d).weekday()]} です")
+                if len(errors) >= 5:
+                    errors.append("…（月・年がずれていませんか）")
+                    break
+        dup = [c for c, n in zip(*np.unique(self.shifts, return_counts=True)) if n > 1]
+        if dup:
+            errors.append("重複した列: " + ", ".join(dup))
+        for d in np.unique(self.day[self.sub > 0]):
+            subs = sorted(self.sub[self.day == d])
+            if subs != [1, 2]:
+                errors.append(f"{d} 日は -1 と -2 の 2 コマにしてください（{len(subs)} 列）")
+        return errors
+
+
+def shift_index(df_raw, year: int, month: int, validate: bool = True) -> ShiftIndex:
+    """アップロードされた CSV の列から ShiftIndex を作る。validate なら年月と合わなければ ValueError。"""
+    idx = ShiftIndex.from_columns(df_raw.columns, year, month)
+    if validate:
+        errors = idx.validate()
+        if errors:
+            raise ValueError("\n".join(errors))
+    return idx
@@ -0,0 +1,26 @@
+import os
+from dataclasses import dataclass
+
+from ortools.sat.python import cp_model
+
+
+@dataclass(frozen=True)
+class SolverConfig:
+    """CP-SAT の実行設定。"""
+    time_limit: float = 10.0
+    workers: int | None = None      # None = CPU コア数
+    seed: int = 0
+    greedy_hint: bool = True        # loose の greedy 解をヒントに入れる
+    presolve: bool = True           # 同じモデルを少し変えて解き直すときは切った方が速い
+    symmetry: bool = False          # 同じ条件の医師どうしの入れ替えを辞書式の制約で除く
+    template: bool = False          # 同じロースター・シフトの並びならモデルの型を複製して使う（what-if 向け）
+    explain_limit: float | None = None  # 解けない理由を探す時間（None = time_limit）
+
+    def make_solver(self) -> cp_model.CpSolver:
+        solver = cp_model.CpSolver()
+        p = solver.parameters
+        p.max_time_in_seconds = self.time_limit
+        p.num_workers = self.workers or os.cpu_count() or 1
+        p.random_seed = self.seed
+        p.cp_model_presolve = self.presolve
+        return solver
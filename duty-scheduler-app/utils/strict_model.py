@@ -0,0 +1,287 @@
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from utils.assignment import DUTY, ONCALL, Assignment
+from utils.instrument import solver_stats
+from utils.rest_rules import STRICT_GAP, rest_windows
+from utils.shift_index import ShiftIndex
+from utils.solver_config import SolverConfig
+
+
+def availability_matrix(df_raw: pd.DataFrame, shifts: list[str], last_day=None, gap: int = STRICT_GAP,
+                        day: np.ndarray | None = None) -> np.ndarray:
+    """doctor × shift の bool 行列（True = 可）。元の ``1 - df`` と同じく 1 だけを NG とみなす。
+
+    last_day（前月までの最終勤務日）を渡すと、そこから gap 日たっていないセルも NG にする（day はシフトの日付）。
+    """
+    avail = df_raw[shifts].to_numpy() != 1
+    if last_day is not None:
+        avail &= day[None, :] - np.asarray(last_day)[:, None] >= gap
+    return avail
+
+
+def set_prior_objective(sm: "StrictModel", prior=None) -> None:
+    """累計の多い人を避ける目的にする（prior がなければ可行解だけ探す Minimize(0)）。"""
+    if prior is not None and np.any(prior):
+        Sum = cp_model.LinearExpr.Sum
+        sm.model.Minimize(Sum([int(prior[i]) * v for (i, _), v in (*sm.x.items(), *sm.y.items()) if prior[i]]))
+    else:
+        sm.model.Minimize(0)
+
+
+@dataclass
+class StrictModel:
+    model: cp_model.CpModel
+    doctors: list[str]
+    group: np.ndarray          # (D,) 0/1
+    shifts: list[str]
+    day: np.ndarray            # (S,) 日付
+    sub: np.ndarray            # (S,) 0=通常 1=-1 2=-2
+    avail: np.ndarray          # (D, S) bool
+    period: np.ndarray         # (S,) 何か月目か（単月なら全部 0）
+    x: dict = field(default_factory=dict)   # (i, j) -> Duty
+    y: dict = field(default_factory=dict)   # (i, j) -> Oncall
+    rules: dict | None = None               # assumptions=True のとき (ルール, 添字…) -> 仮定リテラル
+
+    def guard(self, ct, key: tuple):
+        """ct を key のルールの仮定リテラルで条件付きにする（assumptions=False なら何もしない）。"""
+        if self.rules is not None:
+            if key not in self.rules:
+                self.rules[key] = self.model.NewBoolVar(f"a_{'_'.join(map(str, key))}")
+            ct.OnlyEnforceIf(self.rules[key])
+        return ct
+
+
+def build_strict_model(df_raw: pd.DataFrame, gap: int = STRICT_GAP, last_day=None, prior=None,
+                       month_starts=None, present=None, assumptions: bool = False,
+                       index: ShiftIndex | None = None) -> StrictModel:
+    """strict モード（3 日間隔 + 5 ルール）の CP-SAT モデルを組み立てる。
+
+    可用性は NumPy 行列で一度だけ作り、変数は可のセルにだけ作る。
+    Oncall は G0 × 非 -1 シフトでしか立たないので、それ以外のセルには作らない。
+
+    前月からの引継ぎ・複数月（utils.horizon から渡す）:
+      last_day      (D,) 前月までの最終勤務日（この期間の 1 日目 = 1 として 0 以下）
+      prior         (D,) 前月までの累計 Duty+Oncall。多い人ほど今回の回数を減らす
+      month_starts  日番号を通しにしたときの各月の初日。回数上限は月ごとにかける
+      present       (D, 月数) その月のロースターに居るか。居ない月は回数制約をかけない
+    assumptions=True なら各ルール（シフトの充足・Oncall・医師ごとの回数・間隔）を
+    仮定リテラル付きで入れる（sm.rules。解けない理由の切り分け用、utils.feasibility）。
+    index はアップロード時に作った ShiftIndex（省略時は列名から作る）。
+    """
+    doctors = df_raw["Name"].tolist()
+    group   = df_raw["Group"].to_numpy(dtype=int)
+    index   = index or ShiftIndex.from_columns(df_raw.columns)
+    shifts, day, sub = index.shifts, index.day, index.sub
+    avail   = availability_matrix(df_raw, shifts, last_day, gap, day)
+    period  = (np.zeros(len(shifts), dtype=int) if month_starts is None
+               else np.searchsorted(np.asarray(month_starts), day, side="right") - 1)
+    if present is None:
+        present = np.ones((len(doctors), period.max(initial=0) + 1), dtype=bool)
+
+    m = cp_model.CpModel()
+    sm = StrictModel(m, doctors, group, shifts, day, sub, avail, period, rules={} if assumptions else None)
+    x, y, guard = sm.x, sm.y, sm.guard
+
+    g0 = group == 0
+    oc_ok = avail & g0[:, None] & (sub != 1)[None, :]
+    for i, j in zip(*np.nonzero(avail)):
+        x[i, j] = m.NewBoolVar(f"x_{i}_{j}")
+    for i, j in zip(*np.nonzero(oc_ok)):
+        y[i, j] = m.NewBoolVar(f"y_{i}_{j}")
+
+    # 行・列ごとの変数リスト
+    x_by_s = [[[], []] for _ in shifts]        # [shift][group] -> vars
+    y_by_s = [[] for _ in shifts]
+    x_by_d = defaultdict(list)                 # (doctor, 月) -> vars
+    y_by_d = defaultdict(list)
+    for (i, j), v in x.items():
+        x_by_s[j][group[i]].append(v)
+        x_by_d[i, period[j]].append(v)
+    for (i, j), v in y.items():
+        y_by_s[j].append(v)
+        y_by_d[i, period[j]].append(v)
+
+    Sum = cp_model.LinearExpr.Sum
+
+    # ①② すべて埋める & G1 Duty→G0 OC（G1 の OC・-1 の OC は変数自体がない）
+    for j in range(len(shifts)):
+        d0, d1 = x_by_s[j]
+        if sub[j] == 1:                          # 休日-1
+            guard(m.Add(Sum(d0) == 1), ("cover", j))
+            guard(m.Add(Sum(d1) == 1), ("cover", j))
+        else:
+            guard(m.Add(Sum(d0) + Sum(d1) == 1), ("cover", j))
+            guard(m.Add(Sum(y_by_s[j]) == Sum(d1)), ("oncall", j))
+
+    # ③④⑤ 回数上限（月ごと）
+    for i, p in zip(*np.nonzero(present)):
+        duty_cnt = Sum(x_by_d[i, p])
+        if group[i] == 1:
+            guard(m.Add(duty_cnt == 2), ("count", i, p))
+        else:
+            guard(m.Add(duty_cnt >= 1), ("count", i, p))
+            guard(m.Add(duty_cnt <= 2), ("count", i, p))
+            guard(m.Add(Sum(y_by_d[i, p]) <= 2), ("count", i, p))
+
+    # 3 日間隔
+    add_rest_windows(sm, gap)
+
+    # 累計の多い人を避ける（引継ぎがなければ可行解だけ探す）
+    set_prior_objective(sm, prior)
+    return sm
+
+
+def solve_strict_model(sm: StrictModel, config: SolverConfig | None = None, callback=None,
+                       stats: dict | None = None):
+    """解けなければ None。stats を渡すと解けても解けなくても CP-SAT の統計を入れて返す。"""
+    solver = (config or SolverConfig()).make_solver()
+    status = solver.Solve(sm.model, callback)
+    if stats is not None:
+        stats.update(solver_stats(sm.model, solver, status))
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    return solver
+
+
+def solve_alternatives(sm: StrictModel, k: int, min_distance: int, config: SolverConfig | None = None,
+                       stats: dict | None = None, callback=None, cancel=None) -> list[Assignment]:
+    """同じモデルで最大 k 案を解く（モデル構築・ヒントは 1 回だけ）。
+
+    1 案解くごとに「それまでのどの案ともセル（Duty / Oncall の変数）が min_distance 個以上
+    違う」制約を足して解き直す。担当を 1 つ入れ替えると 2 セル違う。解けなくなったら
+    そこまでの案を返す（1 案目が解けなければ空）。stats には 1 案目の統計と各案の秒数。
+    2 案目以降は直前の案をヒントにし、presolve を切る（制約 1 本の差でモデル全体を
+    presolve し直すのがいちばん高い）。cancel（threading.Event）が立ったらそこまで。
+    """
+    Sum = cp_model.LinearExpr.Sum
+    config = config or SolverConfig()
+    cells = [*sm.x.values(), *sm.y.values()]
+    out, seconds = [], []
+    for n in range(k):
+        solver = solve_strict_model(sm, config if n == 0 else replace(config, presolve=False), callback,
+                                    stats=stats if n == 0 else None)
+        if solver is None:
+            break
+        seconds.append(round(solver.wall_time, 4))
+        out.append(extract_assignment(sm, solver))
+        if cancel is not None and cancel.is_set():
+            break
+        if n + 1 < k:
+            on = solver.boolean_values(cells).to_numpy(dtype=bool)
+            sm.model.Add(Sum([v for v, b in zip(cells, on) if not b]) - Sum([v for v, b in zip(cells, on) if b])
+                         >= min_distance - int(on.sum()))
+            sm.model.ClearHints()
+            for v, b in zip(cells, on):
+                sm.model.AddHint(v, bool(b))
+    if stats is not None:
+        stats["alternatives_s"] = seconds
+    return out
+
+
+def schedule_cells(sm: StrictModel, schedule_df: pd.DataFrame) -> set:
+    """schedule_df（名前の入った割付表）のうち sm に変数があるセル {(is_oncall, i, j)}。
+
+    同名の医師は先頭の行に当てる。
+    """
+    idx = {}
+    for i, name in enumerate(sm.doctors):
+        idx.setdefault(name, i)
+    col = {s: j for j, s in enumerate(sm.shifts)}
+    on = set()
+    for _, r in schedule_df.iterrows():
+        j = col.get(r["Shift"])
+        if j is None:
+            continue
+        for c, var in (("Duty_G0", sm.x), ("Duty_G1", sm.x), ("Oncall_G0", sm.y)):
+            for name in str(r[c]).split(","):
+                i = idx.get(name.strip())
+                if i is not None and (i, j) in var:
+                    on.add((var is sm.y, i, j))
+    return on
+
+
+def hint_from_schedule(sm: StrictModel, schedule_df: pd.DataFrame) -> int:
+    """schedule_df をモデルのヒントにする（表にないセルは 0）。ヒットしたセル数を返す。"""
+    on = schedule_cells(sm, schedule_df)
+    for is_y, var in ((False, sm.x), (True, sm.y)):
+        for (i, j), v in var.items():
+            sm.model.AddHint(v, (is_y, i, j) in on)
+    return len(on)
+
+
+def hint_from_assignment(sm: StrictModel, a: Assignment) -> int:
+    """割付行列 a をモデルのヒントにする（行番号で対応させるので同名の医師でもずれない）。
+
+    a は sm と同じ医師・シフトの並び（同じ CSV から作った割付）であること。ヒットしたセル数を返す。
+    """
+    hit = 0
+    for var, code in ((sm.x, DUTY), (sm.y, ONCALL)):
+        if var:
+            ij = np.array(list(var.keys()))
+            on = a.matrix[ij[:, 0], ij[:, 1]] == code
+            for v, b in zip(var.values(), on.tolist()):
+                sm.model.AddHint(v, b)
+            hit += int(on.sum())
+    return hit
+
+
+def extract_assignment(sm: StrictModel, solver: cp_model.CpSolver, cols=None, rows=None, names=None) -> Assignment:
+    """解を一括で取り出して割付行列にする（solver.boolean_values を x・y それぞれ 1 回）。
+
+    cols / rows で一部のシフト・医師だけを取り出せる（複数月を月ごとに分けるとき）。
+    names はシフト列の表示名（省略時は sm.shifts）。
+    """
+    a = Assignment.empty(sm.doctors, sm.group, sm.shifts)
+    for var, code in ((sm.x, DUTY), (sm.y, ONCALL)):
+        if var:
+            ij = np.array(list(var.keys()))
+            on = solver.boolean_values(list(var.values())).to_numpy(dtype=bool)
+            a.matrix[ij[on, 0], ij[on, 1]] = code
+    if cols is None and rows is None and names is None:
+        return a
+    return a.take(rows, cols, names)
+
+
+def extract_schedule(sm: StrictModel, solver: cp_model.CpSolver, cols=None, rows=None, names=None):
+    """解から (schedule_df, summary_df) を作る（extract_assignment の表形式）。"""
+    a = extract_assignment(sm, solver, cols, rows, names)
+    return a.schedule_df(), a.summary_df()
+
+
+def add_rest_windows(sm: StrictModel, gap: int = STRICT_GAP):
+    """医師ごと・窓ごとに 1 本の AtMostOne で gap 日間隔を入れる（制約数は線形）。
+
+    同じ日の -1/-2 や Duty+Oncall の重複は許す（従来の strict と同じ）。
+    そのため日単位の指示変数 w[i, 日] を挟み、各変数 ⇒ w とする。
+    """
+    m, x, y = sm.model, sm.x, sm.y
+
+    def at_most_one(vs, i):                      # 仮定リテラル付きは線形制約で
+        if sm.rules is None:
+            m.AddAtMostOne(vs)
+        else:
+            sm.guard(m.Add(cp_model.LinearExpr.Sum(vs) <= 1), ("rest", i))
+
+    for i in range(len(sm.doctors)):
+        cols = np.flatnonzero(sm.avail[i])
+        by_day: dict[int, list] = {}
+        for j in cols:
+            for v in (x.get((i, j)), y.get((i, j))):
+                if v is not None:
+                    by_day.setdefault(int(sm.day[j]), []).append(v)
+        days = np.array(sorted(by_day), dtype=int)
+        w = {}
+        for t, vs in by_day.items():
+            if len(vs) == 1:
+                w[t] = vs[0]
+            else:
+                w[t] = m.NewBoolVar(f"w_{i}_{t}")
+                for v in vs:
+                    m.AddImplication(v, w[t])
+        for win in rest_windows(days, gap):
+            at_most_one([w[t] for t in days[win]], i)
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class SymmetryClass:
+    """入れ替えても解が変わらない医師の組（同じグループ・同じ可用性・同じ回数条件）。"""
+    group: int
+    doctors: list[int]          # 行番号（この順に辞書式で降順にする）
+    cells: int                  # 1 人あたりの変数の数（Duty + Oncall）
+    constraints: int = 0        # 追加した節の数
+
+
+def equivalence_classes(sm, prior=None, present=None) -> list[SymmetryClass]:
+    """(グループ, 可用性の行, 累計, 在籍月) が同じ医師をまとめる（2 人以上の組だけ）。
+
+    回数の上下限はグループで決まるのでグループに含まれる。sm.avail は前月からの
+    間隔で NG にしたあとの行なので、引継ぎの最終勤務日もここに入る。
+    """
+    keys = {}
+    for i in range(len(sm.doctors)):
+        key = (int(sm.group[i]), sm.avail[i].tobytes(),
+               None if prior is None else int(prior[i]),
+               None if present is None else np.asarray(present[i]).tobytes())
+        keys.setdefault(key, []).append(i)
+    return [SymmetryClass(k[0], rows, len(_vector(sm, rows[0])))
+            for k, rows in keys.items() if len(rows) > 1 and sm.avail[rows[0]].any()]
+
+
+def _vector(sm, i: int) -> list:
+    # 医師 i の変数をシフト順に（同じ組なら同じ並び・同じ長さになる）
+    return [v for j in np.flatnonzero(sm.avail[i]) for v in (sm.x.get((i, j)), sm.y.get((i, j))) if v is not None]
+
+
+def add_symmetry_breaking(sm, classes: list[SymmetryClass]) -> int:
+    """組の中で隣どうしの医師の割付ベクトルを辞書式で a >= b に並べる。追加した節の数を返す。
+
+    e（そこまで等しい）を補助変数にして e ∧ b_k ⇒ a_k、e ∧ (a_k == b_k) ⇒ e' と書く。
+    e' は等しいときに真になることだけを強制する（偽になる向きは不要）。
+    """
+    m, total = sm.model, 0
+    for c in classes:
+        vecs = [_vector(sm, i) for i in c.doctors]
+        for n, (va, vb) in enumerate(zip(vecs, vecs[1:])):
+            eq = None
+            for k, (a, b) in enumerate(zip(va, vb)):
+                m.AddBoolOr([b.Not(), a] if eq is None else [eq.Not(), b.Not(), a])
+                c.constraints += 1
+                if k + 1 == len(va):
+                    break
+                nxt = m.NewBoolVar(f"lex_{c.doctors[n]}_{k}")
+                prefix = [] if eq is None else [eq.Not()]
+                m.AddBoolOr([*prefix, a.Not(), b.Not(), nxt])
+                m.AddBoolOr([*prefix, a, b, nxt])
+                c.constraints += 2
+                eq = nxt
+        total += c.constraints
+    return total
+
+
+def canonical_hint(sm, classes: list[SymmetryClass]) -> None:
+    """ヒント（greedy の解など）を組ごとに辞書式の降順へ並べ替える（入れ替えても解は同じ）。"""
+    hint = sm.model.Proto().solution_hint
+    value = dict(zip(hint.vars, hint.values))
+    if not value:
+        return
+    for c in classes:
+        vecs = [_vector(sm, i) for i in c.doctors]
+        rows = [tuple(value.get(v.Index(), 0) for v in vec) for vec in vecs]
+        for vec, row in zip(vecs, sorted(rows, reverse=True)):
+            value.update({v.Index(): int(b) for v, b in zip(vec, row)})
+    sm.model.ClearHints()
+    for var in (sm.x, sm.y):
+        for v in var.values():
+            if v.Index() in value:
+                sm.model.AddHint(v, value[v.Index()])
+
+
+def break_symmetry(sm, prior=None, present=None) -> list[SymmetryClass]:
+    """同値類を見つけて辞書式の制約を入れ、ヒントもそれに合わせる。"""
+    classes = equivalence_classes(sm, prior, present)
+    add_symmetry_breaking(sm, classes)
+    canonical_hint(sm, classes)
+    return classes
+
+
+def classes_frame(sm, classes: list[SymmetryClass]) -> pd.DataFrame:
+    """組ごとの統計（グループ・人数・1 人あたりの変数・追加した節・医師）。"""
+    return pd.DataFrame({"Group": [c.group for c in classes], "size": [len(c.doctors) for c in classes],
+                         "cells": [c.cells for c in classes], "constraints": [c.constraints for c in classes],
+                         "doctors": [", ".join(sm.doctors[i] for i in c.doctors) for c in classes]})
+
+
+def symmetry_stats(sm, classes: list[SymmetryClass]) -> dict:
+    """計測用（prof.solver["symmetry"]）：組の数・対象の医師数・最大の組・追加した節と組ごとの内訳。"""
+    return {"classes": len(classes), "doctors": sum(len(c.doctors) for c in classes),
+            "largest": max((len(c.doctors) for c in classes), default=0),
+            "constraints": sum(c.constraints for c in classes),
+            "per_class": classes_frame(sm, classes).to_dict("records")}
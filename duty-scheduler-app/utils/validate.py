@@ -0,0 +1,288 @@
+import itertools, time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from utils.assignment import ANNOTATE, DUTY, ONCALL, Assignment
+from utils.feasibility import Issue, issues_frame
+from utils.horizon import NO_LAST
+from utils.loose_scheduler import make_instance
+from utils.rest_rules import LOOSE_GAP, STRICT_GAP
+from utils.shift_index import ShiftIndex
+from utils.strict_model import availability_matrix
+
+ROLES = (("Duty_G0", 0), ("Duty_G1", 1), ("Oncall_G0", 0))
+
+
+@dataclass
+class Validation:
+    """割付のチェック結果（違反はルール・医師・シフトつきの Issue）。"""
+    rules: str                                    # strict / loose
+    issues: list[Issue] = field(default_factory=list)
+    warnings: list[Issue] = field(default_factory=list)   # 違反ではない注意（loose の Oncall 間隔の緩和・同名の行の推定）
+    assignment: Assignment | None = None          # 読み取った割付（Summary 用）
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def counts(self) -> dict:
+        """ルール → 違反の件数。"""
+        out = {}
+        for x in self.issues:
+            out[x.rule] = out.get(x.rule, 0) + 1
+        return out
+
+    def frame(self) -> pd.DataFrame:
+        return issues_frame(self.issues)
+
+
+# ---------- 読み取り ----------
+def _rows(df_raw: pd.DataFrame) -> dict:
+    # 名前 → 行番号のリスト（同名の医師は複数の行）
+    rows = {}
+    for i, name in enumerate(df_raw["Name"].astype(str)):
+        rows.setdefault(name.strip(), []).append(i)
+    return rows
+
+
+def _pick(rows: dict, group: np.ndarray, name: str, g):
+    """名前（とグループ）から行を引く。いなければ None、同名で決まらなければ候補の行のタプル。"""
+    cand = rows.get(name)
+    if not cand:
+        return None
+    if len(cand) > 1 and g is not None:
+        cand = [i for i in cand if group[i] == g] or cand
+    return cand[0] if len(cand) == 1 else tuple(cand)
+
+
+def read_schedule(df_raw: pd.DataFrame, schedule: pd.DataFrame, index: ShiftIndex):
+    """schedule_df（Shift・Duty_G0・Duty_G1・Oncall_G0）か注釈入り CSV（Duty=3 / OC=4）を数える。
+
+    戻り値: (duty (D, S) 回数, oncall (D, S) 回数, 読めなかった名前・シフト・グループ違いの Issue,
+    同名で行の決まらない勤務 {候補の行のタプル: [(列, Oncall か)]})。
+    どちらの形かは Shift 列の有無で見分ける。同名の医師はまずグループで分ける。
+    """
+    D, S = len(df_raw), len(index.shifts)
+    group = df_raw["Group"].to_numpy(dtype=int)
+    names = df_raw["Name"].astype(str).tolist()
+    duty, oncall = np.zeros((D, S), dtype=int), np.zeros((D, S), dtype=int)
+    rows, issues, ambiguous = _rows(df_raw), [], {}
+
+    if "Shift" not in schedule.columns:
+        # 注釈入り CSV：元の CSV と同じ並びなら行の位置で（同名の医師もずれない）、違えば名前と Group で合わせる
+        ann = schedule.reset_index(drop=True)
+        ann_names = ann["Name"].astype(str).str.strip().tolist()
+        cols = [s for s in index.shifts if s in ann.columns]
+        j = np.array([index.pos[s] for s in cols], dtype=int)
+        vals = ann[cols].to_numpy()
+        if ann_names == [n.strip() for n in names]:
+            for out, code in ((duty, ANNOTATE[DUTY]), (oncall, ANNOTATE[ONCALL])):
+                ii, jj = np.nonzero(vals == code)
+                np.add.at(out, (ii, j[jj]), 1)
+        else:
+            ann_group = ann["Group"].tolist() if "Group" in ann.columns else [None] * len(ann)
+            for k, (name, g) in enumerate(zip(ann_names, ann_group)):
+                r = _pick(rows, group, name, None if pd.isna(g) else int(g))
+                if r is None:
+                    issues.append(Issue("format", f"{name}: 元の CSV にいない医師", [name]))
+                    continue
+                for out, code in ((duty, ANNOTATE[DUTY]), (oncall, ANNOTATE[ONCALL])):
+                    jj = j[vals[k] == code]
+                    if isinstance(r, tuple):
+                        ambiguous.setdefault(r, []).extend((int(x), out is oncall) for x in jj)
+                    else:
+                        np.add.at(out, (r, jj), 1)
+        for a, b in zip(*np.nonzero((oncall > 0) & (group == 1)[:, None])):
+            issues.append(Issue("group", f"{names[a]}: G1 なのに {index.shifts[b]} の Oncall",
+                                [names[a]], [index.shifts[b]]))
+        return duty, oncall, issues, ambiguous
+
+    sched = schedule.fillna("")
+    shift = [str(x).strip() for x in sched["Shift"]]
+    for x in shift:
+        if x not in index.pos:
+            issues.append(Issue("format", f"{x}: この月にないシフト", [], [x]))
+    for col, g in ROLES:
+        if col not in sched.columns:
+            issues.append(Issue("format", f"{col} 列がない"))
+            continue
+        # 表は 1 シフト 1 行（多くて 60 行ほど）なので名前を引くところまでは行ごとに、数えるのは一括で
+        ij = []
+        for x, cell in zip(shift, sched[col].astype(str)):
+            j = index.pos.get(x)
+            for name in cell.split(",") if j is not None else ():
+                name = name.strip()
+                r = _pick(rows, group, name, g) if name else None
+                if isinstance(r, tuple):
+                    ambiguous.setdefault(r, []).append((j, col == "Oncall_G0"))
+                elif r is not None:
+                    ij.append((r, j))
+                elif name:
+                    issues.append(Issue("format", f"{x}: {name} は元の CSV にいない医師", [name], [x]))
+        i, j = np.array(ij, dtype=int).reshape(-1, 2).T
+        np.add.at(oncall if col == "Oncall_G0" else duty, (i, j), 1)
+        for a, b in zip(i[group[i] != g], j[group[i] != g]):
+            issues.append(Issue("group", f"{names[a]}: G{group[a]} なのに {index.shifts[b]} の {col}",
+                                [names[a]], [index.shifts[b]]))
+    return duty, oncall, issues, ambiguous
+
+
+def _split(cells: list, cand: tuple, duty: np.ndarray, oncall: np.ndarray, check, limit: int = 1024):
+    """同名の候補の行 cand へ勤務 cells を割り振る組合せを順に試し、check で違反の出ない最初の
+    (duty, oncall) を返す（なければ None）。同名は 2〜3 人・1 人あたりの勤務は数回なので総当たりで足りる。"""
+    if len(cand) ** len(cells) > limit:
+        return None
+    m = np.zeros(len(duty), dtype=bool)
+    m[list(cand)] = True
+    for pick in itertools.product(cand, repeat=len(cells)):
+        d, o = duty.copy(), oncall.copy()
+        for r, (j, is_oc) in zip(pick, cells):
+            (o if is_oc else d)[r, j] += 1
+        if not check(d, o, m)[0]:
+            return d, o
+    return None
+
+
+# ---------- チェック ----------
+def _spacing(work: np.ndarray, day: np.ndarray, last: np.ndarray, gap: int, same_day: bool):
+    """医師ごとに隣り合う勤務の日の差が gap 未満の組（(医師, 前の列 or -1, 後の列, 差)）。
+
+    勤務を (医師, 列) の順に並べ、隣どうしの差を 1 回で取る。前月の最終勤務日 last との差も。
+    same_day なら同じ日の重なり（-1/-2・Duty+Oncall）は許す。
+    """
+    i, j = np.nonzero(work)
+    d = day[j]
+    same = np.r_[False, i[1:] == i[:-1]]
+    prev = np.r_[-1, j[:-1]]
+    diff = np.where(same, d - np.r_[0, d[:-1]], d - last[i])
+    bad = (diff < gap) & ((diff > 0) | ~(same_day & same))
+    return i[bad], np.where(same, prev, -1)[bad], j[bad], diff[bad]
+
+
+def validate_schedule(df_raw: pd.DataFrame, schedule: pd.DataFrame, year: int, month: int,
+                      rules: str = "strict", carry=None, index: ShiftIndex | None = None) -> Validation:
+    """編集した割付（schedule_df か注釈入り CSV）を、解き直さずにルールだけでチェックする。
+
+    rules="strict": 3 日間隔（同じ日の重なりは可）、G1 Duty ちょうど 2 回・G0 Duty 1〜2 回・Oncall 2 回まで。
+    rules="loose"（flow も）: 4 日間隔、Duty 週 1 回・-1 月 1 回まで、G1 Duty 2 回・G0 Duty 1〜2 回。
+    Oncall の絡む間隔はエンジンがわざと緩和するので、違反ではなく warnings に入れる。
+    同名の医師で行の決まらない勤務は、候補の行にルールどおり割り振れればそれで見る（warnings に記録）。
+    割り振れなければ format の違反だけ出し、その医師の回数・間隔などは見ない。
+    どちらも可勤務日（strict は 1 だけ NG・loose は 0 以外 NG）、シフトの充足（-1 は G0・G1 が 1 人ずつ、
+    それ以外は 1 人）、G1 Duty の通常シフトには G0 Oncall がちょうど 1 人（-1 と G0 Duty には付けない）。
+    carry（utils.horizon.Carry）があれば前月の最終勤務日・同じ週の勤務も見る。
+    違反はすべて Issue（rule・内容・医師・シフト）で返す。行列演算だけなのでミリ秒で終わる。
+    """
+    t = time.perf_counter()
+    if rules not in ("strict", "loose"):
+        raise ValueError(f"rules は strict / loose のどちらかです: {rules}")
+    index = index or ShiftIndex.from_columns(df_raw.columns, year, month)
+    shifts, day, sub, week = index.shifts, index.day, index.sub, index.week
+    names = df_raw["Name"].astype(str).tolist()
+    group = df_raw["Group"].to_numpy(dtype=int)
+    hol, g0, g1 = sub == 1, group == 0, group == 1
+    strict = rules == "strict"
+    gap = STRICT_GAP if strict else LOOSE_GAP
+    inst, _ = make_instance(df_raw, year, month, carry, index)
+    if strict:
+        avail = availability_matrix(df_raw, shifts)
+        last = (carry.arrays(df_raw["Name"], year, month)["last_day"] if carry
+                else np.full(len(names), NO_LAST, dtype=int))
+    else:
+        avail, last = inst.avail, inst.last0
+
+    duty, oncall, issues, ambiguous = read_schedule(df_raw, schedule, index)
+    val = Validation(rules, issues)
+
+    def doctor_checks(duty, oncall, m):
+        # 医師ごとのルール（m の行だけ）。戻り値: (違反, 警告)
+        bad, warn = [], []
+        work = ((duty + oncall) > 0) & m[:, None]
+        # 1 つのセルに 2 回（同じ名前を 2 回・Duty と Oncall の両方）
+        for i, j in zip(*np.nonzero((duty + oncall > 1) & m[:, None])):
+            bad.append(Issue("double", f"{names[i]}: {shifts[j]} に 2 回入っている", [names[i]], [shifts[j]]))
+        # 可勤務日
+        for j, i in zip(*np.nonzero((work & ~avail).T)):
+            role = "Oncall" if oncall[i, j] else "Duty"
+            bad.append(Issue("availability", f"{names[i]}: {shifts[j]} は NG の日なのに {role}",
+                             [names[i]], [shifts[j]]))
+        # 回数
+        nd, no = duty.sum(axis=1), oncall.sum(axis=1)
+        for i in np.flatnonzero(m & g1 & (nd != 2)):
+            bad.append(Issue("count", f"{names[i]}: G1 の Duty が {nd[i]} 回（ちょうど 2 回）", [names[i]]))
+        for i in np.flatnonzero(m & g0 & ((nd < 1) | (nd > 2))):
+            bad.append(Issue("count", f"{names[i]}: G0 の Duty が {nd[i]} 回（1〜2 回）", [names[i]]))
+        if strict:
+            for i in np.flatnonzero(m & g0 & (no > 2)):
+                bad.append(Issue("count", f"{names[i]}: Oncall が {no[i]} 回（2 回まで）", [names[i]]))
+        # 勤務間隔（前月の最終勤務日からも）。loose は Oncall の絡む間隔を緩和してよい（空欄よりまし）ので警告に
+        for i, a, b, d in zip(*_spacing(work, day, last, gap, same_day=strict)):
+            relaxed = not strict and (oncall[i, b] > 0 or (a >= 0 and oncall[i, a] > 0))
+            out, note = (warn, "Oncall なので緩和") if relaxed else (bad, f"{gap} 日以上空ける")
+            if a < 0:
+                out.append(Issue("spacing", f"{names[i]}: 前月の最終勤務から {d} 日で {shifts[b]}（{note}）",
+                                 [names[i]], [shifts[b]]))
+            else:
+                out.append(Issue("spacing", f"{names[i]}: {shifts[a]} と {shifts[b]} が {d} 日差（{note}）",
+                                 [names[i]], [shifts[a], shifts[b]]))
+        if not strict:
+            # Duty は週 1 回まで（前月末と同じ ISO 週の勤務も数える）・-1 は月 1 回まで
+            W = inst.weekly0.shape[1]
+            per_week = (duty > 0).astype(int) @ (week[:, None] == np.arange(W)[None, :]) + inst.weekly0
+            for i, w in zip(*np.nonzero((per_week > 1) & m[:, None])):
+                cols = np.flatnonzero((duty[i] > 0) & (week == w))
+                carried = "（前月の勤務を含む）" if inst.weekly0[i, w] else ""
+                bad.append(Issue("weekly", f"{names[i]}: ISO {index.iso_week[cols[0]]} 週に Duty {per_week[i, w]} 回"
+                                           f"{carried}（週 1 回まで）", [names[i]], [shifts[j] for j in cols]))
+            nh = (duty[:, hol] > 0).sum(axis=1)
+            for i in np.flatnonzero(m & (nh > 1)):
+                cols = np.flatnonzero(hol & (duty[i] > 0))
+                bad.append(Issue("holiday", f"{names[i]}: -1 の Duty が {nh[i]} 回（月 1 回まで）",
+                                 [names[i]], [shifts[j] for j in cols]))
+        return bad, warn
+
+    # 同名で行の決まらない勤務（書き出した Schedule の名前は行を持たない）は、候補の行へルールを守る
+    # 割り振りを探す。なければその行は医師ごとのチェックから外し（でっち上げの違反を出さない）、format だけ出す
+    skip = np.zeros(len(names), dtype=bool)
+    extra = np.zeros((3, len(shifts)), dtype=int)       # 外した勤務のシフトごとの人数（G0 Duty / G1 Duty / Oncall）
+    for cand, cells in ambiguous.items():
+        name, where = names[cand[0]], sorted({j for j, _ in cells})
+        split = _split(cells, cand, duty, oncall, doctor_checks)
+        if split is not None:
+            duty, oncall = split
+            val.warnings.append(Issue("format", f"{name} は元の CSV に {len(cand)} 行あり、ルールに合う割り振りで"
+                                                f"行を決めた", [name], [shifts[j] for j in where]))
+            continue
+        skip[list(cand)] = True
+        for j, is_oc in cells:
+            extra[2 if is_oc else group[cand[0]], j] += 1
+        issues.append(Issue("format", f"{name} は元の CSV に {len(cand)} 行あり、どの行か決められない"
+                                      f"（この医師の回数・間隔などは見ない）", [name], [shifts[j] for j in where]))
+
+    bad, warn = doctor_checks(duty, oncall, ~skip)
+    issues += bad
+    val.warnings += warn
+
+    # シフトの充足と G1 Duty → G0 Oncall
+    n0, n1, noc = duty[g0].sum(axis=0) + extra[0], duty[g1].sum(axis=0) + extra[1], oncall.sum(axis=0) + extra[2]
+    for g, n in ((0, n0), (1, n1)):
+        for j in np.flatnonzero(hol & (n != 1)):
+            issues.append(Issue("coverage", f"{shifts[j]}: -1 の G{g} Duty が {n[j]} 人（1 人要る）", [], [shifts[j]]))
+    for j in np.flatnonzero(~hol & (n0 + n1 != 1)):
+        issues.append(Issue("coverage", f"{shifts[j]}: Duty が {n0[j] + n1[j]} 人（1 人要る）", [], [shifts[j]]))
+    for j in np.flatnonzero(hol & (noc > 0)):
+        issues.append(Issue("oncall", f"{shifts[j]}: -1 に Oncall が {noc[j]} 人（付けない）", [], [shifts[j]]))
+    for j in np.flatnonzero(~hol & (noc != n1)):
+        need = "1 人要る" if n1[j] else "G0 Duty には付けない"
+        issues.append(Issue("oncall", f"{shifts[j]}: G1 Duty {n1[j]} 人に Oncall {noc[j]} 人（{need}）",
+                            [], [shifts[j]]))
+
+    a = Assignment.empty(names, group, shifts)
+    a.matrix[oncall > 0] = ONCALL
+    a.matrix[duty > 0] = DUTY
+    val.assignment = a
+    val.seconds = time.perf_counter() - t
+    return val